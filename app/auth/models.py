@@ -8,8 +8,9 @@ class RevokedToken(Base):
     __tablename__ = "revoked_tokens"
 
     id = Column(Integer, primary_key=True, index=True)
+    # SHA-256 (hexadecimal) del JWT revocado, ver app.auth.revocation
     token = Column(String, unique=True, nullable=False)
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
 
     def has_expired(self):
         """Método para verificar si el token ha expirado"""
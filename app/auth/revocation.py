@@ -0,0 +1,128 @@
+"""
+Revocación de tokens JWT.
+
+La tabla `revoked_tokens` guarda el SHA-256 del token (nunca el JWT completo). Cada
+worker mantiene en memoria las revocaciones vigentes y las actualiza de forma
+incremental (filas con id mayor al último leído) como máximo cada
+`REVOCATION_REFRESH_SECONDS`, así que verificar un token no consulta la base de datos
+en el caso común. Una recarga completa periódica recoge las filas que otra
+transacción haya confirmado con un id menor al último leído.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import select
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre actualizaciones incrementales y entre recargas completas de la caché
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "5"))
+REVOCATION_FULL_RELOAD_SECONDS = float(os.getenv("REVOCATION_FULL_RELOAD_SECONDS", "300"))
+
+
+def token_digest(token: str) -> str:
+    """Huella SHA-256 (hexadecimal) con la que se registra un token revocado"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class RevocationCache:
+    """Conjunto en memoria de tokens revocados no expirados (huella -> expiración)"""
+
+    def __init__(self, engine=None, refresh_seconds: float = None, full_reload_seconds: float = None,
+                 clock=time.monotonic):
+        self._engine = engine
+        self.refresh_seconds = REVOCATION_REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        self.full_reload_seconds = REVOCATION_FULL_RELOAD_SECONDS if full_reload_seconds is None else full_reload_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Vacía la caché; la siguiente verificación recarga todo desde la base de datos"""
+        with self._lock:
+            self._expires = {}
+            self._last_id = 0
+            self._next_refresh = 0.0
+            self._next_full_reload = 0.0
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.database import engine
+            self._engine = engine
+        return self._engine
+
+    def __len__(self):
+        return len(self._expires)
+
+    def add(self, digest: str, expires_at: datetime):
+        """Registra una revocación hecha en este proceso sin esperar a la siguiente actualización"""
+        # Con el lock: una actualización en curso reemplaza el diccionario y descartaría la entrada
+        with self._lock:
+            self._expires[digest] = expires_at
+
+    def is_revoked(self, token: str) -> bool:
+        return self.is_digest_revoked(token_digest(token))
+
+    def is_digest_revoked(self, digest: str) -> bool:
+        """Como `is_revoked`, con la huella del token (ver AuthService.create_stream_token)"""
+        self._maybe_refresh()
+        return self._is_listed(digest)
+
+    async def is_digest_revoked_async(self, digest: str) -> bool:
+        """
+        Como `is_digest_revoked`, para el event loop: la actualización (lock y consulta a la
+        base de datos) corre en un hilo y entre actualizaciones solo se lee la memoria.
+        """
+        if self._clock() >= self._next_refresh:
+            await asyncio.to_thread(self._maybe_refresh)
+        return self._is_listed(digest)
+
+    def _is_listed(self, digest: str) -> bool:
+        expires_at = self._expires.get(digest)
+        return expires_at is not None and expires_at > datetime.utcnow()
+
+    def _maybe_refresh(self):
+        now = self._clock()
+        if now < self._next_refresh:
+            return
+        with self._lock:
+            if now < self._next_refresh:
+                return
+            try:
+                self._refresh(full=now >= self._next_full_reload)
+            except Exception:
+                # Se conserva lo que ya está en memoria y se reintenta en el siguiente intervalo
+                logger.exception("No se pudo actualizar la caché de tokens revocados")
+            else:
+                if now >= self._next_full_reload:
+                    self._next_full_reload = now + self.full_reload_seconds
+            self._next_refresh = now + self.refresh_seconds
+
+    def _refresh(self, full: bool):
+        from app.users.models import RevokedToken
+
+        table = RevokedToken.__table__
+        now = datetime.utcnow()
+        query = select(table.c.id, table.c.token, table.c.expires_at).where(table.c.expires_at > now)
+        if not full:
+            query = query.where(table.c.id > self._last_id)
+        with self.engine.connect() as connection:
+            rows = connection.execute(query).all()
+
+        # Las revocaciones solo salen de la caché al expirar
+        expires = {digest: at for digest, at in self._expires.items() if at > now}
+        for row in rows:
+            expires[row.token] = row.expires_at
+            self._last_id = max(self._last_id, row.id)
+        self._expires = expires
+
+
+revocation_cache = RevocationCache()
@@ -1,17 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session , joinedload
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session
 from datetime import datetime
-from jose import jwt, JWTError
+from typing import Optional
 from app.database import get_db
-from app.auth.services import AuthService, SECRET_KEY, OAuthService
-from app.auth.schemas import ResetPasswordRequest, ResetPasswordResponse, UpdatePasswordRequest, OAuthLoginRequest, OAuthCallbackRequest, SocialLoginResponse
+from app.auth.services import AuthService, OAuthService, oauth2_scheme
+from app.auth.schemas import RefreshTokenRequest, ResetPasswordRequest, ResetPasswordResponse, UpdatePasswordRequest, OAuthLoginRequest, OAuthCallbackRequest, SocialLoginResponse
 from app.users.schemas import UserLogin, Token
 from app.users.services import UserService
 from app.roles.models import Role, Permission 
 from app.users.models import User
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/swagger-login")
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
@@ -22,40 +21,12 @@ def swagger_login(
 ):
     auth_service = AuthService(db)
     
+    # authenticate_user ya carga roles y permisos en la misma consulta
     user = auth_service.authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
-    
-    # Recargar el usuario con relaciones
-    user = (
-        db.query(User)
-        .options(joinedload(User.roles).joinedload(Role.permissions))
-        .filter(User.email == user.email)
-        .first()
-    )
-    
 
-    
-    roles = []
-    for role in user.roles:
-        role_data = {"id": role.id, "name": role.name}
-        permisos = [{"id": perm.id, "name": perm.name} for perm in role.permissions]
-        role_data["permisos"] = permisos
-        roles.append(role_data)
-    
-    token_data = {
-        "sub": user.email,   
-        "id": user.id,
-        "name": user.name,
-        "email": user.email,
-        "status_date": datetime.utcnow().isoformat(),
-        "rol": roles,
-        "birthday": user.birthday.isoformat() if user.birthday else None,
-        "first_login_complete": user.first_login_complete
-    }
-    
-    access_token = auth_service.create_access_token(data=token_data)
-    return {"access_token": access_token, "token_type": "bearer"}
+    return auth_service.create_session_tokens(user)
 
 @router.post("/login/", response_model=Token)
 def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
@@ -81,51 +52,39 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
             status_code=401, 
             detail="Cuenta inactiva o bloqueada. No se permite el acceso."
         )
-    
 
-    user = (
-        db.query(User)
-        .options(joinedload(User.roles).joinedload(Role.permissions))
-        .filter(User.email == user.email)
-        .first()
-    )
-    
-    roles = []
-    for role in user.roles:
-        role_data = {"id": role.id, "name": role.name}
-        permisos = [{"id": perm.id, "name": perm.name} for perm in role.permissions]
-        role_data["permisos"] = permisos
-        roles.append(role_data)
-    
-    token_data = {
-        "sub": user.email,
-        "id": user.id,
-        "name": user.name,
-        "email": user.email,
-        "status_date": datetime.utcnow().isoformat(),
-        "rol": roles,
-        "status": user.status_id,
-        "birthday": user.birthday.isoformat() if user.birthday else None,
-        "first_login_complete": user.first_login_complete
-    }
-    
-    access_token = auth_service.create_access_token(data=token_data)
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Los claims se construyen con el usuario ya cargado (roles y permisos incluidos)
+    return auth_service.create_session_tokens(user)
+
+
+@router.post("/refresh", response_model=Token)
+def refresh(request: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """
+    Renueva la sesión: canjea el token de refresco por un token de acceso y un token de
+    refresco nuevos, sin volver a verificar la contraseña.
+    """
+    return AuthService(db).rotate_refresh_token(request.refresh_token)
 
 
 @router.post("/logout")
-def logout(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def logout(
+    request: Optional[RefreshTokenRequest] = None,
+    token: str = Depends(oauth2_scheme),
+    payload: dict = Depends(AuthService.get_logout_claims),
+    db: Session = Depends(get_db)
+):
     """
-    Cierra la sesión revocando el token.
+    Cierra la sesión revocando el token y, si se envía, el token de refresco.
+    El token ya viene verificado por la dependencia de autenticación: si es inválido
+    o expiró responde 400 y si ya fue revocado, 401.
     """
     auth_service = AuthService(db)
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
         expires_at = datetime.utcfromtimestamp(payload.get("exp"))
         auth_service.revoke_token(db, token, expires_at)
+        if request:
+            auth_service.revoke_refresh_token(request.refresh_token)
         return {"message": "Cierre de sesión exitoso"}
-    except JWTError:
-        raise HTTPException(status_code=400, detail="Token inválido")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al revocar el token: {str(e)}")
 
@@ -11,6 +11,11 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+# Esquema para renovar la sesión (o cerrarla) con el token de refresco
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 # Esquema para la solicitud de restablecimiento de contraseña
 class ResetPasswordRequest(BaseModel):
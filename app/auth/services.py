@@ -1,20 +1,44 @@
-from typing import Dict
-from fastapi import Depends, HTTPException, requests, status
+from typing import Dict, Optional
+from fastapi import Depends, HTTPException, Query, Request, requests, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from app.auth.schemas import OAuthUserInfo, SocialLoginResponse
-from app.users.models import SocialAccount, User, RevokedToken
+from app.users.models import SocialAccount, User, RevokedToken, RefreshToken
 from sqlalchemy.orm import Session, joinedload
 from app.roles.models import Role, Permission
-from Crypto.Protocol.KDF import scrypt
+from app.auth.revocation import revocation_cache, token_digest
+from app.auth.tokens import TokenVerifier
+from app.roles.permissions import ACTIVE_ROLE_STATUS, encode_permissions
+from app.passwords import password_hasher, PasswordHasherBusy
+from dotenv import load_dotenv
+import logging
 import os
+import secrets
+import time
+
+load_dotenv()
 
 SECRET_KEY = "your_secret_key"
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+# Tokens de acceso de vida corta; el cliente los renueva con el token de refresco (POST /auth/refresh)
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+# Un token de refresco presentado otra vez dentro de estos segundos se toma como una
+# petición concurrente del mismo cliente (409) y no como reuso
+REFRESH_TOKEN_REUSE_GRACE_SECONDS = float(os.getenv("REFRESH_TOKEN_REUSE_GRACE_SECONDS", "5"))
+
+# Token corto con el que EventSource, que no puede enviar el encabezado Authorization, abre
+# GET /users/notifications/stream (en `?token=` o en la cookie)
+NOTIFICATION_STREAM_TOKEN_SECONDS = int(os.getenv("NOTIFICATION_STREAM_TOKEN_SECONDS", "60"))
+STREAM_TOKEN_SCOPE = "notifications_stream"
+STREAM_TOKEN_COOKIE = "notifications_stream_token"
+
+# Un solo esquema para todas las rutas; Swagger obtiene el token del login con formulario
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/swagger-login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/swagger-login", auto_error=False)
+token_verifier = TokenVerifier(SECRET_KEY, ALGORITHM)
+logger = logging.getLogger(__name__)
 
 class AuthService:
     """Clase para la gestión de autenticación"""
@@ -40,49 +64,23 @@ class AuthService:
 
     def revoke_token(self, db: Session, token: str, expires_at: datetime):
         """
-        Revocar un token y guardarlo en la base de datos
+        Revocar un token y guardar su huella SHA-256 en la base de datos
         :param db: Sesión de la base de datos
         :param token: El token a revocar
         :param expires_at: Fecha de expiración del token
         :return: Mensaje de éxito
         """
         try:
-            revoked = RevokedToken(token=token, expires_at=expires_at)
+            digest = token_digest(token)
+            revoked = RevokedToken(token=digest, expires_at=expires_at)
             db.add(revoked)
             db.commit()
+            revocation_cache.add(digest, expires_at)
             return {"success": True, "data": "Token revocado correctamente"}
         except Exception as e:
             db.rollback()
             raise HTTPException(status_code=500, detail=f"Error al revocar el token: {str(e)}")
 
-    def verify_password(self, stored_salt: str, stored_hash: str, password: str) -> bool:
-        """
-        Verificar si la contraseña proporcionada coincide con el hash almacenado
-        :param stored_salt: El salt almacenado en la base de datos
-        :param stored_hash: El hash de la contraseña almacenado en la base de datos
-        :param password: La contraseña proporcionada por el usuario
-        :return: True si la contraseña es válida, False en caso contrario
-        """
-        try:
-            calculated_hash = self.hash_password(password, stored_salt)
-            return calculated_hash == stored_hash
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error al verificar la contraseña: {str(e)}")
-
-    def hash_password(self, password: str, salt: str) -> str:
-        """
-        Generar el hash de la contraseña con salt utilizando el algoritmo scrypt
-        :param password: Contraseña proporcionada por el usuario
-        :param salt: El salt para el hash
-        :return: El hash generado de la contraseña
-        """
-        try:
-            salt_bytes = bytes.fromhex(salt)
-            key = scrypt(password.encode(), salt=salt_bytes, key_len=32, N=2**14, r=8, p=1)
-            return key.hex()
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error al generar el hash de la contraseña: {str(e)}")
-    
     def get_user_by_username(self, username: str):
         try:
             user = (
@@ -99,22 +97,23 @@ class AuthService:
 
     def hash_password(self, password: str) -> tuple:
         try:
-            salt = os.urandom(16)
-            key = scrypt(password.encode(), salt, key_len=32, N=2**14, r=8, p=1)
-            return salt.hex(), key.hex()
+            return password_hasher.hash(password)
+        except PasswordHasherBusy:
+            raise HTTPException(status_code=503, detail="Servicio ocupado, intente de nuevo en unos segundos", headers={"Retry-After": "1"})
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al generar el hash de la contraseña: {str(e)}")
 
     def verify_password(self, stored_salt: str, stored_hash: str, password: str) -> bool:
+        """Verifica la contraseña con los parámetros de scrypt guardados en el propio hash"""
         try:
             bytes.fromhex(stored_salt)
         except ValueError:
             raise HTTPException(status_code=400, detail="El salt almacenado no es una cadena hexadecimal válida.")
         
         try:
-            salt = bytes.fromhex(stored_salt)
-            key = scrypt(password.encode(), salt, key_len=32, N=2**14, r=8, p=1)
-            return key.hex() == stored_hash
+            return password_hasher.verify(stored_salt, stored_hash, password)
+        except PasswordHasherBusy:
+            raise HTTPException(status_code=503, detail="Servicio ocupado, intente de nuevo en unos segundos", headers={"Retry-After": "1"})
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al verificar la contraseña: {str(e)}")
 
@@ -123,10 +122,151 @@ class AuthService:
             user = self.get_user_by_username(email)
             if not user or not self.verify_password(user.password_salt, user.password, password):
                 raise HTTPException(status_code=401, detail="Credenciales inválidas")
+            self.rehash_password_if_needed(user, password)
             return user
+        except HTTPException as e:
+            # Con el pool de hash saturado se responde 503 para que el cliente reintente
+            if e.status_code == status.HTTP_503_SERVICE_UNAVAILABLE:
+                raise
+            raise HTTPException(status_code=401, detail=f"Error al autenticar al usuario: {str(e)}")
         except Exception as e:
             raise HTTPException(status_code=401, detail=f"Error al autenticar al usuario: {str(e)}")
 
+    def rehash_password_if_needed(self, user: User, password: str):
+        """
+        Regenera el hash con los parámetros actuales de scrypt si se creó con otros.
+        Solo se llama con la contraseña ya verificada; si falla, el inicio de sesión continúa.
+        El cambio solo se envía (flush): se confirma junto con el token de refresco, después
+        de construir los claims, porque un commit aquí expiraría el usuario y sus roles.
+        El flush corre en un SAVEPOINT para que un error deshaga solo el hash nuevo y no la
+        transacción (ni el estado de la sesión) del inicio de sesión.
+        """
+        if not password_hasher.needs_rehash(user.password):
+            return
+        try:
+            password_salt, password_hash = password_hasher.hash(password)
+            with self.db.begin_nested():
+                user.password_salt, user.password = password_salt, password_hash
+        except Exception as e:
+            logger.warning("No se pudo actualizar el hash de la contraseña del usuario %s: %s", user.id, e)
+
+    def build_token_claims(self, user: User) -> dict:
+        """
+        Construye el payload del JWT a partir del usuario devuelto por authenticate_user.
+        Roles y permisos ya vienen cargados en la consulta del login, así que no se vuelve a leer el usuario.
+        Los permisos de los roles habilitados viajan como bitset (ver app.roles.permissions).
+        :param user: Usuario autenticado con roles y permisos cargados
+        :return: Claims del token
+        """
+        roles = [{"id": role.id, "name": role.name} for role in user.roles]
+        permission_ids = {
+            perm.id for role in user.roles if role.status == ACTIVE_ROLE_STATUS for perm in role.permissions
+        }
+        return {
+            "sub": user.email,
+            "id": user.id,
+            "name": user.name,
+            "email": user.email,
+            "status_date": datetime.utcnow().isoformat(),
+            "rol": roles,
+            "permisos": encode_permissions(permission_ids),
+            "status": user.status_id,
+            "birthday": user.birthday.isoformat() if user.birthday else None,
+            "first_login_complete": user.first_login_complete
+        }
+
+    def create_session_tokens(self, user: User, family_id: str = None) -> dict:
+        """
+        Emite el par token de acceso + token de refresco para un usuario ya autenticado
+        :param user: Usuario con roles y permisos cargados
+        :param family_id: Familia del token de refresco al rotarlo; None inicia una nueva
+        :return: Respuesta con access_token, refresh_token y token_type
+        """
+        access_token = self.create_access_token(data=self.build_token_claims(user))
+        refresh_token = self.issue_refresh_token(user.id, family_id)
+        return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+    def issue_refresh_token(self, user_id: int, family_id: str = None) -> str:
+        """Genera un token de refresco opaco; en la base de datos solo se guarda su SHA-256"""
+        token = secrets.token_urlsafe(32)
+        try:
+            self.db.add(RefreshToken(
+                token_hash=token_digest(token),
+                family_id=family_id or secrets.token_hex(16),
+                user_id=user_id,
+                expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+            ))
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            raise HTTPException(status_code=500, detail=f"Error al crear el token de refresco: {str(e)}")
+        return token
+
+    def rotate_refresh_token(self, token: str) -> dict:
+        """
+        Canjea un token de refresco por un par nuevo sin verificar la contraseña.
+        El token queda usado; si se presenta otra vez se revoca toda su familia,
+        porque alguien más lo tiene (reuso). Dentro de REFRESH_TOKEN_REUSE_GRACE_SECONDS
+        desde su uso se responde 409 sin revocar: son peticiones simultáneas del mismo
+        cliente (varias pestañas o reintentos) y una de ellas ya recibió el par nuevo.
+        """
+        invalid = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de refresco inválido o expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+        now = datetime.utcnow()
+        stored = self.db.query(RefreshToken).filter(RefreshToken.token_hash == token_digest(token)).first()
+        if stored is None or stored.revoked_at is not None or stored.expires_at <= now:
+            raise invalid
+        family_id, user_id = stored.family_id, stored.user_id
+
+        # Marcarlo como usado es atómico: de dos peticiones con el mismo token solo una lo consigue
+        claimed = (
+            self.db.query(RefreshToken)
+            .filter(RefreshToken.id == stored.id, RefreshToken.used_at.is_(None))
+            .update({RefreshToken.used_at: now}, synchronize_session=False)
+        )
+        if not claimed:
+            self.db.rollback()
+            used_at = self.db.query(RefreshToken.used_at).filter(RefreshToken.id == stored.id).scalar()
+            if used_at is not None and now - used_at <= timedelta(seconds=REFRESH_TOKEN_REUSE_GRACE_SECONDS):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="El token de refresco ya se está renovando en otra petición",
+                )
+            self.revoke_refresh_family(family_id)
+            logger.warning("Reuso del token de refresco de la familia %s (usuario %s); familia revocada", family_id, user_id)
+            raise invalid
+
+        user = (
+            self.db.query(User)
+            .options(joinedload(User.roles).joinedload(Role.permissions))
+            .filter(User.id == user_id)
+            .first()
+        )
+        if not user or user.status_id != 1:
+            self.db.commit()
+            raise HTTPException(status_code=401, detail="Cuenta inactiva o bloqueada. No se permite el acceso.")
+        return self.create_session_tokens(user, family_id)
+
+    def revoke_refresh_family(self, family_id: str):
+        """Revoca todos los tokens de refresco de una familia (una sesión de un dispositivo)"""
+        try:
+            self.db.query(RefreshToken).filter(
+                RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None)
+            ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            raise HTTPException(status_code=500, detail=f"Error al revocar el token de refresco: {str(e)}")
+
+    def revoke_refresh_token(self, token: str):
+        """Revoca la familia del token de refresco indicado, si existe"""
+        stored = self.db.query(RefreshToken.family_id).filter(RefreshToken.token_hash == token_digest(token)).first()
+        if stored:
+            self.revoke_refresh_family(stored.family_id)
+
     def create_access_token(self, data: dict, expires_delta: timedelta = None):
         try:
             to_encode = data.copy()
@@ -137,20 +277,100 @@ class AuthService:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al crear el token: {str(e)}")
 
-    def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+    def create_stream_token(self, access_token: str, claims: dict) -> str:
+        """
+        Emite el token para abrir el stream de notificaciones sin encabezados.
+        Vence en NOTIFICATION_STREAM_TOKEN_SECONDS (o antes, si vence el token de acceso) y
+        lleva la huella y el vencimiento del token de acceso: el stream se cierra cuando
+        ese token expira o se revoca.
+        :param access_token: Token de acceso ya verificado
+        :param claims: Claims del token de acceso
+        :return: JWT firmado
+        """
+        return jwt.encode({
+            "id": claims["id"],
+            "scope": STREAM_TOKEN_SCOPE,
+            "access": token_digest(access_token),
+            "session_exp": claims["exp"],
+            "exp": min(int(time.time()) + NOTIFICATION_STREAM_TOKEN_SECONDS, claims["exp"]),
+        }, SECRET_KEY, algorithm=ALGORITHM)
+
+    @staticmethod
+    def get_stream_session(
+        request: Request,
+        token: Optional[str] = Query(None, description="Token de AuthService.create_stream_token"),
+        bearer: Optional[str] = Depends(optional_oauth2_scheme),
+    ) -> dict:
+        """
+        Dependencia de autenticación del stream de notificaciones. Acepta el token Bearer o
+        el token de stream en `?token=` o en la cookie STREAM_TOKEN_COOKIE.
+        :return: id del usuario, huella del token de acceso y su vencimiento (epoch)
         """
-        Verifica el token JWT y retorna la información del usuario actual.
-        Si el token es inválido, lanza una excepción.
+        if bearer is not None:
+            claims = AuthService.get_current_user(bearer, request)
+            return {"id": claims["id"], "access": token_digest(bearer), "expires_at": claims["exp"]}
+        token = token or request.cookies.get(STREAM_TOKEN_COOKIE)
+        try:
+            if token is None:
+                raise JWTError("Sin token")
+            claims = token_verifier.decode(token)
+        except JWTError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Credenciales inválidas",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if claims.get("scope") != STREAM_TOKEN_SCOPE:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales inválidas")
+        if revocation_cache.is_digest_revoked(claims["access"]):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revocado")
+        return {"id": claims["id"], "access": claims["access"], "expires_at": claims["session_exp"]}
+
+    @staticmethod
+    def get_current_user(token: str = Depends(oauth2_scheme), request: Request = None) -> dict:
         """
+        Dependencia de autenticación: verifica el token JWT y retorna sus claims.
+        Si el token es inválido o fue revocado, lanza una excepción.
+        Se decodifica una sola vez por petición: los claims y el token quedan en
+        `request.state.auth_claims` y `request.state.auth_token`. La firma de los tokens
+        vistos recientemente no se vuelve a verificar (ver app.auth.tokens) y la
+        revocación se consulta en la caché en memoria, sin ir a la base de datos.
+        """
+        if request is not None and getattr(request.state, "auth_token", None) == token:
+            return request.state.auth_claims
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            return payload
+            payload = token_verifier.decode(token)
+            if "scope" in payload:
+                # Un token de stream solo sirve para abrir el stream
+                raise JWTError("Token de alcance limitado")
         except JWTError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Credenciales inválidas",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        if revocation_cache.is_revoked(token):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token revocado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if request is not None:
+            request.state.auth_token = token
+            request.state.auth_claims = payload
+        return payload
+
+    @staticmethod
+    def get_logout_claims(token: str = Depends(oauth2_scheme), request: Request = None) -> dict:
+        """
+        Dependencia de autenticación de /logout: igual a `get_current_user`, pero un token
+        inválido o expirado responde 400 "Token inválido", como antes de usar la dependencia.
+        """
+        try:
+            token_verifier.decode(token)
+        except JWTError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token inválido")
+        return AuthService.get_current_user(token, request)
 
 class OAuthService:
     """Servicio para gestionar la autenticación con proveedores OAuth"""
@@ -0,0 +1,63 @@
+"""
+Verificación de tokens JWT con memoización.
+
+Un cliente envía el mismo token de acceso en todas sus peticiones hasta que vence, así
+que verificar la firma HS256 y decodificar el payload en cada una repite el mismo
+trabajo. `TokenVerifier` guarda los claims de los últimos `TOKEN_CACHE_SIZE` tokens
+válidos (LRU) hasta su `exp`; solo los tokens con firma correcta entran en la caché.
+La revocación se sigue comprobando en cada petición (ver app.auth.revocation).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from jose import jwt
+from jose.exceptions import ExpiredSignatureError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Tokens verificados que se recuerdan por worker (0 desactiva la caché)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+
+
+class TokenVerifier:
+    """Decodifica tokens JWT recordando los ya verificados (token -> claims)"""
+
+    def __init__(self, secret_key: str, algorithm: str, max_size: int = None, clock=time.time):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.max_size = TOKEN_CACHE_SIZE if max_size is None else max_size
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._claims = OrderedDict()
+
+    def __len__(self):
+        return len(self._claims)
+
+    def clear(self):
+        with self._lock:
+            self._claims.clear()
+
+    def decode(self, token: str) -> dict:
+        """
+        Retorna los claims del token; lanza JWTError si la firma no es válida o expiró.
+        El resultado es una copia, así que el llamador puede modificarlo.
+        """
+        with self._lock:
+            claims = self._claims.get(token)
+            if claims is not None:
+                if claims.get("exp", float("inf")) > self._clock():
+                    self._claims.move_to_end(token)
+                    return dict(claims)
+                del self._claims[token]
+                raise ExpiredSignatureError("Signature has expired.")
+
+        claims = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        if self.max_size > 0:
+            with self._lock:
+                self._claims[token] = claims
+                self._claims.move_to_end(token)
+                while len(self._claims) > self.max_size:
+                    self._claims.popitem(last=False)
+        return dict(claims)
@@ -1,7 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+import bisect
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
@@ -9,11 +13,203 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL" )
 
+# Configuración del pool de conexiones (ajustable por entorno según el número de workers de uvicorn)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Tiempo máximo por sentencia en PostgreSQL (milisegundos, 0 = sin límite)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+
+def _engine_options(url: str) -> dict:
+    """Opciones de create_engine (o create_async_engine) según el motor de la URL"""
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if url.startswith("sqlite"):
+        # SQLite usa su propio pool (sin tamaño ni reciclado configurables)
+        return options
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if DB_STATEMENT_TIMEOUT_MS > 0 and url.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+    elif DB_STATEMENT_TIMEOUT_MS > 0 and url.startswith("postgres"):
+        options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def _async_url(url: str) -> str:
+    """Convierte la URL síncrona en su equivalente con driver asíncrono (asyncpg / aiosqlite)"""
+    scheme, separator, rest = url.partition("://")
+    driver = scheme.split("+", 1)[0]
+    if driver in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg{separator}{rest}"
+    if driver == "sqlite":
+        return f"sqlite+aiosqlite{separator}{rest}"
+    return url
+
+
+class PoolMetrics:
+    """
+    Histograma del tiempo de espera para obtener una conexión del pool.
+    Los límites de los buckets están en milisegundos; el último bucket acumula todo lo demás.
+    """
+
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+            self.total = 0
+            self.sum_ms = 0.0
+            self.max_ms = 0.0
+            self.timeouts = 0
+
+    def observe(self, elapsed_ms: float):
+        index = bisect.bisect_left(self.BUCKETS_MS, elapsed_ms)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += 1
+            self.sum_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def observe_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def _percentile(self, fraction: float):
+        """Límite superior del bucket que contiene el percentil (None si no hay muestras)"""
+        if not self.total:
+            return None
+        target = fraction * self.total
+        accumulated = 0
+        for index, count in enumerate(self.counts):
+            accumulated += count
+            if accumulated >= target:
+                return self.BUCKETS_MS[index] if index < len(self.BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = {f"le_{limit}": count for limit, count in zip(self.BUCKETS_MS, self.counts)}
+            buckets["le_inf"] = self.counts[-1]
+            return {
+                "count": self.total,
+                "timeouts": self.timeouts,
+                "avg_ms": round(self.sum_ms / self.total, 3) if self.total else None,
+                "max_ms": round(self.max_ms, 3),
+                "p50_ms": self._percentile(0.50),
+                "p95_ms": self._percentile(0.95),
+                "p99_ms": self._percentile(0.99),
+                "buckets": buckets,
+            }
+
+
+class _TimedCheckout:
+    """Mezcla para la clase del pool: registra en pool_metrics la espera de cada checkout"""
+
+    __slots__ = ()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            pool_metrics.observe_timeout()
+            raise
+        pool_metrics.observe((time.perf_counter() - start) * 1000)
+        return connection
+
+
+def _timed_pool_class(url: str):
+    """Subclase del pool que el dialecto de la URL usaría por defecto, midiendo cada checkout"""
+    url = make_url(url)
+    pool_class = url.get_dialect().get_pool_class(url)
+    return type(f"Timed{pool_class.__name__}", (_TimedCheckout, pool_class), {})
+
+
 # Configurar la base de datos
-engine = create_engine(DATABASE_URL)
+pool_metrics = PoolMetrics()
+# La conexión se toma al primer uso de la sesión; el pool registra cuánto esperó
+engine = create_engine(DATABASE_URL, poolclass=_timed_pool_class(DATABASE_URL), **_engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+
+def _describe_pool(pool) -> dict:
+    status = {"class": type(pool).__name__}
+    for key, attr in (("size", "size"), ("checked_in", "checkedin"),
+                      ("checked_out", "checkedout"), ("overflow", "overflow")):
+        method = getattr(pool, attr, None)
+        status[key] = method() if callable(method) else None
+    status["max_overflow"] = getattr(pool, "_max_overflow", None)
+    status["timeout"] = pool.timeout() if callable(getattr(pool, "timeout", None)) else None
+    return status
+
+
+def pool_status() -> dict:
+    """Estado actual de los pools de conexiones y del histograma de espera"""
+    status = {"pool": _describe_pool(engine.pool), "checkout_wait": pool_metrics.snapshot()}
+    if _async_engine is not None:
+        status["async_pool"] = _describe_pool(_async_engine.pool)
+    return status
+
+
+def check_database() -> bool:
+    """Ejecuta un SELECT 1 para verificar que la base de datos responde"""
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    return True
+
+
+# Motor asíncrono: se crea al primer uso para que los despliegues sin asyncpg no lo requieran
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (_async_url(DATABASE_URL) if DATABASE_URL else None)
+_async_engine = None
+_async_sessionmaker = None
+_async_lock = threading.Lock()
+
+
+def get_async_engine():
+    """Retorna el AsyncEngine compartido, creándolo la primera vez"""
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        with _async_lock:
+            if _async_engine is None:
+                from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+                _async_engine = create_async_engine(
+                    ASYNC_DATABASE_URL, poolclass=_timed_pool_class(ASYNC_DATABASE_URL),
+                    **_engine_options(ASYNC_DATABASE_URL)
+                )
+                _async_sessionmaker = async_sessionmaker(
+                    bind=_async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+                )
+    return _async_engine
+
+
+def AsyncSessionLocal():
+    """Crea una AsyncSession ligada al motor asíncrono"""
+    get_async_engine()
+    return _async_sessionmaker()
+
+
+# Dependencia para obtener la sesión asíncrona
+async def get_async_db():
+    db = AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
 # Dependencia para obtener la sesión
 def get_db():
     db = SessionLocal()
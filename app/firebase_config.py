@@ -1,35 +1,70 @@
 import json
 import os
-import firebase_admin
-from firebase_admin import credentials, storage
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
-raw = os.getenv("FIREBASE_CREDENTIALS")
-if not raw:
-    raise ValueError("FIREBASE_CREDENTIALS no está definido en .env o está vacío.")
+# El cliente de Firebase se crea en el primer uso (una vez por proceso) para no
+# retrasar el arranque de la aplicación con la lectura de credenciales y la conexión.
+_bucket = None
+_bucket_lock = threading.Lock()
 
-# Eliminar comillas externas si existen
-raw = raw.strip()
-if (raw.startswith("'") and raw.endswith("'")) or (raw.startswith('"') and raw.endswith('"')):
-    raw = raw[1:-1]
 
-# Decodificar caracteres escapados
-unescaped = raw.encode('utf-8').decode('unicode_escape')
-firebase_credentials = json.loads(unescaped)
+def load_credentials() -> dict:
+    """Lee y decodifica FIREBASE_CREDENTIALS"""
+    raw = os.getenv("FIREBASE_CREDENTIALS")
+    if not raw:
+        raise ValueError("FIREBASE_CREDENTIALS no está definido en .env o está vacío.")
 
-# Asegurarse de que la clave privada tenga saltos de línea correctos
-firebase_credentials["private_key"] = firebase_credentials["private_key"].replace("\\n", "\n").strip()
+    # Eliminar comillas externas si existen
+    raw = raw.strip()
+    if (raw.startswith("'") and raw.endswith("'")) or (raw.startswith('"') and raw.endswith('"')):
+        raw = raw[1:-1]
 
-storage_bucket = os.getenv("FIREBASE_STORAGE_BUCKET")
-if not storage_bucket:
-    raise ValueError("FIREBASE_STORAGE_BUCKET no está definido en .env o está vacío.")
-storage_bucket = storage_bucket.strip()
+    # Decodificar caracteres escapados
+    unescaped = raw.encode('utf-8').decode('unicode_escape')
+    firebase_credentials = json.loads(unescaped)
 
-# Inicializar Firebase solo una vez
-if not firebase_admin._apps:
-    cred = credentials.Certificate(firebase_credentials)
-    firebase_admin.initialize_app(cred, {"storageBucket": storage_bucket})
+    # Asegurarse de que la clave privada tenga saltos de línea correctos
+    firebase_credentials["private_key"] = firebase_credentials["private_key"].replace("\\n", "\n").strip()
+    return firebase_credentials
 
-bucket = storage.bucket()
\ No newline at end of file
+
+def load_storage_bucket_name() -> str:
+    storage_bucket = os.getenv("FIREBASE_STORAGE_BUCKET")
+    if not storage_bucket:
+        raise ValueError("FIREBASE_STORAGE_BUCKET no está definido en .env o está vacío.")
+    return storage_bucket.strip()
+
+
+def _create_bucket():
+    import firebase_admin
+    from firebase_admin import credentials, storage
+
+    firebase_credentials = load_credentials()
+    storage_bucket = load_storage_bucket_name()
+
+    # Inicializar Firebase solo una vez
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(firebase_credentials)
+        firebase_admin.initialize_app(cred, {"storageBucket": storage_bucket})
+
+    return storage.bucket()
+
+
+def get_bucket():
+    """Retorna el bucket de Firebase Storage, inicializando Firebase la primera vez"""
+    global _bucket
+    if _bucket is None:
+        with _bucket_lock:
+            if _bucket is None:
+                _bucket = _create_bucket()
+    return _bucket
+
+
+def __getattr__(name):
+    # Compatibilidad con `from app.firebase_config import bucket`
+    if name == "bucket":
+        return get_bucket()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,6 +1,17 @@
 
-from fastapi import FastAPI
-from app.database import Base, engine, SessionLocal
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import FileResponse, JSONResponse
+from app.database import engine, pool_status, check_database
+from app.migrations import check_schema
+from app.maintenance import MaintenanceScheduler
+from app.notifications import NotificationDispatcher
+from app.notifications.hub import notification_hub
+from app.passwords import password_hasher
+from app.storage import LocalStorage, get_storage, verify_signed_path
+from app.uploads import upload_executor
 from app.roles.routes import router as roles_router
 from app.users.routes import router as users_router
 from app.auth.routes import router as auth_router
@@ -8,14 +19,44 @@ from app.property_routes.routes import router as property_lot_router
 from app.my_company.routes import router as my_company_router
 from app.middlewares import setup_middlewares
 from app.exceptions import setup_exception_handlers
-from app.users.models import ensure_default_genders
+
+# Verificar al arrancar que el esquema tenga todas las migraciones (una consulta, sin DDL);
+# si faltan, el worker no arranca
+SCHEMA_CHECK_ON_STARTUP = os.getenv("SCHEMA_CHECK_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if SCHEMA_CHECK_ON_STARTUP:
+        schema = check_schema(engine)
+        if not schema["up_to_date"]:
+            raise RuntimeError(
+                f"El esquema de la base de datos no está actualizado (versión {schema['current']}, "
+                f"última {schema['head']}"
+                + (f": {schema['error']}" if schema.get("error") else "")
+                + "). Ejecute `python -m app.migrations upgrade`."
+            )
+    # Purga periódica de tokens expirados (MAINTENANCE_INTERVAL_SECONDS=0 la desactiva)
+    scheduler = MaintenanceScheduler()
+    scheduler.start()
+    # Entrega del outbox de notificaciones (NOTIFICATION_DISPATCH_INTERVAL_SECONDS=0 la desactiva)
+    dispatcher = NotificationDispatcher()
+    dispatcher.start()
+    yield
+    await notification_hub.stop()
+    await dispatcher.stop()
+    await scheduler.stop()
+    password_hasher.shutdown(wait=False)
+    # Las subidas en curso terminan antes de cerrar el worker; se espera fuera del event loop
+    await asyncio.to_thread(upload_executor.shutdown, wait=True)
 
 # **Configurar FastAPI**
 app = FastAPI( 
     root_path="/disriego/base",
     title="Distrito de Riego API Gateway - Gestion de usuario",
     description="API Gateway para gestión de usuarios, roles y permisos en el sistema de riego",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # **Configurar Middlewares**
@@ -32,10 +73,35 @@ app.include_router(property_lot_router)
 app.include_router(my_company_router)
 
 
-
-Base.metadata.create_all(bind=engine)
-
 # **Endpoint de Salud**
 @app.get("/health", tags=["Health"])
 async def health_check():
     return {"status": "ok", "message": "API funcionando correctamente"}
+
+@app.get("/health/db", tags=["Health"])
+def health_db():
+    """Estado de la base de datos: pool de conexiones y tiempos de espera por petición"""
+    status = pool_status()
+    try:
+        check_database()
+    except Exception as e:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "error", "message": f"Base de datos no disponible: {str(e)}", **status}
+        )
+    return {"status": "ok", **status}
+
+
+# **Archivos con URL firmada (almacenamiento local)**
+@app.get("/storage/{path:path}", tags=["Storage"])
+def get_signed_file(path: str, expires: int, signature: str):
+    """Sirve un archivo de LocalStorage si la URL generada por `signed_url` es válida y no expiró"""
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=404, detail={"success": False, "data": "Archivo no encontrado."})
+    if not verify_signed_path(path, expires, signature):
+        raise HTTPException(status_code=403, detail={"success": False, "data": "URL firmada inválida o expirada."})
+    try:
+        return FileResponse(storage.local_path(path))
+    except (FileNotFoundError, ValueError):
+        raise HTTPException(status_code=404, detail={"success": False, "data": "Archivo no encontrado."})
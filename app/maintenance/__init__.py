@@ -0,0 +1,129 @@
+"""
+Tareas de mantenimiento de la base de datos.
+
+`purge_expired` elimina los tokens expirados (y los de pre-registro y activación ya
+usados) en lotes acotados: cada lote es una transacción corta, y en PostgreSQL las
+filas bloqueadas por otra transacción se omiten (SKIP LOCKED) y `lock_timeout` evita
+esperas largas. La aplicación lo ejecuta cada `MAINTENANCE_INTERVAL_SECONDS`; también
+puede ejecutarse a mano o desde cron:
+
+    python -m app.maintenance purge
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import delete, or_, select, text
+from sqlalchemy.engine import Engine
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Intervalo del planificador en la aplicación (0 lo desactiva)
+MAINTENANCE_INTERVAL_SECONDS = float(os.getenv("MAINTENANCE_INTERVAL_SECONDS", "3600"))
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "1000"))
+PURGE_LOCK_TIMEOUT_MS = int(os.getenv("PURGE_LOCK_TIMEOUT_MS", "2000"))
+
+# Clave del advisory lock de PostgreSQL que evita que varios workers purguen a la vez
+_PURGE_LOCK_KEY = 726_310_014
+
+
+def _purge_targets(now: datetime) -> dict:
+    """Tabla -> condición de las filas que ya no se usan"""
+    from app.users.models import ActivationToken, PasswordReset, PreRegisterToken, RefreshToken, RevokedToken
+
+    return {
+        RevokedToken.__table__: RevokedToken.expires_at < now,
+        PasswordReset.__table__: PasswordReset.expiration < now,
+        PreRegisterToken.__table__: or_(PreRegisterToken.expires_at < now, PreRegisterToken.used == True),
+        ActivationToken.__table__: or_(ActivationToken.expires_at < now, ActivationToken.used == True),
+        # Los ya usados se conservan hasta expirar para detectar su reuso
+        RefreshToken.__table__: or_(RefreshToken.expires_at < now, RefreshToken.revoked_at.isnot(None)),
+    }
+
+
+def purge_table(engine: Engine, table, condition, batch_size: int = None) -> int:
+    """Elimina en lotes las filas de `table` que cumplen `condition`; retorna cuántas eliminó"""
+    batch_size = batch_size or PURGE_BATCH_SIZE
+    postgres = engine.dialect.name == "postgresql"
+    total = 0
+    while True:
+        ids = select(table.c.id).where(condition).limit(batch_size)
+        if postgres:
+            ids = ids.with_for_update(skip_locked=True)
+        with engine.begin() as connection:
+            if postgres:
+                connection.execute(text(f"SET LOCAL lock_timeout = {int(PURGE_LOCK_TIMEOUT_MS)}"))
+            deleted = connection.execute(delete(table).where(table.c.id.in_(ids.scalar_subquery()))).rowcount
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+def purge_expired(engine: Engine = None, batch_size: int = None, now: datetime = None) -> Dict[str, int]:
+    """Purga todas las tablas de tokens; retorna las filas eliminadas por tabla"""
+    if engine is None:
+        from app.database import engine
+    now = now or datetime.utcnow()
+    return {
+        table.name: purge_table(engine, table, condition, batch_size)
+        for table, condition in _purge_targets(now).items()
+    }
+
+
+def run_purge(engine: Engine = None, batch_size: int = None):
+    """
+    Ejecuta la purga si ningún otro proceso la está ejecutando.
+    Retorna los conteos por tabla, o None si otro proceso tiene el lock.
+    """
+    if engine is None:
+        from app.database import engine
+    if engine.dialect.name != "postgresql":
+        return purge_expired(engine, batch_size)
+    with engine.connect() as connection:
+        if not connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _PURGE_LOCK_KEY}).scalar():
+            return None
+        try:
+            return purge_expired(engine, batch_size)
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _PURGE_LOCK_KEY})
+            connection.commit()
+
+
+class MaintenanceScheduler:
+    """Ejecuta la purga periódicamente en un hilo, sin bloquear el event loop"""
+
+    def __init__(self, interval_seconds: float = None, engine: Engine = None):
+        self.interval_seconds = MAINTENANCE_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        self.engine = engine
+        self.last_result = None
+        self._task = None
+
+    def start(self):
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                result = await asyncio.to_thread(run_purge, self.engine)
+            except Exception:
+                logger.exception("Falló la purga de tokens expirados")
+                continue
+            if result is not None:
+                self.last_result = result
+                logger.info("Purga de tokens expirados: %s", result)
@@ -0,0 +1,34 @@
+"""
+CLI de mantenimiento.
+
+    python -m app.maintenance purge [--batch-size N]
+"""
+import argparse
+import logging
+import sys
+
+from app.database import engine
+from app.maintenance import run_purge
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.maintenance", description="Mantenimiento de la base de datos")
+    commands = parser.add_subparsers(dest="command", required=True)
+    purge_parser = commands.add_parser("purge", help="Elimina los tokens expirados o usados")
+    purge_parser.add_argument("--batch-size", type=int, default=None, help="Filas por transacción")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.command == "purge":
+        result = run_purge(engine, batch_size=args.batch_size)
+        if result is None:
+            print("Otro proceso está ejecutando la purga")
+            return 1
+        for table, deleted in result.items():
+            print(f"{table:<22} {deleted:8d} filas eliminadas")
+        print(f"{'total':<22} {sum(result.values()):8d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+Migraciones versionadas del esquema.
+
+Cada script de `app/migrations/versions` se llama `NNNN_descripcion.py` y define
+`upgrade(connection)`. La versión aplicada se registra en la tabla `schema_version`
+dentro de la misma transacción que la migración, y en PostgreSQL un advisory lock
+evita que dos procesos la apliquen a la vez.
+
+Los scripts no importan los modelos ni funciones de la aplicación: declaran las tablas,
+columnas e índices tal como eran en su versión, para que el resultado no cambie cuando
+cambien los modelos. Una migración con `TRANSACTIONAL = False` corre en PostgreSQL en
+autocommit (con un advisory lock de sesión) para crear índices con `CREATE INDEX
+CONCURRENTLY` sin bloquear las escrituras de tablas que ya tienen datos; ver `create_index`.
+
+Las migraciones se ejecutan fuera del arranque de los workers:
+
+    python -m app.migrations upgrade
+"""
+import importlib
+import logging
+import pkgutil
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Sequence
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.migrations import versions as _versions_package
+
+logger = logging.getLogger(__name__)
+
+# Clave del advisory lock de PostgreSQL que serializa las migraciones
+_MIGRATION_LOCK_KEY = 726_310_011
+_VERSION_FILE_PATTERN = re.compile(r"^(\d{4})_(\w+)$")
+
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    description: str
+    upgrade: Callable[[Connection], None]
+    transactional: bool = True
+
+
+def load_migrations(package=_versions_package) -> List[Migration]:
+    """Carga los scripts de migración ordenados por versión"""
+    migrations = []
+    for module_info in pkgutil.iter_modules(package.__path__):
+        match = _VERSION_FILE_PATTERN.match(module_info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{package.__name__}.{module_info.name}")
+        description = (module.__doc__ or match.group(2).replace("_", " ")).strip().splitlines()[0]
+        migrations.append(Migration(
+            int(match.group(1)), module_info.name, description, module.upgrade,
+            getattr(module, "TRANSACTIONAL", True),
+        ))
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Versiones de migración duplicadas: {versions}")
+    return migrations
+
+
+def _lock(connection: Connection):
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _MIGRATION_LOCK_KEY})
+
+
+@contextmanager
+def _migration_connection(engine: Engine, migration: Migration):
+    """
+    Conexión para aplicar una migración: una transacción con advisory lock de transacción,
+    o en PostgreSQL, para las migraciones no transaccionales, autocommit con advisory lock
+    de sesión (CREATE INDEX CONCURRENTLY no puede correr dentro de una transacción).
+    """
+    if migration.transactional or engine.dialect.name != "postgresql":
+        with engine.begin() as connection:
+            _lock(connection)
+            yield connection
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _MIGRATION_LOCK_KEY})
+        try:
+            yield connection
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _MIGRATION_LOCK_KEY})
+
+
+def _applied_version(connection: Connection) -> int:
+    return connection.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc()).limit(1)).scalar() or 0
+
+
+def current_version(engine: Engine) -> Optional[int]:
+    """Versión aplicada del esquema, o None si la base no tiene la tabla schema_version"""
+    with engine.connect() as connection:
+        if not inspect(connection).has_table(schema_version.name):
+            return None
+        return _applied_version(connection)
+
+
+def head_version(migrations: List[Migration] = None) -> int:
+    migrations = load_migrations() if migrations is None else migrations
+    return migrations[-1].version if migrations else 0
+
+
+def upgrade(engine: Engine, target: int = None, migrations: List[Migration] = None) -> List[int]:
+    """
+    Aplica las migraciones pendientes hasta `target` (por defecto la última).
+    Cada migración corre en su propia transacción junto con el registro en schema_version
+    (salvo las no transaccionales en PostgreSQL, que deben poder repetirse si fallan a medias).
+    Retorna las versiones aplicadas.
+    """
+    migrations = load_migrations() if migrations is None else migrations
+    with engine.begin() as connection:
+        _lock(connection)
+        schema_version.create(connection, checkfirst=True)
+
+    applied = []
+    for migration in migrations:
+        if target is not None and migration.version > target:
+            break
+        with _migration_connection(engine, migration) as connection:
+            # Se vuelve a leer con el lock tomado por si otro proceso ya la aplicó
+            if migration.version <= _applied_version(connection):
+                continue
+            logger.info("Aplicando migración %s", migration.name)
+            migration.upgrade(connection)
+            connection.execute(schema_version.insert().values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=datetime.now(timezone.utc),
+            ))
+        applied.append(migration.version)
+    return applied
+
+
+def history(engine: Engine) -> list:
+    """Migraciones registradas en schema_version"""
+    with engine.connect() as connection:
+        if not inspect(connection).has_table(schema_version.name):
+            return []
+        return [dict(row) for row in connection.execute(select(schema_version).order_by(schema_version.c.version)).mappings()]
+
+
+def check_schema(engine: Engine) -> dict:
+    """
+    Verificación rápida para el arranque: una sola consulta a schema_version, sin
+    introspección del resto de tablas.
+    """
+    head = head_version()
+    try:
+        with engine.connect() as connection:
+            current = _applied_version(connection)
+    except Exception as e:
+        return {"current": None, "head": head, "up_to_date": False, "error": str(e)}
+    return {"current": current, "head": head, "up_to_date": current >= head}
+
+
+# Utilidades para escribir migraciones idempotentes
+
+def has_table(connection: Connection, table: str) -> bool:
+    return inspect(connection).has_table(table)
+
+
+def has_column(connection: Connection, table: str, column: str) -> bool:
+    return any(existing["name"] == column for existing in inspect(connection).get_columns(table))
+
+
+def has_index(connection: Connection, table: str, index: str) -> bool:
+    return any(existing["name"] == index for existing in inspect(connection).get_indexes(table))
+
+
+def create_index(connection: Connection, name: str, table: str, columns: Sequence[str], unique: bool = False):
+    """
+    Crea el índice si no existe. En PostgreSQL, sobre una conexión en autocommit (migración
+    con `TRANSACTIONAL = False`), usa CREATE INDEX CONCURRENTLY: no bloquea las escrituras
+    de la tabla mientras se construye. Si una construcción anterior se interrumpió, el
+    índice quedó inválido y se vuelve a crear.
+    """
+    quote = connection.dialect.identifier_preparer.quote
+    concurrently = (
+        connection.dialect.name == "postgresql"
+        and connection.get_execution_options().get("isolation_level") == "AUTOCOMMIT"
+    )
+    if concurrently:
+        invalid = connection.execute(text(
+            "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+            "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+        ), {"name": name}).first()
+        if invalid:
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {quote(name)}"))
+    connection.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX {'CONCURRENTLY ' if concurrently else ''}"
+        f"IF NOT EXISTS {quote(name)} ON {quote(table)} ({', '.join(quote(column) for column in columns)})"
+    ))
@@ -0,0 +1,38 @@
+"""
+CLI de migraciones.
+
+    python -m app.migrations upgrade [--to N]
+    python -m app.migrations current
+    python -m app.migrations history
+"""
+import argparse
+import logging
+import sys
+
+from app.database import engine
+from app.migrations import current_version, head_version, history, upgrade
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description="Migraciones del esquema")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = commands.add_parser("upgrade", help="Aplica las migraciones pendientes")
+    upgrade_parser.add_argument("--to", type=int, default=None, help="Versión destino (por defecto la última)")
+    commands.add_parser("current", help="Muestra la versión aplicada y la última disponible")
+    commands.add_parser("history", help="Lista las migraciones aplicadas")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.command == "upgrade":
+        applied = upgrade(engine, target=args.to)
+        print(f"Migraciones aplicadas: {applied}" if applied else "El esquema ya está actualizado")
+    elif args.command == "current":
+        print(f"Versión actual: {current_version(engine)} (última disponible: {head_version()})")
+    elif args.command == "history":
+        for row in history(engine):
+            print(f"{row['version']:04d}  {row['applied_at']}  {row['description']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+"""Esquema inicial (tablas de los modelos existentes)"""
+from sqlalchemy import Boolean, Column, Date, DateTime, Float, ForeignKey, Integer, MetaData, String, Table
+
+# Tablas tal como eran en esta versión; no se importan los modelos actuales
+metadata = MetaData()
+
+Table(
+    "color_palette",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("primary_color", String(45), nullable=False),
+    Column("secondary_color", String(45), nullable=False),
+    Column("tertiary_color", String(45), nullable=False),
+    Column("primary_text", String(45), nullable=False),
+    Column("secondary_text", String(45), nullable=False),
+    Column("background_color", String(45), nullable=False),
+    Column("border_color", String(45), nullable=False),
+)
+
+Table(
+    "gender",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False),
+)
+
+Table(
+    "password_resets",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, index=True),
+    Column("token", String, unique=True, index=True),
+    Column("expiration", DateTime),
+)
+
+Table(
+    "payment_interval",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(128), nullable=False),
+    Column("interval_days", Integer, nullable=False),
+)
+
+Table(
+    "permission",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, unique=True, index=True),
+    Column("description", String, index=True),
+    Column("category", String, index=True),
+)
+
+Table(
+    "revoked_tokens",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("token", String, nullable=False, unique=True),
+    Column("expires_at", DateTime, nullable=False),
+)
+
+Table(
+    "status_user",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False),
+    Column("description", String, nullable=False),
+)
+
+Table(
+    "type_document",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False),
+)
+
+Table(
+    "vars",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String),
+)
+
+Table(
+    "company",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(128), nullable=False),
+    Column("nit", Integer, nullable=False),
+    Column("email", String(50), nullable=False),
+    Column("phone", String(30), nullable=False),
+    Column("country", String(128), nullable=False),
+    Column("state", String(128), nullable=False),
+    Column("city", String(128), nullable=False),
+    Column("address", String(128), nullable=False),
+    Column("logo", String(255), nullable=False),
+    Column("color_palette_id", Integer, ForeignKey("color_palette.id"), nullable=False),
+)
+
+Table(
+    "digital_certificate",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("serial_number", Integer, nullable=False),
+    Column("start_date", Date, nullable=False),
+    Column("expiration_date", Date, nullable=False),
+    Column("attached", String(255), nullable=False),
+    Column("nit", Integer, nullable=False),
+    Column("status_id", Integer, ForeignKey("vars.id"), nullable=False),
+)
+
+Table(
+    "property",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False),
+    Column("longitude", Float, nullable=False),
+    Column("latitude", Float, nullable=False),
+    Column("extension", Float, nullable=False),
+    Column("real_estate_registration_number", Integer, nullable=False),
+    Column("public_deed", String),
+    Column("freedom_tradition_certificate", String),
+    Column("State", Integer, ForeignKey("vars.id"), nullable=False),
+)
+
+Table(
+    "rol",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, unique=True, index=True),
+    Column("description", String, index=True),
+    Column("status", Integer, ForeignKey("vars.id"), nullable=False),
+)
+
+Table(
+    "type_crop",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(128), nullable=False),
+    Column("harvest_time", Integer, nullable=False),
+    Column("payment_interval_id", Integer, ForeignKey("payment_interval.id"), nullable=False),
+    Column("state_id", Integer, ForeignKey("vars.id"), nullable=False),
+)
+
+Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True),
+    Column("password", String),
+    Column("password_salt", String),
+    Column("name", String),
+    Column("email_status", Boolean),
+    Column("document_number", Integer),
+    Column("date_issuance_document", DateTime),
+    Column("type_person_id", Integer),
+    Column("birthday", DateTime),
+    Column("gender_id", Integer, ForeignKey("gender.id")),
+    Column("first_last_name", String),
+    Column("second_last_name", String),
+    Column("address", String),
+    Column("profile_picture", String),
+    Column("phone", String),
+    Column("country", String),
+    Column("department", String),
+    Column("city", Integer),
+    Column("first_login_complete", Boolean),
+    Column("type_document_id", Integer, ForeignKey("type_document.id")),
+    Column("status_id", Integer, ForeignKey("status_user.id")),
+    Column("last_pre_register_attempt", DateTime),
+    Column("pre_register_attempts", Integer),
+)
+
+Table(
+    "activation_tokens",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("token", String, nullable=False, unique=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("created_at", DateTime),
+    Column("expires_at", DateTime, nullable=False),
+    Column("used", Boolean),
+)
+
+Table(
+    "company_certificate",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("company_id", Integer, ForeignKey("company.id"), nullable=False),
+    Column("digital_certificate_id", Integer, ForeignKey("digital_certificate.id"), nullable=False),
+)
+
+Table(
+    "company_user",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("company_id", Integer, ForeignKey("company.id")),
+    Column("user_id", Integer, ForeignKey("users.id")),
+)
+
+Table(
+    "lot",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False),
+    Column("longitude", Float, nullable=False),
+    Column("latitude", Float, nullable=False),
+    Column("extension", Float, nullable=False),
+    Column("real_estate_registration_number", Integer, nullable=False),
+    Column("public_deed", String),
+    Column("freedom_tradition_certificate", String),
+    Column("payment_interval", Integer, ForeignKey("payment_interval.id")),
+    Column("type_crop_id", Integer, ForeignKey("type_crop.id")),
+    Column("planting_date", Date),
+    Column("estimated_harvest_date", Date),
+    Column("State", Integer, ForeignKey("vars.id"), nullable=False),
+)
+
+Table(
+    "notifications",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("title", String, nullable=False),
+    Column("message", String, nullable=False),
+    Column("type", String, nullable=False),
+    Column("read", Boolean),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "pre_register_tokens",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("token", String, nullable=False, unique=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("created_at", DateTime),
+    Column("expires_at", DateTime, nullable=False),
+    Column("used", Boolean),
+)
+
+Table(
+    "rol_permission",
+    metadata,
+    Column("rol_id", Integer, ForeignKey("rol.id"), primary_key=True),
+    Column("permission_id", Integer, ForeignKey("permission.id"), primary_key=True),
+)
+
+Table(
+    "social_accounts",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("provider", String, nullable=False),
+    Column("provider_user_id", String, nullable=False),
+    Column("email", String, nullable=False),
+    Column("access_token", String),
+    Column("refresh_token", String),
+    Column("expires_at", DateTime),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "user_property",
+    metadata,
+    Column("property_id", Integer, ForeignKey("property.id"), primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+)
+
+Table(
+    "user_rol",
+    metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("rol_id", Integer, ForeignKey("rol.id"), primary_key=True),
+)
+
+Table(
+    "property_lot",
+    metadata,
+    Column("property_id", Integer, ForeignKey("property.id"), primary_key=True),
+    Column("lot_id", Integer, ForeignKey("lot.id"), primary_key=True),
+)
+
+
+def upgrade(connection):
+    # checkfirst: en bases creadas antes de las migraciones (con create_all) no hace nada
+    metadata.create_all(bind=connection, checkfirst=True)
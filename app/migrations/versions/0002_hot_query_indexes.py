@@ -0,0 +1,22 @@
+"""Índices secundarios para las columnas que filtran las consultas más frecuentes"""
+from app.migrations import create_index
+
+# Tablas con datos: en PostgreSQL los índices se crean con CREATE INDEX CONCURRENTLY
+TRANSACTIONAL = False
+
+# (tabla, índice, columnas)
+INDEXES = (
+    ("property", "ix_property_real_estate_registration_number", ("real_estate_registration_number",)),
+    ("lot", "ix_lot_real_estate_registration_number", ("real_estate_registration_number",)),
+    ("users", "ix_users_document_number_type_document_id", ("document_number", "type_document_id")),
+    ("notifications", "ix_notifications_user_id_created_at", ("user_id", "created_at")),
+    ("notifications", "ix_notifications_user_id_read", ("user_id", "read")),
+    ("user_property", "ix_user_property_user_id", ("user_id",)),
+    ("property_lot", "ix_property_lot_lot_id", ("lot_id",)),
+    ("revoked_tokens", "ix_revoked_tokens_expires_at", ("expires_at",)),
+)
+
+
+def upgrade(connection):
+    for table_name, index_name, columns in INDEXES:
+        create_index(connection, index_name, table_name, columns)
@@ -0,0 +1,19 @@
+"""Reemplaza los JWT completos de revoked_tokens por su huella SHA-256"""
+import hashlib
+import re
+
+from sqlalchemy import text
+
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+_BATCH_SIZE = 1000
+
+
+def upgrade(connection):
+    rows = connection.execute(text("SELECT id, token FROM revoked_tokens")).all()
+    pending = [
+        {"row_id": row.id, "digest": hashlib.sha256(row.token.encode()).hexdigest()}
+        for row in rows if not _DIGEST.match(row.token)
+    ]
+    update = text("UPDATE revoked_tokens SET token = :digest WHERE id = :row_id")
+    for start in range(0, len(pending), _BATCH_SIZE):
+        connection.execute(update, pending[start:start + _BATCH_SIZE])
@@ -0,0 +1,16 @@
+"""Índices de expiración para la purga de tokens"""
+from app.migrations import create_index
+
+TRANSACTIONAL = False
+
+# (tabla, índice, columnas)
+INDEXES = (
+    ("password_resets", "ix_password_resets_expiration", ("expiration",)),
+    ("pre_register_tokens", "ix_pre_register_tokens_expires_at", ("expires_at",)),
+    ("activation_tokens", "ix_activation_tokens_expires_at", ("expires_at",)),
+)
+
+
+def upgrade(connection):
+    for table_name, index_name, columns in INDEXES:
+        create_index(connection, index_name, table_name, columns)
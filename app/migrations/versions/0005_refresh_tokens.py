@@ -0,0 +1,22 @@
+"""Tabla de tokens de refresco"""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+
+metadata = MetaData()
+# Solo la clave primaria, para resolver la llave foránea
+Table("users", metadata, Column("id", Integer, primary_key=True))
+refresh_tokens = Table(
+    "refresh_tokens",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("token_hash", String(64), nullable=False, unique=True, index=True),
+    Column("family_id", String(32), nullable=False, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+    Column("created_at", DateTime),
+    Column("expires_at", DateTime, nullable=False, index=True),
+    Column("used_at", DateTime),
+    Column("revoked_at", DateTime),
+)
+
+
+def upgrade(connection):
+    refresh_tokens.create(bind=connection, checkfirst=True)
@@ -0,0 +1,20 @@
+"""Outbox de notificaciones"""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+
+metadata = MetaData()
+# Solo la clave primaria, para resolver la llave foránea
+Table("users", metadata, Column("id", Integer, primary_key=True))
+notification_outbox = Table(
+    "notification_outbox",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("title", String, nullable=False),
+    Column("message", String, nullable=False),
+    Column("type", String, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+)
+
+
+def upgrade(connection):
+    notification_outbox.create(bind=connection, checkfirst=True)
@@ -0,0 +1,15 @@
+"""Contador de notificaciones sin leer por usuario"""
+from sqlalchemy import text
+
+from app.migrations import has_column
+
+
+def upgrade(connection):
+    # Las bases en las que 0001 se aplicó con create_all de los modelos ya tienen la columna
+    if not has_column(connection, "users", "unread_notifications"):
+        connection.execute(text("ALTER TABLE users ADD COLUMN unread_notifications INTEGER NOT NULL DEFAULT 0"))
+    connection.execute(text(
+        "UPDATE users SET unread_notifications = ("
+        "SELECT COUNT(*) FROM notifications"
+        " WHERE notifications.user_id = users.id AND notifications.read = false)"
+    ))
@@ -0,0 +1,15 @@
+"""Índices para ordenar el listado de usuarios por nombre y por email"""
+from app.migrations import create_index
+
+TRANSACTIONAL = False
+
+# (tabla, índice, columnas)
+INDEXES = (
+    ("users", "ix_users_name_id", ("name", "id")),
+    ("users", "ix_users_email_id", ("email", "id")),
+)
+
+
+def upgrade(connection):
+    for table_name, index_name, columns in INDEXES:
+        create_index(connection, index_name, table_name, columns)
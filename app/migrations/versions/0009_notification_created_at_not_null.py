@@ -0,0 +1,48 @@
+"""Fecha de creación obligatoria en las notificaciones"""
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, inspect, text
+
+from app.migrations import create_index
+
+# Las filas sin fecha toman la de la notificación anterior (los ids crecen con el tiempo)
+BACKFILL = (
+    "UPDATE notifications SET created_at = COALESCE("
+    "(SELECT previous.created_at FROM notifications AS previous "
+    "WHERE previous.id < notifications.id AND previous.created_at IS NOT NULL "
+    "ORDER BY previous.id DESC LIMIT 1), CURRENT_TIMESTAMP) "
+    "WHERE created_at IS NULL"
+)
+
+metadata = MetaData()
+# Solo la clave primaria, para resolver la llave foránea
+Table("users", metadata, Column("id", Integer, primary_key=True))
+# SQLite no puede cambiar la nulabilidad de una columna: se copia a una tabla nueva
+rebuilt = Table(
+    "notifications_rebuilt",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("title", String, nullable=False),
+    Column("message", String, nullable=False),
+    Column("type", String, nullable=False),
+    Column("read", Boolean, nullable=True),
+    Column("created_at", DateTime, nullable=False),
+)
+
+
+def upgrade(connection):
+    connection.execute(text(BACKFILL))
+    if connection.dialect.name != "sqlite":
+        connection.execute(text("ALTER TABLE notifications ALTER COLUMN created_at SET NOT NULL"))
+        return
+    inspector = inspect(connection)
+    created_at = next(column for column in inspector.get_columns("notifications") if column["name"] == "created_at")
+    if not created_at["nullable"]:
+        return
+    indexes = inspector.get_indexes("notifications")
+    columns = ", ".join(column.name for column in rebuilt.columns)
+    rebuilt.create(bind=connection)
+    connection.execute(text(f"INSERT INTO notifications_rebuilt ({columns}) SELECT {columns} FROM notifications"))
+    connection.execute(text("DROP TABLE notifications"))
+    connection.execute(text("ALTER TABLE notifications_rebuilt RENAME TO notifications"))
+    for index in indexes:
+        create_index(connection, index["name"], "notifications", index["column_names"], bool(index["unique"]))
@@ -0,0 +1,25 @@
+"""Permiso para crear notificaciones, otorgado al rol Administrador"""
+from sqlalchemy import text
+
+PERMISSION = {
+    "name": "crear_notificaciones",
+    "description": "Crear notificaciones para los usuarios",
+    "category": "Notificaciones",
+}
+# Rol que creaba notificaciones antes de exigir el permiso
+ADMIN_ROLE_NAME = "Administrador"
+
+
+def upgrade(connection):
+    connection.execute(text(
+        "INSERT INTO permission (name, description, category) "
+        "SELECT :name, :description, :category "
+        "WHERE NOT EXISTS (SELECT 1 FROM permission WHERE name = :name)"
+    ), PERMISSION)
+    connection.execute(text(
+        "INSERT INTO rol_permission (rol_id, permission_id) "
+        "SELECT rol.id, permission.id FROM rol, permission "
+        "WHERE rol.name = :role AND permission.name = :name AND NOT EXISTS ("
+        "SELECT 1 FROM rol_permission AS granted "
+        "WHERE granted.rol_id = rol.id AND granted.permission_id = permission.id)"
+    ), {"role": ADMIN_ROLE_NAME, "name": PERMISSION["name"]})
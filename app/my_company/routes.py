@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, File, Form, UploadFile, HTTPException, status
 from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, get_async_db
 from app.my_company import schemas, services
 from app.my_company.models import Company, ColorPalette, DigitalCertificate, TypeCrop, PaymentInterval
 from typing import Optional, List
@@ -12,12 +13,12 @@ router = APIRouter(prefix="/my-company", tags=["Mi Empresa"])
 # Rutas para información de la empresa
 @router.get("/company", summary="Obtener información de la empresa")
 async def get_company_info(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtiene la información actual de la empresa.
     """
-    company_service = services.CompanyService(db)
+    company_service = services.AsyncCompanyService(db)
     return await company_service.get_company_info()
 
 @router.post("/company", summary="Crear o actualizar información de la empresa")
@@ -153,12 +154,12 @@ def delete_color_palette(
 # Rutas para certificados digitales
 @router.get("/certificates", summary="Listar todos los certificados digitales")
 async def list_certificates(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lista todos los certificados digitales registrados.
     """
-    certificate_service = services.CertificateService(db)
+    certificate_service = services.AsyncCompanyService(db)
     return await certificate_service.get_certificates()
 
 @router.get("/certificates/{certificate_id}", summary="Obtener un certificado digital")
@@ -4,46 +4,44 @@ from datetime import datetime
 from fastapi import HTTPException, UploadFile, File
 from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from app.my_company.models import (
     Company, ColorPalette, DigitalCertificate, 
     CompanyCertificate, TypeCrop, PaymentInterval, CompanyUser
 )
 from app.my_company import schemas
-from app.firebase_config import bucket
+from app.uploads import upload_executor, UploadTooLarge
+from app.roles.models import Vars
+from app.serializers import encoder_for
 import logging
 
 
-
 class BaseService:
     """Clase base para servicios con funcionalidades comunes utilizando Firebase Storage."""
 
     async def save_file(self, file: UploadFile, directory: str = "uploads") -> str:
         """Sube un archivo a Firebase Storage y retorna su URL pública.
         
-        Se genera un nombre único para evitar conflictos y se sube el contenido del archivo.
+        Se genera un nombre único para evitar conflictos y la subida se ejecuta en el
+        pool de almacenamiento (app.uploads) para no bloquear el event loop.
         """
         try:
-            unique_filename = f"{uuid.uuid4()}{os.path.splitext(file.filename)[1]}"
-            blob_path = f"{directory}/{unique_filename}"
-            blob = bucket.blob(blob_path)
-            file_content = await file.read()
-            blob.upload_from_string(file_content, content_type=file.content_type)
-            # Hacer el blob público para obtener una URL accesible (opcional)
-            blob.make_public()
-            return blob.public_url  # Retorna la URL pública del archivo
+            return await upload_executor.upload_file(file, directory)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al subir el archivo a Firebase: {str(e)}")
 
-    def delete_file(self, file_identifier: str):
+    async def delete_file(self, file_identifier: str):
         """Elimina un archivo de Firebase Storage.
         
         Se asume que en la base de datos se guarda el blob_path o blob.name.
         """
         try:
-            blob = bucket.blob(file_identifier)
-            blob.delete()
+            await upload_executor.delete(file_identifier)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al eliminar el archivo de Firebase: {str(e)}")
         
@@ -54,10 +52,11 @@ class CompanyService(BaseService):
     def __init__(self, db: Session):
         self.db = db
     
-    async def get_company_info(self):
+    def get_company_info(self):
         """Obtener la información de la empresa, incluyendo el certificado vigente (número de serie)"""
         try:
-            company = self.db.query(Company).first()
+            company_encoder = encoder_for(Company)
+            company = self.db.execute(select(*company_encoder.columns).limit(1)).first()
             if not company:
                 return JSONResponse(
                     status_code=404,
@@ -69,25 +68,25 @@ class CompanyService(BaseService):
                 )
             
             # Convertir la información de la empresa a diccionario
-            company_data = jsonable_encoder(company)
+            company_data = company_encoder.encode(company)
             
             # Obtener el certificado vigente (si existe)
             now = datetime.utcnow()
-            company_cert = (
-                self.db.query(CompanyCertificate)
-                .join(DigitalCertificate)
-                .filter(
-                    CompanyCertificate.company_id == company.id,
+            company_cert = self.db.execute(
+                select(
+                    DigitalCertificate.serial_number,
+                    DigitalCertificate.id.label("digital_certificate_id")
+                )
+                .join(CompanyCertificate, CompanyCertificate.digital_certificate_id == DigitalCertificate.id)
+                .where(
+                    CompanyCertificate.company_id == company_data["id"],
                     DigitalCertificate.start_date <= now,
                     DigitalCertificate.expiration_date > now
                 )
-                .first()
-            )
+                .limit(1)
+            ).mappings().first()
             if company_cert:
-                company_data["certificate"] = {
-                    "serial_number": company_cert.digital_certificate.serial_number,
-                    "digital_certificate_id": company_cert.digital_certificate.id
-                }
+                company_data["certificate"] = dict(company_cert)
             else:
                 company_data["certificate"] = None
 
@@ -120,7 +119,7 @@ class CompanyService(BaseService):
         # Si la empresa tiene un logo anterior, eliminarlo del Firebase Storage
         if company.logo:
             try:
-                self.delete_file(company.logo)
+                await self.delete_file(company.logo)
             except Exception as e:
                 # Puedes optar por continuar si falla la eliminación
                 logging.warning(f"No se pudo eliminar el logo anterior: {str(e)}")
@@ -223,6 +222,10 @@ class CompanyService(BaseService):
                         "data": jsonable_encoder(new_company)
                     }
                 )
+        except HTTPException:
+            # Errores con código propio (p. ej. 413 al subir un archivo demasiado grande)
+            self.db.rollback()
+            raise
         except IntegrityError as e:
             self.db.rollback()
             return JSONResponse(
@@ -522,16 +525,16 @@ class CertificateService(BaseService):
     def __init__(self, db: Session):
         self.db = db
     
-    async def get_certificates(self):
+    def get_certificates(self):
         """Obtener todos los certificados digitales incluyendo el nombre del estado"""
         try:
-            certificates = self.db.query(DigitalCertificate).all()
-            certificates_list = []
-            for certificate in certificates:
-                cert_data = jsonable_encoder(certificate)
-                # Usamos la relación para obtener el nombre del estado
-                cert_data["nombre_estado"] = certificate.status.name if certificate.status else None
-                certificates_list.append(cert_data)
+            # El nombre del estado se obtiene en la misma consulta (sin cargar la relación por fila)
+            cert_encoder = encoder_for(DigitalCertificate)
+            certificates = self.db.execute(
+                select(*cert_encoder.columns, Vars.name.label("nombre_estado"))
+                .outerjoin(Vars, DigitalCertificate.status_id == Vars.id)
+            ).all()
+            certificates_list = cert_encoder.encode_all(certificates)
                 
             return JSONResponse(
                 status_code=200,
@@ -666,6 +669,10 @@ class CertificateService(BaseService):
                     "data": jsonable_encoder(new_certificate)
                 }
             )
+        except HTTPException:
+            # Errores con código propio (p. ej. 413 al subir un archivo demasiado grande)
+            self.db.rollback()
+            raise
         except IntegrityError as e:
             self.db.rollback()
             return JSONResponse(
@@ -723,6 +730,10 @@ class CertificateService(BaseService):
                     "data": jsonable_encoder(certificate)
                 }
             )
+        except HTTPException:
+            # Errores con código propio (p. ej. 413 al subir un archivo demasiado grande)
+            self.db.rollback()
+            raise
         except IntegrityError as e:
             self.db.rollback()
             return JSONResponse(
@@ -846,13 +857,17 @@ class TypeCropService:
     def get_all_types(self):
         """Obtener todos los tipos de cultivo incluyendo el nombre del estado y del intervalo de pago"""
         try:
-            types = self.db.query(TypeCrop).all()
-            types_list = []
-            for t in types:
-                t_data = jsonable_encoder(t)
-                t_data["nombre_estado"] = t.state.name if t.state else None
-                t_data["nombre_intervalo_pago"] = t.payment_interval.name if t.payment_interval else None
-                types_list.append(t_data)
+            type_encoder = encoder_for(TypeCrop)
+            types = self.db.execute(
+                select(
+                    *type_encoder.columns,
+                    Vars.name.label("nombre_estado"),
+                    PaymentInterval.name.label("nombre_intervalo_pago")
+                )
+                .outerjoin(Vars, TypeCrop.state_id == Vars.id)
+                .outerjoin(PaymentInterval, TypeCrop.payment_interval_id == PaymentInterval.id)
+            ).all()
+            types_list = type_encoder.encode_all(types)
             return JSONResponse(
                 status_code=200,
                 content={
@@ -1199,4 +1214,20 @@ class PaymentIntervalService:
                     "message": f"Error al eliminar intervalo de pago: {str(e)}",
                     "data": None
                 }
-            )
\ No newline at end of file
+            )
+
+
+class AsyncCompanyService:
+    """
+    Lecturas de la información de la empresa sobre una AsyncSession (sin bloquear el
+    event loop); ejecutan las de CompanyService y CertificateService con `run_sync`.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_company_info(self):
+        return await self.db.run_sync(lambda db: CompanyService(db).get_company_info())
+
+    async def get_certificates(self):
+        return await self.db.run_sync(lambda db: CertificateService(db).get_certificates())
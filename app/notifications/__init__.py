@@ -0,0 +1,158 @@
+"""
+Entrega de notificaciones desde el outbox.
+
+Las peticiones no escriben en `notifications`: registran la notificación en
+`notification_outbox` dentro de su propia transacción (`UserService.enqueue_notifications`),
+así que se guarda si y solo si se confirma el cambio que la origina. `dispatch_pending`
+mueve las filas pendientes a `notifications` por lotes: cada lote es un
+INSERT ... SELECT más el DELETE de las filas entregadas en la misma transacción, y en
+PostgreSQL varios workers pueden despachar a la vez (SKIP LOCKED). El mismo lote suma
+las notificaciones entregadas a `users.unread_notifications`; `recount_unread` lo
+recalcula desde `notifications` si hiciera falta.
+
+La aplicación despacha cada `NOTIFICATION_DISPATCH_INTERVAL_SECONDS`; con 0 se
+desactiva y se usa el worker:
+
+    python -m app.notifications worker
+    python -m app.notifications recount
+"""
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import delete, false, func, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.engine import Engine
+from dotenv import load_dotenv
+
+from app.notifications.hub import notification_hub
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Intervalo del despachador en la aplicación (0 lo desactiva) y filas por lote
+NOTIFICATION_DISPATCH_INTERVAL_SECONDS = float(os.getenv("NOTIFICATION_DISPATCH_INTERVAL_SECONDS", "1"))
+NOTIFICATION_DISPATCH_BATCH_SIZE = int(os.getenv("NOTIFICATION_DISPATCH_BATCH_SIZE", "500"))
+
+
+def dispatch_batch(engine: Engine, batch_size: int = None) -> int:
+    """Entrega un lote del outbox en una transacción; retorna cuántas notificaciones movió"""
+    from app.users.models import Notification, NotificationOutbox, User
+
+    batch_size = batch_size or NOTIFICATION_DISPATCH_BATCH_SIZE
+    outbox = NotificationOutbox.__table__
+    notifications = Notification.__table__
+    users = User.__table__
+    pending = select(outbox.c.id).order_by(outbox.c.id).limit(batch_size)
+    if engine.dialect.name == "postgresql":
+        pending = pending.with_for_update(skip_locked=True)
+
+    with engine.begin() as connection:
+        ids = connection.execute(pending).scalars().all()
+        if not ids:
+            return 0
+        rows = (
+            select(outbox.c.user_id, outbox.c.title, outbox.c.message, outbox.c.type, false(), outbox.c.created_at)
+            .where(outbox.c.id.in_(ids))
+            .order_by(outbox.c.id)
+        )
+        connection.execute(insert(notifications).from_select(
+            ["user_id", "title", "message", "type", "read", "created_at"], rows
+        ))
+        # Contadores de no leídas: una sola sentencia para todos los destinatarios del lote
+        delivered = (
+            select(func.count())
+            .where(outbox.c.id.in_(ids), outbox.c.user_id == users.c.id)
+            .scalar_subquery()
+        )
+        connection.execute(
+            update(users)
+            .where(users.c.id.in_(select(outbox.c.user_id).where(outbox.c.id.in_(ids))))
+            .values(unread_notifications=users.c.unread_notifications + delivered)
+        )
+        connection.execute(delete(outbox).where(outbox.c.id.in_(ids)))
+    return len(ids)
+
+
+def dispatch_pending(engine: Engine = None, batch_size: int = None) -> int:
+    """Entrega todo lo pendiente en lotes; retorna el total de notificaciones movidas"""
+    if engine is None:
+        from app.database import engine
+    batch_size = batch_size or NOTIFICATION_DISPATCH_BATCH_SIZE
+    total = 0
+    while True:
+        moved = dispatch_batch(engine, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
+
+
+def recount_unread(connection: Connection) -> int:
+    """Recalcula `users.unread_notifications` desde `notifications`; retorna cuántos usuarios corrigió"""
+    from app.users.models import Notification, User
+
+    users = User.__table__
+    notifications = Notification.__table__
+    unread = (
+        select(func.count())
+        .where(notifications.c.user_id == users.c.id, notifications.c.read == false())
+        .scalar_subquery()
+    )
+    return connection.execute(
+        update(users).where(users.c.unread_notifications != unread).values(unread_notifications=unread)
+    ).rowcount
+
+
+def run_worker(engine: Engine = None, interval_seconds: float = None, batch_size: int = None, stop=lambda: False):
+    """Bucle del worker independiente: despacha y espera `interval_seconds` entre rondas"""
+    interval_seconds = interval_seconds or NOTIFICATION_DISPATCH_INTERVAL_SECONDS or 1
+    while not stop():
+        try:
+            moved = dispatch_pending(engine, batch_size)
+            if moved:
+                logger.info("Notificaciones entregadas: %s", moved)
+        except Exception:
+            logger.exception("Falló la entrega de notificaciones; se reintenta en la siguiente ronda")
+        time.sleep(interval_seconds)
+
+
+class NotificationDispatcher:
+    """Despacha el outbox periódicamente en un hilo, sin bloquear el event loop"""
+
+    def __init__(self, interval_seconds: float = None, engine: Engine = None, batch_size: int = None):
+        self.interval_seconds = (
+            NOTIFICATION_DISPATCH_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        )
+        self.engine = engine
+        self.batch_size = batch_size
+        self.delivered = 0
+        self._task = None
+
+    def start(self):
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                moved = await asyncio.to_thread(dispatch_pending, self.engine, self.batch_size)
+            except Exception:
+                # Las filas siguen en el outbox y se reintentan en la siguiente ronda
+                logger.exception("Falló la entrega de notificaciones")
+                continue
+            if moved:
+                self.delivered += moved
+                # Publica lo entregado a las conexiones SSE sin esperar su siguiente lectura
+                notification_hub.wake()
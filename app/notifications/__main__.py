@@ -0,0 +1,42 @@
+"""
+CLI de notificaciones.
+
+    python -m app.notifications dispatch [--batch-size N]
+    python -m app.notifications worker [--interval S] [--batch-size N]
+    python -m app.notifications recount
+"""
+import argparse
+import logging
+import sys
+
+from app.database import engine
+from app.notifications import dispatch_pending, recount_unread, run_worker
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.notifications", description="Entrega de notificaciones")
+    commands = parser.add_subparsers(dest="command", required=True)
+    dispatch_parser = commands.add_parser("dispatch", help="Entrega una vez lo pendiente en el outbox")
+    dispatch_parser.add_argument("--batch-size", type=int, default=None, help="Filas por transacción")
+    worker_parser = commands.add_parser("worker", help="Entrega el outbox de forma continua")
+    worker_parser.add_argument("--interval", type=float, default=None, help="Segundos entre rondas")
+    worker_parser.add_argument("--batch-size", type=int, default=None, help="Filas por transacción")
+    commands.add_parser("recount", help="Recalcula los contadores de notificaciones sin leer")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.command == "dispatch":
+        print(f"{dispatch_pending(engine, batch_size=args.batch_size)} notificaciones entregadas")
+    elif args.command == "worker":
+        try:
+            run_worker(engine, interval_seconds=args.interval, batch_size=args.batch_size)
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "recount":
+        with engine.begin() as connection:
+            print(f"{recount_unread(connection)} contadores corregidos")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
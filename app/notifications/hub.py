@@ -0,0 +1,269 @@
+"""
+Notificaciones en tiempo real por Server-Sent Events.
+
+Cada proceso tiene un `NotificationHub`: las conexiones de `GET /users/notifications/stream`
+se suscriben con el id de su usuario y reciben las notificaciones nuevas en una cola
+acotada (`NOTIFICATION_STREAM_QUEUE_SIZE`). Un solo bucle por proceso, y no una consulta
+por cliente, lee de `notifications` las filas con id mayor que la última vista cada
+`NOTIFICATION_STREAM_POLL_SECONDS`. `create_notification` y el despachador del outbox
+adelantan esa lectura con `wake()`, y las notificaciones entregadas por otros workers
+llegan en la siguiente ronda.
+
+Los ids se asignan al insertar y no al confirmar: una transacción lenta puede hacer
+visible una fila con id menor que otras ya leídas. Los ids que faltan entre los leídos se
+siguen buscando durante `NOTIFICATION_STREAM_LOOKBACK_SECONDS` en la misma consulta de
+cada ronda, y cada fila se publica una sola vez.
+
+Si la cola de una conexión se llena, sus eventos se descartan y el cliente recibe un
+evento `resync` para recargar el listado. Una conexión inactiva recibe un comentario
+cada `NOTIFICATION_STREAM_HEARTBEAT_SECONDS` para que los proxies no la cierren.
+
+La conexión no sobrevive a la sesión: cuando vence el token de acceso con el que se
+abrió, o cuando se revoca (logout), recibe `session_ended` y se cierra.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.engine import Engine
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Lectura de notificaciones nuevas, latido de las conexiones y eventos pendientes por conexión
+NOTIFICATION_STREAM_POLL_SECONDS = float(os.getenv("NOTIFICATION_STREAM_POLL_SECONDS", "2"))
+NOTIFICATION_STREAM_HEARTBEAT_SECONDS = float(os.getenv("NOTIFICATION_STREAM_HEARTBEAT_SECONDS", "15"))
+NOTIFICATION_STREAM_QUEUE_SIZE = int(os.getenv("NOTIFICATION_STREAM_QUEUE_SIZE", "100"))
+# Tiempo durante el que se espera a que se confirme una notificación con id intermedio
+NOTIFICATION_STREAM_LOOKBACK_SECONDS = float(os.getenv("NOTIFICATION_STREAM_LOOKBACK_SECONDS", "30"))
+# Filas por consulta al leer notificaciones nuevas
+_FETCH_BATCH = 1000
+# Ids faltantes que se siguen buscando como máximo (se descartan los más antiguos)
+_MAX_GAPS = 1000
+
+
+def format_event(event: str, data, event_id=None) -> str:
+    """Un evento SSE (`event`, `id` opcional y `data` en JSON)"""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscription:
+    """Conexión suscrita: cola acotada de eventos de un usuario"""
+
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, event: dict) -> bool:
+        """Encola sin esperar; si la cola está llena descarta el evento"""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+
+class NotificationHub:
+    """Publica las notificaciones nuevas a las conexiones de este proceso"""
+
+    def __init__(
+        self,
+        engine: Engine = None,
+        poll_seconds: float = None,
+        queue_size: int = None,
+        lookback_seconds: float = None,
+    ):
+        self._engine = engine
+        self.poll_seconds = NOTIFICATION_STREAM_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self.queue_size = queue_size or NOTIFICATION_STREAM_QUEUE_SIZE
+        self.lookback_seconds = NOTIFICATION_STREAM_LOOKBACK_SECONDS if lookback_seconds is None else lookback_seconds
+        self.polls = 0
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._watermark = None
+        # Ids menores que la marca aún no vistos -> instante hasta el que se buscan
+        self._gaps: Dict[int, float] = {}
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            from app.database import engine
+            self._engine = engine
+        return self._engine
+
+    def __len__(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    async def subscribe(self, user_id: int) -> Subscription:
+        """Registra una conexión; solo recibe lo creado a partir de este momento"""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = self._loop.create_task(self._run())
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        if self._watermark is None:
+            latest = await asyncio.to_thread(self._latest_id)
+            self._watermark = max(latest, self._watermark or 0)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id: int, event: dict) -> int:
+        """Entrega un evento a las conexiones del usuario; retorna a cuántas llegó"""
+        return sum(subscription.offer(event) for subscription in self._subscribers.get(user_id, ()))
+
+    def wake(self):
+        """Adelanta la siguiente lectura; se puede llamar desde cualquier hilo"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # El event loop ya se cerró
+            pass
+
+    async def poll(self) -> int:
+        """Publica las notificaciones creadas desde la última lectura; retorna cuántas leyó"""
+        if not self._subscribers:
+            # Sin conexiones no se consulta; la próxima suscripción parte de la última fila
+            self._watermark = None
+            self._gaps.clear()
+            return 0
+        if self._watermark is None:
+            self._watermark = await asyncio.to_thread(self._latest_id)
+            return 0
+        now = time.monotonic()
+        self._gaps = {row_id: deadline for row_id, deadline in self._gaps.items() if deadline > now}
+        rows = await asyncio.to_thread(self._fetch_since, self._watermark, list(self._gaps))
+        self.polls += 1
+        expected = self._watermark + 1
+        for row in rows:
+            row_id = row["id"]
+            if row_id > self._watermark:
+                for missing in range(max(expected, row_id - _MAX_GAPS), row_id):
+                    self._gaps[missing] = now + self.lookback_seconds
+                expected = row_id + 1
+            else:
+                self._gaps.pop(row_id, None)
+            self.publish(row["user_id"], row)
+        if expected > self._watermark + 1:
+            self._watermark = expected - 1
+        if len(self._gaps) > _MAX_GAPS:
+            self._gaps = dict(sorted(self._gaps.items())[-_MAX_GAPS:])
+        return len(rows)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = self._loop = self._wakeup = None
+        self._watermark = None
+        self._gaps.clear()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.poll()
+            except Exception:
+                # Las filas se vuelven a leer en la siguiente ronda desde la misma posición
+                logger.exception("Falló la lectura de notificaciones nuevas")
+
+    def _latest_id(self) -> int:
+        from app.users.models import Notification
+
+        with self.engine.connect() as connection:
+            return connection.execute(select(func.max(Notification.id))).scalar() or 0
+
+    def _fetch_since(self, watermark: int, gaps: List[int] = ()) -> List[dict]:
+        """Filas con id mayor que `watermark` o en `gaps`, ordenadas por id"""
+        from app.serializers import encoder_for
+        from app.users.models import Notification
+
+        encoder = encoder_for(Notification)
+        condition = Notification.id > watermark
+        if gaps:
+            condition = or_(condition, Notification.id.in_(gaps))
+        rows = []
+        last_id = None
+        with self.engine.connect() as connection:
+            while True:
+                query = select(*encoder.columns).where(condition)
+                if last_id is not None:
+                    query = query.where(Notification.id > last_id)
+                batch = connection.execute(query.order_by(Notification.id).limit(_FETCH_BATCH)).all()
+                rows += encoder.encode_all(batch)
+                if len(batch) < _FETCH_BATCH:
+                    return rows
+                last_id = batch[-1].id
+
+
+async def event_stream(
+    hub: NotificationHub,
+    subscription: Subscription,
+    unread_count: int,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    heartbeat_seconds: float = None,
+    expires_at: Optional[float] = None,
+    is_revoked: Optional[Callable[[], Awaitable[bool]]] = None,
+):
+    """
+    Generador SSE de una conexión: conteo inicial, notificaciones, `resync` y latidos.
+    Termina con `session_ended` al llegar `expires_at` (epoch) o si `await is_revoked()`;
+    la revocación se comprueba con cada evento y cada latido y no debe bloquear el loop.
+    """
+    heartbeat_seconds = heartbeat_seconds or NOTIFICATION_STREAM_HEARTBEAT_SECONDS
+    try:
+        yield f"retry: 5000\n{format_event('unread', {'count': unread_count})}"
+        while not await is_disconnected():
+            remaining = None if expires_at is None else expires_at - time.time()
+            if remaining is not None and remaining <= 0:
+                yield format_event("session_ended", {"reason": "expired"})
+                return
+            if is_revoked is not None and await is_revoked():
+                yield format_event("session_ended", {"reason": "revoked"})
+                return
+            if subscription.dropped:
+                subscription.dropped = 0
+                yield format_event("resync", {})
+            timeout = heartbeat_seconds if remaining is None else min(heartbeat_seconds, remaining)
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                if timeout == heartbeat_seconds:
+                    yield ": ping\n\n"
+                continue
+            yield format_event("notification", event, event["id"])
+    finally:
+        hub.unsubscribe(subscription)
+
+
+notification_hub = NotificationHub()
@@ -0,0 +1,26 @@
+import base64
+import json
+from fastapi import HTTPException
+
+# Paginación por cursor (keyset) compartida por los listados
+
+
+def encode_cursor(*values) -> str:
+    """Codifica la posición del último registro de una página como cursor opaco"""
+    raw = json.dumps(list(values), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """
+    Decodifica un cursor generado por `encode_cursor`.
+    Lanza un error 400 si el cursor está corrupto o no tiene `size` valores.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("Tamaño de cursor inesperado")
+        return values
+    except Exception:
+        raise HTTPException(status_code=400, detail={"success": False, "data": "Cursor de paginación inválido."})
@@ -0,0 +1,223 @@
+"""
+Hash y verificación de contraseñas (scrypt) fuera del hilo de la petición.
+
+scrypt con N=2**14 ocupa un núcleo durante decenas de milisegundos; ejecutarlo dentro
+del handler bloquea el event loop (endpoints async) o retiene el GIL mientras el resto
+de peticiones esperan. `PasswordHasher` lo ejecuta en un pool dedicado y acotado:
+
+- `PASSWORD_HASH_EXECUTOR`: "process" (por defecto), "thread" o "inline" (sin pool, para pruebas).
+- `PASSWORD_HASH_WORKERS`: procesos o hilos del pool.
+- `PASSWORD_HASH_MAX_PENDING`: operaciones en curso o en cola; al superarlo se espera
+  hasta `PASSWORD_HASH_QUEUE_TIMEOUT` segundos y luego se lanza PasswordHasherBusy (503).
+
+El costo de scrypt se configura con `PASSWORD_SCRYPT_LOG_N`, `PASSWORD_SCRYPT_R` y
+`PASSWORD_SCRYPT_P`, y se guarda junto al hash (`scrypt$ln=14,r=8,p=1$<clave hex>`).
+Los hashes sin prefijo son los anteriores (ln=14, r=8, p=1). Un hash con parámetros
+distintos a los actuales se sigue verificando con los suyos y se regenera al iniciar
+sesión. Para elegir el costo en el hardware actual:
+
+    python -m app.passwords calibrate --target-ms 100
+"""
+import asyncio
+import hmac
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from Crypto.Protocol.KDF import scrypt
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "process")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8)))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "5"))
+
+SCRYPT_KEY_LEN = 32
+SALT_BYTES = 16
+_SCHEME = "scrypt"
+
+
+class PasswordHasherBusy(Exception):
+    """El pool de hash está saturado: la petición debe reintentarse más tarde"""
+
+
+@dataclass(frozen=True)
+class ScryptParams:
+    """Costo de scrypt: N = 2**log_n, memoria ≈ 128 * r * N bytes"""
+    log_n: int = 14
+    r: int = 8
+    p: int = 1
+
+    def encode(self) -> str:
+        return f"ln={self.log_n},r={self.r},p={self.p}"
+
+    @classmethod
+    def decode(cls, text: str) -> "ScryptParams":
+        values = dict(item.split("=", 1) for item in text.split(","))
+        return cls(log_n=int(values["ln"]), r=int(values["r"]), p=int(values["p"]))
+
+    @property
+    def memory_bytes(self) -> int:
+        return 128 * self.r * (2 ** self.log_n)
+
+
+# Parámetros de los hashes guardados sin prefijo (antes de que fueran configurables)
+LEGACY_PARAMS = ScryptParams(14, 8, 1)
+PASSWORD_SCRYPT_PARAMS = ScryptParams(
+    log_n=int(os.getenv("PASSWORD_SCRYPT_LOG_N", str(LEGACY_PARAMS.log_n))),
+    r=int(os.getenv("PASSWORD_SCRYPT_R", str(LEGACY_PARAMS.r))),
+    p=int(os.getenv("PASSWORD_SCRYPT_P", str(LEGACY_PARAMS.p))),
+)
+
+
+def scrypt_hex(password: str, salt_hex: str, params: ScryptParams = LEGACY_PARAMS) -> str:
+    """Deriva la clave scrypt de la contraseña (función de módulo para poder enviarla a otro proceso)"""
+    key = scrypt(password.encode(), bytes.fromhex(salt_hex), key_len=SCRYPT_KEY_LEN,
+                 N=2 ** params.log_n, r=params.r, p=params.p)
+    return key.hex()
+
+
+def encode_hash(params: ScryptParams, key_hex: str) -> str:
+    return f"{_SCHEME}${params.encode()}${key_hex}"
+
+
+def decode_hash(stored_hash: str) -> tuple:
+    """Retorna (parámetros, clave hex) de un hash almacenado, con o sin prefijo"""
+    if stored_hash and stored_hash.startswith(_SCHEME + "$"):
+        _, params, key_hex = stored_hash.split("$", 2)
+        return ScryptParams.decode(params), key_hex
+    return LEGACY_PARAMS, stored_hash or ""
+
+
+class PasswordHasher:
+    """Pool acotado para scrypt con API síncrona (handlers `def`) y asíncrona (handlers `async def`)"""
+
+    def __init__(self, executor: str = PASSWORD_HASH_EXECUTOR, max_workers: int = PASSWORD_HASH_WORKERS,
+                 max_pending: int = PASSWORD_HASH_MAX_PENDING, queue_timeout: float = PASSWORD_HASH_QUEUE_TIMEOUT,
+                 params: ScryptParams = PASSWORD_SCRYPT_PARAMS):
+        if executor not in ("process", "thread", "inline"):
+            raise ValueError(f"PASSWORD_HASH_EXECUTOR no soportado: {executor}")
+        self.executor = executor
+        self.params = params
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        # Semáforo de hilos: lo comparten los hilos del threadpool y todos los event loops
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    if self.executor == "process":
+                        # spawn: los hijos no heredan conexiones ni hilos del worker
+                        self._pool = ProcessPoolExecutor(
+                            max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                        )
+                    else:
+                        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        return self._pool
+
+    def _submit(self, fn, *args) -> Future:
+        """Envía la tarea al pool; quien llama ya reservó un cupo, que se libera al terminar"""
+        try:
+            if self.executor == "inline":
+                future = Future()
+                try:
+                    future.set_result(fn(*args))
+                except Exception as e:
+                    future.set_exception(e)
+            else:
+                future = self._get_pool().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        """Ejecuta `fn(*args)` en el pool y bloquea el hilo actual hasta el resultado"""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PasswordHasherBusy("Demasiadas verificaciones de contraseña en curso")
+        return self._submit(fn, *args).result()
+
+    async def run_async(self, fn, *args):
+        """Ejecuta `fn(*args)` en el pool sin bloquear el event loop"""
+        if not self._slots.acquire(blocking=False):
+            waiter = asyncio.ensure_future(asyncio.to_thread(self._slots.acquire, True, self.queue_timeout))
+            try:
+                acquired = await asyncio.shield(waiter)
+            except asyncio.CancelledError:
+                # El hilo sigue esperando el cupo aunque la petición se cancele: si lo obtiene, se devuelve
+                waiter.add_done_callback(self._release_if_acquired)
+                raise
+            if not acquired:
+                raise PasswordHasherBusy("Demasiadas verificaciones de contraseña en curso")
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    def _release_if_acquired(self, waiter: asyncio.Future):
+        if not waiter.cancelled() and waiter.exception() is None and waiter.result():
+            self._slots.release()
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        """True si el hash se generó con parámetros distintos a los actuales"""
+        return decode_hash(stored_hash)[0] != self.params
+
+    def hash(self, password: str) -> tuple:
+        """Retorna (salt hexadecimal, hash con sus parámetros) para una contraseña nueva"""
+        salt = os.urandom(SALT_BYTES).hex()
+        return salt, encode_hash(self.params, self.run(scrypt_hex, password, salt, self.params))
+
+    def verify(self, stored_salt: str, stored_hash: str, password: str) -> bool:
+        params, key_hex = decode_hash(stored_hash)
+        return hmac.compare_digest(self.run(scrypt_hex, password, stored_salt, params), key_hex)
+
+    async def hash_async(self, password: str) -> tuple:
+        salt = os.urandom(SALT_BYTES).hex()
+        return salt, encode_hash(self.params, await self.run_async(scrypt_hex, password, salt, self.params))
+
+    async def verify_async(self, stored_salt: str, stored_hash: str, password: str) -> bool:
+        params, key_hex = decode_hash(stored_hash)
+        return hmac.compare_digest(await self.run_async(scrypt_hex, password, stored_salt, params), key_hex)
+
+    def shutdown(self, wait: bool = True):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
+
+
+def calibrate(target_ms: float, r: int = 8, p: int = 1, min_log_n: int = 10, max_log_n: int = 20,
+              repeat: int = 3, timer=None) -> tuple:
+    """
+    Mide scrypt para cada log_n y retorna (parámetros elegidos, mediciones).
+    Se elige el mayor costo cuya mediana no supera `target_ms` (como mínimo `min_log_n`).
+    """
+    timer = timer or time.perf_counter
+    salt = os.urandom(SALT_BYTES).hex()
+    chosen = ScryptParams(min_log_n, r, p)
+    measurements = []
+    for log_n in range(min_log_n, max_log_n + 1):
+        params = ScryptParams(log_n, r, p)
+        samples = []
+        for _ in range(repeat):
+            start = timer()
+            scrypt_hex("calibracion", salt, params)
+            samples.append((timer() - start) * 1000)
+        elapsed = statistics.median(samples)
+        measurements.append((params, elapsed))
+        if elapsed > target_ms:
+            break
+        chosen = params
+    return chosen, measurements
+
+
+# Pool compartido por los servicios
+password_hasher = PasswordHasher()
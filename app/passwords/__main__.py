@@ -0,0 +1,37 @@
+"""
+CLI de contraseñas.
+
+    python -m app.passwords calibrate [--target-ms 100] [--r 8] [--p 1]
+"""
+import argparse
+import sys
+
+from app.passwords import PASSWORD_SCRYPT_PARAMS, calibrate
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.passwords", description="Hash de contraseñas")
+    commands = parser.add_subparsers(dest="command", required=True)
+    calibrate_parser = commands.add_parser("calibrate", help="Elige el costo de scrypt para un tiempo objetivo")
+    calibrate_parser.add_argument("--target-ms", type=float, default=100, help="Tiempo máximo por hash en ms")
+    calibrate_parser.add_argument("--r", type=int, default=PASSWORD_SCRYPT_PARAMS.r)
+    calibrate_parser.add_argument("--p", type=int, default=PASSWORD_SCRYPT_PARAMS.p)
+    calibrate_parser.add_argument("--repeat", type=int, default=3, help="Mediciones por costo")
+    args = parser.parse_args(argv)
+
+    if args.command == "calibrate":
+        chosen, measurements = calibrate(args.target_ms, r=args.r, p=args.p, repeat=args.repeat)
+        print(f"{'parámetros':<16} {'memoria':>10} {'mediana':>10}")
+        for params, elapsed in measurements:
+            marker = "  <-" if params == chosen else ""
+            print(f"{params.encode():<16} {params.memory_bytes / 2**20:8.1f}MiB {elapsed:8.1f}ms{marker}")
+        print(f"Actual: {PASSWORD_SCRYPT_PARAMS.encode()}")
+        print(f"Recomendado para {args.target_ms:g} ms por hash:")
+        print(f"PASSWORD_SCRYPT_LOG_N={chosen.log_n}")
+        print(f"PASSWORD_SCRYPT_R={chosen.r}")
+        print(f"PASSWORD_SCRYPT_P={chosen.p}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
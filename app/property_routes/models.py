@@ -11,7 +11,7 @@ class Property(Base):
     longitude = Column(Float, nullable=False)
     latitude = Column(Float, nullable=False)
     extension = Column(Float, nullable=False)
-    real_estate_registration_number = Column(Integer, nullable=False)
+    real_estate_registration_number = Column(Integer, nullable=False, index=True)
     public_deed = Column(String, nullable=True)
     freedom_tradition_certificate = Column(String, nullable=True)
     state = Column("State", Integer, ForeignKey("vars.id"), default=3, nullable=False)
@@ -27,7 +27,7 @@ class Lot(Base):
     longitude = Column(Float, nullable=False)
     latitude = Column(Float, nullable=False)
     extension = Column(Float, nullable=False)
-    real_estate_registration_number = Column(Integer, nullable=False)
+    real_estate_registration_number = Column(Integer, nullable=False, index=True)
     public_deed = Column(String, nullable=True)
     freedom_tradition_certificate = Column(String, nullable=True)
     
@@ -47,10 +47,10 @@ class PropertyLot(Base):
     __tablename__ = 'property_lot'
 
     property_id = Column(Integer, ForeignKey('property.id'), primary_key=True)
-    lot_id = Column(Integer, ForeignKey('lot.id'), primary_key=True)
+    lot_id = Column(Integer, ForeignKey('lot.id'), primary_key=True, index=True)
 
 class PropertyUser(Base):
     __tablename__ = 'user_property'
 
     property_id = Column(Integer, ForeignKey('property.id'), primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True, index=True)
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.property_routes.services import PropertyLotService
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, get_async_db, AsyncSessionLocal
+from app.property_routes.services import PropertyLotService, AsyncPropertyLotService
 from app.property_routes.schemas import PropertyCreate, PropertyResponse
 from datetime import datetime
 
@@ -100,13 +103,13 @@ async def create_lot(
         raise HTTPException(status_code=500, detail=f"Error al crear el predio: {str(e)}")
 
 @router.get("/{property_id}", response_model=dict)
-def get_property(property_id: int, db: Session = Depends(get_db)):
+async def get_property(property_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Obtener la información de un predio específico por su ID.
     """
     try:
-        property_service = PropertyLotService(db)
-        return property_service.get_property_by_id(property_id)
+        property_service = AsyncPropertyLotService(db)
+        return await property_service.get_property_by_id(property_id)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -199,12 +202,21 @@ async def edit_lot_crop(
 
 
 @router.get("/")
-def list_properties(db: Session = Depends(get_db)):
-    """Obtener todos los predios"""
+async def list_properties(
+    limit: int = Query(50, ge=1, le=500, description="Cantidad de predios por página"),
+    cursor: Optional[str] = Query(None, description="Cursor `next_cursor` de la página anterior"),
+    stream: bool = Query(False, description="Enviar todos los predios como NDJSON en streaming")
+):
+    """
+    Obtener los predios paginados por cursor.
+    Con `stream=true` se envían todos los predios en formato NDJSON (un predio por línea).
+    """
     try:
-        property_service = PropertyLotService(db)
-        properties = property_service.get_all_properties()
-        return properties
+        if stream:
+            # El generador abre su propia sesión y la cierra al terminar la respuesta
+            return StreamingResponse(AsyncPropertyLotService.stream_properties(), media_type="application/x-ndjson")
+        async with AsyncSessionLocal() as db:
+            return await AsyncPropertyLotService(db).get_all_properties(limit=limit, cursor=cursor)
     except HTTPException as e:
         raise e  # Re-raise HTTPException for known errors
     except Exception as e:
@@ -213,11 +225,11 @@ def list_properties(db: Session = Depends(get_db)):
 
 
 @router.get("/{property_id}/lots/")
-def list_lots_properties(property_id: int, db: Session = Depends(get_db)):
+async def list_lots_properties(property_id: int, db: AsyncSession = Depends(get_async_db)):
     """Obtener todos los lotes de un predio"""
     try:
-        property_service = PropertyLotService(db)
-        lots = property_service.get_lots_property(property_id)
+        property_service = AsyncPropertyLotService(db)
+        lots = await property_service.get_lots_property(property_id)
         return lots
     except HTTPException as e:
         raise e  
@@ -225,11 +237,11 @@ def list_lots_properties(property_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error al obtener los lotes de predios: {str(e)}")
     
 @router.get("/user/{user_id}")
-def list_lots_properties(user_id: int, db: Session = Depends(get_db)):
+async def list_lots_properties(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """Obtener todos los predios de un usuario"""
     try:
-        property_service = PropertyLotService(db)
-        properties = property_service.get_properties_for_user(user_id)
+        property_service = AsyncPropertyLotService(db)
+        properties = await property_service.get_properties_for_user(user_id)
         return properties
     except HTTPException as e:
         raise e  
@@ -237,11 +249,11 @@ def list_lots_properties(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error al obtener los lotes de predios: {str(e)}")
 
 @router.get("/lot/{lot_id}", response_model=dict)
-def get_lot_by_id(lot_id: int, db: Session = Depends(get_db)):
+async def get_lot_by_id(lot_id: int, db: AsyncSession = Depends(get_async_db)):
     """Obtener los datos de un lote por su id, incluyendo el id del predio vinculado."""
     try:
-        property_service = PropertyLotService(db)
-        return property_service.get_lot_by_id(lot_id)
+        property_service = AsyncPropertyLotService(db)
+        return await property_service.get_lot_by_id(lot_id)
     except HTTPException as e:
         raise e
     except Exception as e:
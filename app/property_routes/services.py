@@ -1,53 +1,89 @@
 import os
 import uuid
+import json
+import asyncio
 from fastapi import HTTPException, UploadFile, File, Response
-from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from app.property_routes.models import Property, Lot, PropertyLot, PropertyUser
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.property_routes.schemas import PropertyCreate, PropertyResponse
+from app.database import AsyncSessionLocal
 from app.users.models import User
 from app.users.schemas import NotificationCreate
 from app.users.services import UserService
 from datetime import date
 from app.roles.models import Vars , Role, user_role_table
-from app.firebase_config import bucket
+from app.uploads import upload_executor, UploadTooLarge
 from app.my_company.models import TypeCrop, PaymentInterval
+from app.pagination import encode_cursor, decode_cursor
+from app.serializers import encoder_for, FastJSONResponse
+
+# Paginación y streaming del listado de predios
+_PROPERTIES_PAGE_DEFAULT = 50
+_PROPERTIES_PAGE_MAX = 500
+_PROPERTIES_STREAM_BATCH = 500
 
 
 class PropertyLotService:
     def __init__(self, db: Session):
         self.db = db
 
-    def get_all_properties(self):
-        """Obtener todos los predios, incluyendo el nombre del estado y el número de documento del dueño"""
-        try:
-            # Se realiza un join: Property -> Vars (para obtener el nombre del estado) y PropertyUser -> User (para el documento)
-            results = (
-                self.db.query(
-                    Property,
-                    Vars.name.label("state_name"),
-                    User.document_number.label("owner_document_number")
-                )
-                .join(PropertyUser, Property.id == PropertyUser.property_id)
-                .join(User, PropertyUser.user_id == User.id)
-                .join(Vars, Property.state == Vars.id)
-                .all()
+    @staticmethod
+    def _properties_listing_query():
+        """Consulta base del listado de predios con el nombre del estado y el documento del dueño"""
+        # Se seleccionan solo columnas (sin instancias ORM) para no hidratar objetos por fila
+        return (
+            select(
+                *encoder_for(Property).columns,
+                Vars.name.label("state_name"),
+                User.document_number.label("owner_document_number"),
+                User.id.label("owner_id")
             )
-            properties_list = []
-            for property_obj, state_name, owner_document_number in results:
-                property_dict = jsonable_encoder(property_obj)
-                property_dict["state_name"] = state_name
-                property_dict["owner_document_number"] = owner_document_number
-                properties_list.append(property_dict)
+            .join(PropertyUser, Property.id == PropertyUser.property_id)
+            .join(User, PropertyUser.user_id == User.id)
+            .join(Vars, Property.state == Vars.id)
+            .order_by(Property.id, User.id)
+        )
 
-            if not properties_list:
-                return JSONResponse(status_code=404, content={"success": False, "data": []})
+    def get_all_properties(self, limit: int = _PROPERTIES_PAGE_DEFAULT, cursor: str = None):
+        """
+        Obtener los predios paginados por cursor, incluyendo el nombre del estado y el número de documento del dueño.
+        El cursor es el `next_cursor` devuelto por la página anterior.
+        """
+        try:
+            limit = max(1, min(limit, _PROPERTIES_PAGE_MAX))
+            query = self._properties_listing_query()
+            if cursor:
+                last_property_id, last_owner_id = decode_cursor(cursor, 2)
+                if any(isinstance(value, bool) or not isinstance(value, int) for value in (last_property_id, last_owner_id)):
+                    raise HTTPException(status_code=400, detail={"success": False, "data": "Cursor de paginación inválido."})
+                query = query.where(tuple_(Property.id, User.id) > (last_property_id, last_owner_id))
+
+            rows = self.db.execute(query.limit(limit + 1)).mappings().all()
+            has_more = len(rows) > limit
+            properties_list = encoder_for(Property).encode_all(rows[:limit])
+
+            next_cursor = None
+            if has_more:
+                last = properties_list[-1]
+                next_cursor = encode_cursor(last["id"], last["owner_id"])
 
             return JSONResponse(
                 status_code=200,
-                content={"success": True, "data": properties_list}
+                content={
+                    "success": True,
+                    "data": properties_list,
+                    "pagination": {
+                        "limit": limit,
+                        "next_cursor": next_cursor,
+                        "has_more": has_more
+                    }
+                }
             )
+        except HTTPException:
+            raise
         except Exception as e:
             return JSONResponse(
                 status_code=500,
@@ -59,12 +95,14 @@ class PropertyLotService:
                     }
                 }
             )
+
     def get_lot_by_id(self, lot_id: int):
         """Obtener un lote por su id, incluyendo nombres descriptivos y el id del predio vinculado."""
         try:
-            result = (
-                self.db.query(
-                    Lot,
+            lot_encoder = encoder_for(Lot)
+            result = self.db.execute(
+                select(
+                    *lot_encoder.columns,
                     TypeCrop.name.label("nombre_tipo_cultivo"),
                     PaymentInterval.name.label("nombre_intervalo_pago"),
                     Vars.name.label("nombre_estado"),
@@ -74,22 +112,17 @@ class PropertyLotService:
                 .outerjoin(PaymentInterval, Lot.payment_interval == PaymentInterval.id)
                 .join(Vars, Lot.state == Vars.id)
                 .join(PropertyLot, PropertyLot.lot_id == Lot.id)
-                .filter(Lot.id == lot_id)
-                .first()
-            )
+                .where(Lot.id == lot_id)
+                .limit(1)
+            ).first()
             if not result:
                 return JSONResponse(
                     status_code=404,
                     content={"success": False, "data": "Lote no encontrado"}
                 )
-            lot, nombre_tipo_cultivo, nombre_intervalo_pago, nombre_estado, property_id = result
-            lot_data = jsonable_encoder(lot)
-            lot_data["nombre_tipo_cultivo"] = nombre_tipo_cultivo
-            lot_data["nombre_intervalo_pago"] = nombre_intervalo_pago
-            lot_data["nombre_estado"] = nombre_estado
-            lot_data["property_id"] = property_id
+            lot_data = lot_encoder.encode(result)
 
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=200,
                 content={"success": True, "data": lot_data}
             )
@@ -158,9 +191,11 @@ class PropertyLotService:
                     }
                 )
 
-            # Guardar los archivos
-            public_deed_path = await self.save_file(public_deed, "uploads/files_properties/")
-            freedom_tradition_certificate_path = await self.save_file(freedom_tradition_certificate, "uploads/files_properties/")
+            # Guardar los archivos (ambas subidas en paralelo)
+            public_deed_path, freedom_tradition_certificate_path = await asyncio.gather(
+                self.save_file(public_deed, "uploads/files_properties/"),
+                self.save_file(freedom_tradition_certificate, "uploads/files_properties/")
+            )
 
             # Crear el objeto Property
             property = Property(
@@ -188,34 +223,25 @@ class PropertyLotService:
 
             # Agregar la relación entre el lote y la propiedad
             self.db.add(property_user)
-            self.db.commit()  # Realizar la transacción para la relación
-
 
+            # Notificar al propietario y a los administradores (sin duplicar al admin
+            # que también es propietario) con un solo INSERT
             user_service = UserService(self.db)
-            
-            # Notificar al propietario
-            notification_data = NotificationCreate(
-                user_id=user_id,
-                title="Predio creado",
-                message=f"Se ha registrado el predio '{name}' a su nombre",
-                type="property_creation"
-            )
-            user_service.create_notification(notification_data)
-            
-            # Notificar a los administradores
-            admins = self.db.query(User).join(user_role_table).join(Role).filter(
-                Role.name == "Administrador"
-            ).all()
-            
-            for admin in admins:
-                if admin.id != user_id:  # No duplicar para admin que también es propietario
-                    notification_data = NotificationCreate(
-                        user_id=admin.id,
-                        title="Nuevo predio registrado",
-                        message=f"Se ha registrado un nuevo predio: '{name}'",
-                        type="property_creation"
-                    )
-                    user_service.create_notification(notification_data)
+            user_service.enqueue_notifications([
+                NotificationCreate(
+                    user_id=user_id,
+                    title="Predio creado",
+                    message=f"Se ha registrado el predio '{name}' a su nombre",
+                    type="property_creation"
+                ),
+                *user_service.admin_notifications(
+                    title="Nuevo predio registrado",
+                    message=f"Se ha registrado un nuevo predio: '{name}'",
+                    type="property_creation",
+                    exclude=user_id
+                ),
+            ])
+            self.db.commit()  # La relación y las notificaciones en la misma transacción
 
             return JSONResponse(
                 status_code=200,
@@ -228,6 +254,10 @@ class PropertyLotService:
                 }
             )
 
+        except HTTPException:
+            # Errores con código propio (p. ej. 413 al subir un archivo demasiado grande)
+            self.db.rollback()
+            raise
         except Exception as e:
             self.db.rollback()
             print("Error al crear predio:", e)
@@ -272,22 +302,20 @@ class PropertyLotService:
                     )
             # Mapear el valor booleano a la columna state:
             property_obj.state = 3 if new_state else 4
-            self.db.commit()
-            self.db.refresh(property_obj)
 
             state_text = "activado" if new_state else "desactivado"
             
-            # Buscar el propietario del predio
+            # Encolar el aviso al propietario en la misma transacción que el cambio de estado
             property_user = self.db.query(PropertyUser).filter(PropertyUser.property_id == property_id).first()
             if property_user:
-                user_service = UserService(self.db)
-                notification_data = NotificationCreate(
+                UserService(self.db).enqueue_notifications([NotificationCreate(
                     user_id=property_user.user_id,
                     title="Estado del predio actualizado",
                     message=f"Su predio '{property_obj.name}' ha sido {state_text}",
                     type="property_status_change"
-                )
-                user_service.create_notification(notification_data)
+                )])
+            self.db.commit()
+            self.db.refresh(property_obj)
 
             return property_obj
         except HTTPException as e:
@@ -309,8 +337,8 @@ class PropertyLotService:
             if not lot_obj:
                 raise HTTPException(status_code=404, detail="Lote no encontrado.")
             
+            association = self.db.query(PropertyLot).filter(PropertyLot.lot_id == lot_id).first()
             if new_state is True:
-                association = self.db.query(PropertyLot).filter(PropertyLot.lot_id == lot_id).first()
                 if not association:
                     raise HTTPException(status_code=400, detail="No existe asociación del lote con un predio.")
                 property_obj = self.db.query(Property).filter(Property.id == association.property_id).first()
@@ -320,25 +348,22 @@ class PropertyLotService:
                     raise HTTPException(status_code=400, detail="No se puede activar el lote porque el predio está desactivado.")
             
             lot_obj.state = 5 if new_state else 6
-            self.db.commit()
-            self.db.refresh(lot_obj)
 
-            # Después de actualizar el estado
             state_text = "activado" if new_state else "desactivado"
             
-            # Buscar al propietario del lote a través del predio
-            association = self.db.query(PropertyLot).filter(PropertyLot.lot_id == lot_id).first()
+            # Encolar el aviso al propietario del lote (a través del predio) en la misma
+            # transacción; la entrega ocurre fuera de la petición
             if association:
                 property_user = self.db.query(PropertyUser).filter(PropertyUser.property_id == association.property_id).first()
                 if property_user:
-                    user_service = UserService(self.db)
-                    notification_data = NotificationCreate(
+                    UserService(self.db).enqueue_notifications([NotificationCreate(
                         user_id=property_user.user_id,
                         title="Estado del lote actualizado",
                         message=f"El lote '{lot_obj.name}' ha sido {state_text}",
                         type="lot_status_change"
-                    )
-                    user_service.create_notification(notification_data)
+                    )])
+            self.db.commit()
+            self.db.refresh(lot_obj)
 
             return lot_obj
         except HTTPException as e:
@@ -392,23 +417,11 @@ class PropertyLotService:
     async def save_file(self, file: UploadFile, directory: str = "files/") -> str:
         """Guardar un archivo en Firebase Storage y devolver su URL pública"""
         try:
-            # Leer el contenido del archivo
-            file_content = await file.read()
-
-            # Generar un nombre único para el archivo usando UUID y conservar la extensión
-            unique_filename = f"{uuid.uuid4()}{os.path.splitext(file.filename)[1]}"
-
-            # Crear el blob en el bucket dentro del directorio deseado
-            blob = bucket.blob(f"{directory}/{unique_filename}")
-
-            # Subir el contenido del archivo a Firebase Storage
-            blob.upload_from_string(file_content, content_type=file.content_type)
-
-            # (Opcional) Hacer el archivo público para obtener una URL de acceso directo
-            blob.make_public()
-
-            # Retornar la URL pública del archivo
-            return blob.public_url
+            # La subida (nombre único con UUID, conservando la extensión) se ejecuta en el
+            # pool de almacenamiento para no bloquear el event loop
+            return await upload_executor.upload_file(file, directory)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al guardar el archivo en Firebase: {str(e)}")
 
@@ -519,9 +532,11 @@ class PropertyLotService:
                     }
                 )
         
-            # Guardar los archivos
-            public_deed_path = await self.save_file(public_deed, "uploads/files_lots/")
-            freedom_tradition_certificate_path = await self.save_file(freedom_tradition_certificate, "uploads/files_lots/")
+            # Guardar los archivos (ambas subidas en paralelo)
+            public_deed_path, freedom_tradition_certificate_path = await asyncio.gather(
+                self.save_file(public_deed, "uploads/files_lots/"),
+                self.save_file(freedom_tradition_certificate, "uploads/files_lots/")
+            )
 
             # Crear el objeto lote
             lot = Lot(
@@ -550,20 +565,17 @@ class PropertyLotService:
 
             # Agregar la relación entre el lote y la propiedad
             self.db.add(property_lot)
-            self.db.commit()  # Realizar la transacción para la relación
 
-
-            # Buscar al propietario del predio
+            # Notificar al propietario del predio en la misma transacción
             property_user = self.db.query(PropertyUser).filter(PropertyUser.property_id == property_id).first()
             if property_user:
-                user_service = UserService(self.db)
-                notification_data = NotificationCreate(
+                UserService(self.db).enqueue_notifications([NotificationCreate(
                     user_id=property_user.user_id,
                     title="Lote creado",
                     message=f"Se ha registrado el lote '{name}' en su predio",
                     type="lot_creation"
-                )
-                user_service.create_notification(notification_data)
+                )])
+            self.db.commit()  # Realizar la transacción para la relación y la notificación
 
             return JSONResponse(
                 status_code=200,
@@ -576,6 +588,10 @@ class PropertyLotService:
                 }
             )
 
+        except HTTPException:
+            # Errores con código propio (p. ej. 413 al subir un archivo demasiado grande)
+            self.db.rollback()
+            raise
         except Exception as e:
             self.db.rollback()  # Revertir cambios si ocurre algún error
             # print(str(e))
@@ -593,9 +609,10 @@ class PropertyLotService:
     def get_lots_property(self, property_id: int):
         """Obtener todos los lotes de un predio incluyendo los nombres descriptivos y la información del propietario"""
         try:
-            lots = (
-                self.db.query(
-                    Lot,
+            lot_encoder = encoder_for(Lot)
+            lots = self.db.execute(
+                select(
+                    *lot_encoder.columns,
                     TypeCrop.name.label("nombre_tipo_cultivo"),
                     PaymentInterval.name.label("nombre_intervalo_pago"),
                     Vars.name.label("nombre_estado"),
@@ -611,9 +628,8 @@ class PropertyLotService:
                 .join(Vars, Lot.state == Vars.id)
                 .join(PropertyUser, PropertyLot.property_id == PropertyUser.property_id)  # Relación con PropertyUser
                 .join(User, PropertyUser.user_id == User.id)  # Relación con User para obtener el propietario
-                .filter(PropertyLot.property_id == property_id)
-                .all()
-            )
+                .where(PropertyLot.property_id == property_id)
+            ).all()
 
             if not lots:
                 return JSONResponse(
@@ -624,20 +640,10 @@ class PropertyLotService:
                     }
                 )
 
-            # Convertir resultados a una lista de diccionarios
-            results = []
-            for lot, nombre_tipo_cultivo, nombre_intervalo_pago, nombre_estado, owner_first_last_name, owner_second_last_name, owner_name, owner_document_number in lots:
-                lot_data = jsonable_encoder(lot)
-                lot_data["nombre_tipo_cultivo"] = nombre_tipo_cultivo
-                lot_data["nombre_intervalo_pago"] = nombre_intervalo_pago
-                lot_data["nombre_estado"] = nombre_estado
-                lot_data["owner_first_last_name"] = owner_first_last_name  # Primer apellido del propietario
-                lot_data["owner_second_last_name"] = owner_second_last_name  # Segundo apellido del propietario
-                lot_data["owner_name"] = owner_name  # Nombre del propietario
-                lot_data["owner_document_number"] = owner_document_number  # Documento del propietario
-                results.append(lot_data)
+            # Convertir las filas a una lista de diccionarios (columnas del lote y del propietario)
+            results = lot_encoder.encode_all(lots)
 
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=200,
                 content={
                     "success": True,
@@ -657,8 +663,6 @@ class PropertyLotService:
                 }
             )
 
-
-
     async def edit_lot(self, lot_id: int, name: str, longitude: float, latitude: float, extension: float, 
                     real_estate_registration_number: int, public_deed: UploadFile = File(None), 
                     freedom_tradition_certificate: UploadFile = File(None)):
@@ -707,6 +711,10 @@ class PropertyLotService:
                 }
             )
 
+        except HTTPException:
+            # Errores con código propio (p. ej. 413 al subir un archivo demasiado grande)
+            self.db.rollback()
+            raise
         except Exception as e:
             self.db.rollback()
             return JSONResponse(
@@ -815,6 +823,10 @@ class PropertyLotService:
                 }
             )
 
+        except HTTPException:
+            # Errores con código propio (p. ej. 413 al subir un archivo demasiado grande)
+            self.db.rollback()
+            raise
         except Exception as e:
             self.db.rollback()  # Revertir cambios si ocurre algún error
             return JSONResponse(
@@ -831,26 +843,22 @@ class PropertyLotService:
     def get_properties_for_user(self, user_id: int):
         """Obtener todos los predios de un usuario, incluyendo el nombre del estado"""
         try:
-            results = (
-                self.db.query(
-                    Property,
+            property_encoder = encoder_for(Property)
+            results = self.db.execute(
+                select(
+                    *property_encoder.columns,
                     Vars.name.label("state_name")
                 )
                 .join(PropertyUser, PropertyUser.property_id == Property.id)
                 .join(Vars, Property.state == Vars.id)
-                .filter(PropertyUser.user_id == user_id)
-                .all()
-            )
-            properties_list = []
-            for prop, state_name in results:
-                prop_data = jsonable_encoder(prop)
-                prop_data["state_name"] = state_name
-                properties_list.append(prop_data)
+                .where(PropertyUser.user_id == user_id)
+            ).all()
+            properties_list = property_encoder.encode_all(results)
 
             if not properties_list:
                 return JSONResponse(status_code=404, content={"success": False, "data": []})
 
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=200,
                 content={
                     "success": True,
@@ -867,15 +875,16 @@ class PropertyLotService:
                     "data": None
                 }
             )
-        
+
     def get_property_by_id(self, property_id: int):
         """Obtener la información de un predio específico por su ID, incluyendo el estado, el documento, el id y el nombre del dueño."""
         try:
             # Realizamos un join similar a get_all_properties para obtener información adicional,
             # incluyendo el id, nombre, primer apellido y segundo apellido del dueño (User.id, User.first_last_name, User.second_last_name)
-            result = (
-                self.db.query(
-                    Property,
+            property_encoder = encoder_for(Property)
+            result = self.db.execute(
+                select(
+                    *property_encoder.columns,
                     Vars.name.label("state_name"),
                     User.document_number.label("owner_document_number"),
                     User.id.label("owner_id"),
@@ -886,9 +895,9 @@ class PropertyLotService:
                 .join(PropertyUser, Property.id == PropertyUser.property_id)
                 .join(User, PropertyUser.user_id == User.id)
                 .join(Vars, Property.state == Vars.id)
-                .filter(Property.id == property_id)
-                .first()
-            )
+                .where(Property.id == property_id)
+                .limit(1)
+            ).first()
             
             if not result:
                 return JSONResponse(
@@ -896,18 +905,10 @@ class PropertyLotService:
                     content={"success": False, "data": "Predio no encontrado"}
                 )
             
-            property_obj, state_name, owner_document_number, owner_id, owner_first_last_name, owner_second_last_name, owner_name = result
-            property_dict = jsonable_encoder(property_obj)
-            
-            # Agregamos los datos del propietario
-            property_dict["state_name"] = state_name
-            property_dict["owner_document_number"] = owner_document_number
-            property_dict["owner_id"] = owner_id
-            property_dict["owner_first_last_name"] = owner_first_last_name  
-            property_dict["owner_second_last_name"] = owner_second_last_name  
-            property_dict["owner_name"] = owner_name  
+            # Columnas del predio junto con el estado y los datos del propietario
+            property_dict = property_encoder.encode(result)
 
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=200,
                 content={"success": True, "data": property_dict}
             )
@@ -921,3 +922,44 @@ class PropertyLotService:
                 }
             )
 
+
+class AsyncPropertyLotService:
+    """
+    Variante asíncrona (AsyncSession) de las lecturas de predios y lotes. Cada lectura
+    ejecuta la de PropertyLotService con `run_sync`, así que ambas responden lo mismo,
+    pero no bloquea el event loop mientras espera a la base de datos.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_all_properties(self, limit: int = _PROPERTIES_PAGE_DEFAULT, cursor: str = None):
+        return await self.db.run_sync(lambda db: PropertyLotService(db).get_all_properties(limit, cursor))
+
+    @staticmethod
+    async def stream_properties():
+        """
+        Generador asíncrono NDJSON con todos los predios (un objeto JSON por línea).
+        Lee por lotes desde un cursor del lado del servidor para que la memoria se
+        mantenga constante sin importar el tamaño de la tabla. Abre su propia sesión:
+        la respuesta se envía después de cerrar las dependencias de la ruta.
+        """
+        encoder = encoder_for(Property)
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(
+                PropertyLotService._properties_listing_query().execution_options(yield_per=_PROPERTIES_STREAM_BATCH)
+            )
+            async for row in result:
+                yield json.dumps(encoder.encode(row), ensure_ascii=False) + "\n"
+
+    async def get_lot_by_id(self, lot_id: int):
+        return await self.db.run_sync(lambda db: PropertyLotService(db).get_lot_by_id(lot_id))
+
+    async def get_lots_property(self, property_id: int):
+        return await self.db.run_sync(lambda db: PropertyLotService(db).get_lots_property(property_id))
+
+    async def get_properties_for_user(self, user_id: int):
+        return await self.db.run_sync(lambda db: PropertyLotService(db).get_properties_for_user(user_id))
+
+    async def get_property_by_id(self, property_id: int):
+        return await self.db.run_sync(lambda db: PropertyLotService(db).get_property_by_id(property_id))
@@ -0,0 +1,180 @@
+"""
+Resolución de permisos por rol.
+
+El JWT ya no lleva la lista completa de permisos de cada rol: lleva los roles como
+`{id, name}` y los permisos como un bitset hexadecimal (bit `n` encendido = permiso con
+id `n`). Para autorizar, el servidor no confía en ese bitset sino que resuelve los
+permisos del conjunto de roles del token en una caché en memoria; cada consulta es un
+acceso a diccionario y una operación de bits.
+
+La caché se carga con una sola consulta y se invalida cuando `RoleService` modifica un
+rol en este proceso. Los demás workers recargan como máximo cada
+`PERMISSION_CACHE_TTL_SECONDS`.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Iterable, Optional
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import select
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Segundos que un worker usa los permisos cargados antes de releerlos
+PERMISSION_CACHE_TTL_SECONDS = float(os.getenv("PERMISSION_CACHE_TTL_SECONDS", "60"))
+
+# Estado de un rol habilitado (tabla vars); los roles inhabilitados no otorgan permisos
+ACTIVE_ROLE_STATUS = 1
+
+# Permisos exigidos por las rutas (tabla permission; la migración 0010 crea los que faltan)
+CREATE_NOTIFICATIONS_PERMISSION = "crear_notificaciones"
+
+
+def encode_permissions(permission_ids: Iterable[int]) -> str:
+    """Bitset hexadecimal con un bit encendido por cada id de permiso"""
+    mask = 0
+    for permission_id in permission_ids:
+        mask |= 1 << permission_id
+    return format(mask, "x")
+
+
+def decode_permissions(encoded: str) -> set:
+    """Ids de permiso contenidos en un bitset generado por `encode_permissions`"""
+    mask = int(encoded or "0", 16)
+    return {bit for bit in range(mask.bit_length()) if mask >> bit & 1}
+
+
+def role_ids(current_user: dict) -> frozenset:
+    """Ids de los roles incluidos en el payload del token"""
+    return frozenset(role["id"] for role in current_user.get("rol", []))
+
+
+class PermissionCache:
+    """Permisos por rol en memoria: bitmask por conjunto de roles y id por nombre de permiso"""
+
+    def __init__(self, engine=None, ttl_seconds: float = None, clock=time.monotonic):
+        self._engine = engine
+        self.ttl_seconds = PERMISSION_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Versión actual y versión con la que se cargaron los permisos en memoria
+        self.version = 0
+        self._loaded_version = 0
+        self.reset()
+
+    def reset(self):
+        """Vacía la caché; la siguiente consulta recarga todo desde la base de datos"""
+        with self._lock:
+            self._role_masks = {}
+            self._permission_ids = {}
+            self._masks = {}
+            self._expires_at = 0.0
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.database import engine
+            self._engine = engine
+        return self._engine
+
+    def invalidate(self):
+        """
+        Marca como obsoletos los permisos cargados tras cambiar un rol (nueva versión de la
+        caché); la siguiente consulta los recarga aunque no haya vencido el TTL.
+        """
+        with self._lock:
+            self.version += 1
+
+    def permission_id(self, name: str) -> Optional[int]:
+        self._maybe_reload()
+        return self._permission_ids.get(name)
+
+    def mask_for(self, roles: frozenset) -> int:
+        """Bitmask de permisos del conjunto de roles, memorizado hasta la próxima recarga"""
+        self._maybe_reload()
+        mask = self._masks.get(roles)
+        if mask is None:
+            if not roles <= self._role_masks.keys():
+                # Rol creado después de la última carga
+                self._maybe_reload(force=True)
+            # Una recarga concurrente reemplaza los diccionarios: el resultado se guarda en
+            # los mismos que se leyeron y no en los nuevos
+            masks, role_masks = self._masks, self._role_masks
+            mask = 0
+            for role_id in roles:
+                mask |= role_masks.get(role_id, 0)
+            masks[roles] = mask
+        return mask
+
+    def has_permission(self, roles: frozenset, permission: str) -> bool:
+        permission_id = self.permission_id(permission)
+        return permission_id is not None and bool(self.mask_for(roles) >> permission_id & 1)
+
+    def _is_fresh(self, now: float) -> bool:
+        return now < self._expires_at and self._loaded_version == self.version
+
+    def _maybe_reload(self, force: bool = False):
+        now = self._clock()
+        if not force and self._is_fresh(now):
+            return
+        with self._lock:
+            if not force and self._is_fresh(now):
+                return
+            try:
+                self._reload()
+            except Exception:
+                # Se conservan los permisos ya cargados y se reintenta en la siguiente consulta
+                logger.exception("No se pudo cargar la caché de permisos")
+            else:
+                self._expires_at = now + self.ttl_seconds
+                self._loaded_version = self.version
+
+    def _reload(self):
+        from app.roles.models import Permission, Role, role_permission_table
+
+        roles = Role.__table__
+        permissions = Permission.__table__
+        grants = role_permission_table
+        query = (
+            select(roles.c.id, roles.c.status, grants.c.permission_id)
+            .select_from(roles.outerjoin(grants, grants.c.rol_id == roles.c.id))
+        )
+        with self.engine.connect() as connection:
+            rows = connection.execute(query).all()
+            permission_ids = dict(connection.execute(select(permissions.c.name, permissions.c.id)).all())
+
+        role_masks = {}
+        for row in rows:
+            mask = role_masks.setdefault(row.id, 0)
+            if row.permission_id is not None and row.status == ACTIVE_ROLE_STATUS:
+                role_masks[row.id] = mask | 1 << row.permission_id
+        self._role_masks = role_masks
+        self._permission_ids = permission_ids
+        self._masks = {}
+
+
+permission_cache = PermissionCache()
+
+
+def require_permission(permission: str, detail=None):
+    """
+    Dependencia que exige un permiso (por nombre) a alguno de los roles del usuario.
+    Retorna el payload del token, igual que `AuthService.get_current_user`; `detail`
+    personaliza el error 403.
+    """
+    from app.auth.services import AuthService
+
+    def dependency(current_user: dict = Depends(AuthService.get_current_user)) -> dict:
+        if not permission_cache.has_permission(role_ids(current_user), permission):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=detail or {"success": False, "data": "No tiene permisos para realizar esta acción"}
+            )
+        return current_user
+
+    return dependency
+
@@ -4,8 +4,8 @@ from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy import text , func
 from fastapi import HTTPException
 from app.roles import models, schemas
+from app.roles.permissions import permission_cache
 from app.users.models import User
-from app.users.schemas import NotificationCreate
 from app.users.services import UserService
 
 
@@ -94,22 +94,16 @@ class RoleService:
             db_role = models.Role(name=role_data.name, description=role_data.description, status=1)
             db_role.permissions = permissions
             self.db.add(db_role)
-            self.db.commit()
-            self.db.refresh(db_role)
 
-            admins = self.db.query(User).join(models.user_role_table).join(models.Role).filter(
-                models.Role.name == "Administrador"
-            ).all()
-        
+            # El rol y el aviso a los administradores se confirman en la misma transacción
             user_service = UserService(self.db)
-            for admin in admins:
-                notification_data = NotificationCreate(
-                    user_id=admin.id,
-                    title="Nuevo rol creado",
-                    message=f"Se ha creado un nuevo rol: {db_role.name}",
-                    type="role_creation"
-                )
-                user_service.create_notification(notification_data)
+            user_service.enqueue_notifications(user_service.admin_notifications(
+                title="Nuevo rol creado",
+                message=f"Se ha creado un nuevo rol: {db_role.name}",
+                type="role_creation"
+            ))
+            self.db.commit()
+            self.db.refresh(db_role)
 
             return db_role
         except IntegrityError:
@@ -157,28 +151,22 @@ class RoleService:
                     detail={"success": False, "data": f"Los siguientes permisos no existen: {list(missing_permissions)}"}
                 )
             db_role.permissions = permissions
-            self.db.commit()
-            self.db.refresh(db_role)
 
-            admins = self.db.query(User).join(models.user_role_table).join(models.Role).filter(
-                models.Role.name == "Administrador"
-            ).all()
-        
             user_service = UserService(self.db)
-            for admin in admins:
-                notification_data = NotificationCreate(
-                    user_id=admin.id,
-                    title="Rol actualizado",
-                    message=f"El rol '{db_role.name}' ha sido actualizado",
-                    type="role_update"
-                )
-                user_service.create_notification(notification_data)
+            user_service.enqueue_notifications(user_service.admin_notifications(
+                title="Rol actualizado",
+                message=f"El rol '{db_role.name}' ha sido actualizado",
+                type="role_update"
+            ))
+            self.db.commit()
+            permission_cache.invalidate()
+            self.db.refresh(db_role)
 
-                return {
-                    "success": True,
-                    "message": "Rol editado correctamente",
-                    "data": db_role
-                }
+            return {
+                "success": True,
+                "message": "Rol editado correctamente",
+                "data": db_role
+            }
         except IntegrityError:
             self.db.rollback()
             raise HTTPException(status_code=400, detail="El rol ya existe.")
@@ -287,26 +275,20 @@ class RoleService:
                     )
             
             role.status = new_status
-            self.db.commit()
-            self.db.refresh(role)
 
             # Determinar el texto del estado para el mensaje
             status_text = "habilitado" if new_status == 1 else "inhabilitado"
         
-            # Notificar a los administradores
-            admins = self.db.query(User).join(models.user_role_table).join(models.Role).filter(
-                models.Role.name == "Administrador"
-            ).all()
-        
+            # Notificar a los administradores en la misma transacción
             user_service = UserService(self.db)
-            for admin in admins:
-                notification_data = NotificationCreate(
-                    user_id=admin.id,
-                    title="Estado de rol modificado",
-                    message=f"El rol '{role.name}' ha sido {status_text}",
-                    type="role_status_change"
-            )
-            user_service.create_notification(notification_data)
+            user_service.enqueue_notifications(user_service.admin_notifications(
+                title="Estado de rol modificado",
+                message=f"El rol '{role.name}' ha sido {status_text}",
+                type="role_status_change"
+            ))
+            self.db.commit()
+            permission_cache.invalidate()
+            self.db.refresh(role)
 
             return {"success": True, "data": "Estado del rol actualizado correctamente."}
         except Exception as e:
@@ -0,0 +1,82 @@
+import datetime
+import decimal
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import inspect
+from sqlalchemy.types import Date, DateTime, Numeric, Time, Float
+from fastapi.responses import JSONResponse
+
+# Respuesta JSON rápida: orjson es opcional, si no está instalado se usa JSONResponse
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:  # pragma: no cover - depende del entorno
+    FastJSONResponse = JSONResponse
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _to_float(value):
+    return float(value)
+
+
+def _converter_for(column_type) -> Optional[Callable]:
+    """Retorna la conversión a tipo JSON de una columna, o None si el valor ya es serializable"""
+    if isinstance(column_type, (DateTime, Date, Time)):
+        return _isoformat
+    if isinstance(column_type, Numeric) and not isinstance(column_type, Float):
+        return _to_float
+    return None
+
+
+class RowEncoder:
+    """
+    Codificador precompilado para las columnas de un modelo.
+
+    En lugar de inspeccionar cada instancia ORM con `jsonable_encoder`, se
+    seleccionan solo las columnas (`columns`) y cada fila (`Row` o mapping)
+    se convierte con las funciones calculadas una sola vez por modelo.
+    """
+
+    def __init__(self, model, exclude: Tuple[str, ...] = ()):
+        mapper = inspect(model)
+        self.model = model
+        self.keys: List[str] = []
+        self.columns = []
+        self._converters: List[Tuple[str, Callable]] = []
+        for attr in mapper.column_attrs:
+            if attr.key in exclude:
+                continue
+            self.keys.append(attr.key)
+            self.columns.append(getattr(model, attr.key))
+            converter = _converter_for(attr.columns[0].type)
+            if converter is not None:
+                self._converters.append((attr.key, converter))
+
+    def encode(self, row) -> dict:
+        """
+        Convierte una fila en diccionario serializable.
+        Las columnas adicionales de la consulta (etiquetas) se copian sin cambios.
+        """
+        data = row._asdict() if hasattr(row, "_asdict") else dict(row)
+        for key, converter in self._converters:
+            value = data.get(key)
+            if value is not None:
+                data[key] = converter(value)
+        return data
+
+    def encode_all(self, rows) -> List[dict]:
+        return [self.encode(row) for row in rows]
+
+
+_encoders: Dict[tuple, RowEncoder] = {}
+
+
+def encoder_for(model, exclude: Tuple[str, ...] = ()) -> RowEncoder:
+    """Retorna (y memoriza) el codificador de un modelo"""
+    key = (model, tuple(exclude))
+    encoder = _encoders.get(key)
+    if encoder is None:
+        encoder = _encoders[key] = RowEncoder(model, exclude)
+    return encoder
@@ -0,0 +1,280 @@
+import hashlib
+import hmac
+import mimetypes
+import os
+import shutil
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote, urlencode
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Backend de almacenamiento: "firebase" (por defecto), "local" o "memory"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND")
+STORAGE_LOCAL_DIR = os.getenv("STORAGE_LOCAL_DIR") or os.getenv("UPLOAD_LOCAL_DIR") or "files/storage"
+STORAGE_LOCAL_BASE_URL = os.getenv("STORAGE_LOCAL_BASE_URL") or os.getenv("UPLOAD_LOCAL_BASE_URL")
+STORAGE_SIGNING_KEY = os.getenv("STORAGE_SIGNING_KEY") or os.getenv("SECRET_KEY", "")
+# URL de la ruta GET /storage/{path} de la API, que valida las URLs firmadas de LocalStorage
+STORAGE_SIGNED_BASE_URL = os.getenv("STORAGE_SIGNED_BASE_URL", "/disriego/base/storage")
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class StoredObject:
+    """Metadatos de un objeto almacenado"""
+    path: str
+    size: int
+    content_type: Optional[str]
+    updated: Optional[datetime]
+
+
+class StorageBackend(ABC):
+    """
+    Interfaz común de almacenamiento de archivos.
+
+    Las operaciones son bloqueantes; los servicios las ejecutan a través de
+    `app.uploads.upload_executor` para no bloquear el event loop.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def put(self, path: str, file_obj, content_type: str = None, chunk_size: int = None) -> str:
+        """Guarda el contenido leído de `file_obj` (por fragmentos) y retorna la URL pública"""
+
+    @abstractmethod
+    def get(self, path: str) -> bytes:
+        """Retorna el contenido del objeto (FileNotFoundError si no existe)"""
+
+    @abstractmethod
+    def delete(self, path: str):
+        """Elimina el objeto (FileNotFoundError si no existe)"""
+
+    @abstractmethod
+    def signed_url(self, path: str, expires_in: int = 3600) -> str:
+        """URL de acceso temporal al objeto"""
+
+    @abstractmethod
+    def stat(self, path: str) -> Optional[StoredObject]:
+        """Metadatos del objeto, o None si no existe"""
+
+    def put_bytes(self, path: str, data: bytes, content_type: str = None) -> str:
+        return self.put(path, BytesIO(data), content_type)
+
+
+class FirebaseStorage(StorageBackend):
+    """Firebase Storage. El bucket (y las credenciales) se obtienen recién en la primera operación."""
+
+    name = "firebase"
+
+    def __init__(self, bucket=None):
+        self._bucket = bucket
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            from app.firebase_config import get_bucket
+            self._bucket = get_bucket()
+        return self._bucket
+
+    def put(self, path, file_obj, content_type=None, chunk_size=None):
+        blob = self.bucket.blob(path)
+        # Con chunk_size definido, Firebase usa una subida reanudable enviando un fragmento a la vez
+        blob.chunk_size = chunk_size
+        blob.upload_from_file(file_obj, content_type=content_type)
+        # Hacer el blob público para obtener una URL accesible
+        blob.make_public()
+        return blob.public_url
+
+    def get(self, path):
+        blob = self.bucket.get_blob(path)
+        if blob is None:
+            raise FileNotFoundError(path)
+        return blob.download_as_bytes()
+
+    def delete(self, path):
+        from google.api_core.exceptions import NotFound
+
+        try:
+            self.bucket.blob(path).delete()
+        except NotFound:
+            raise FileNotFoundError(path)
+
+    def signed_url(self, path, expires_in=3600):
+        return self.bucket.blob(path).generate_signed_url(expiration=timedelta(seconds=expires_in), version="v4")
+
+    def stat(self, path):
+        blob = self.bucket.get_blob(path)
+        if blob is None:
+            return None
+        return StoredObject(path=path, size=blob.size, content_type=blob.content_type, updated=blob.updated)
+
+
+def _sign(path: str, expires: int) -> str:
+    message = f"{path}:{expires}".encode("utf-8")
+    return hmac.new(STORAGE_SIGNING_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def verify_signed_path(path: str, expires: int, signature: str) -> bool:
+    """Valida una URL firmada por LocalStorage/MemoryStorage"""
+    return expires >= time.time() and hmac.compare_digest(_sign(path, expires), signature)
+
+
+def _signed_query(path: str, expires_in: int) -> str:
+    expires = int(time.time()) + expires_in
+    return urlencode({"expires": expires, "signature": _sign(path, expires)})
+
+
+class LocalStorage(StorageBackend):
+    """Almacenamiento en el sistema de archivos local, para desarrollo y pruebas sin conexión"""
+
+    name = "local"
+
+    def __init__(self, root=None, base_url: str = None, signed_base_url: str = None):
+        self.root = Path(root or STORAGE_LOCAL_DIR)
+        self.base_url = base_url or STORAGE_LOCAL_BASE_URL
+        self.signed_base_url = signed_base_url or STORAGE_SIGNED_BASE_URL
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, path: str) -> Path:
+        full_path = (self.root / path).resolve()
+        if self.root.resolve() not in full_path.parents:
+            raise ValueError(f"Ruta fuera del almacenamiento: {path}")
+        return full_path
+
+    def public_url(self, path: str) -> str:
+        if self.base_url:
+            return f"{self.base_url.rstrip('/')}/{quote(path)}"
+        return self._path(path).as_uri()
+
+    def put(self, path, file_obj, content_type=None, chunk_size=None):
+        full_path = self._path(path)
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        # Archivo temporal único por escritura: dos subidas a la misma ruta no comparten el temporal
+        tmp_path = full_path.with_name(f".{full_path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "xb") as destination:
+                shutil.copyfileobj(file_obj, destination, chunk_size or _COPY_CHUNK_SIZE)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return self.public_url(path)
+
+    def get(self, path):
+        return self._path(path).read_bytes()
+
+    def delete(self, path):
+        self._path(path).unlink()
+
+    def signed_url(self, path, expires_in=3600):
+        return f"{self.signed_base_url.rstrip('/')}/{quote(path)}?{_signed_query(path, expires_in)}"
+
+    def local_path(self, path: str) -> Path:
+        """Ruta en disco del objeto (FileNotFoundError si no existe)"""
+        full_path = self._path(path)
+        if not full_path.is_file():
+            raise FileNotFoundError(path)
+        return full_path
+
+    def stat(self, path):
+        full_path = self._path(path)
+        if not full_path.is_file():
+            return None
+        info = full_path.stat()
+        return StoredObject(
+            path=path,
+            size=info.st_size,
+            content_type=mimetypes.guess_type(full_path.name)[0],
+            updated=datetime.fromtimestamp(info.st_mtime, tz=timezone.utc),
+        )
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+
+class MemoryStorage(StorageBackend):
+    """Almacenamiento en memoria del proceso, para pruebas y benchmarks"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def put(self, path, file_obj, content_type=None, chunk_size=None):
+        buffer = bytearray()
+        while True:
+            chunk = file_obj.read(chunk_size or _COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            buffer.extend(chunk)
+        with self._lock:
+            self._objects[path] = (bytes(buffer), content_type, datetime.now(timezone.utc))
+        return f"memory://{path}"
+
+    def get(self, path):
+        with self._lock:
+            if path not in self._objects:
+                raise FileNotFoundError(path)
+            return self._objects[path][0]
+
+    def delete(self, path):
+        with self._lock:
+            if self._objects.pop(path, None) is None:
+                raise FileNotFoundError(path)
+
+    def signed_url(self, path, expires_in=3600):
+        return f"memory://{path}?{_signed_query(path, expires_in)}"
+
+    def stat(self, path):
+        with self._lock:
+            stored = self._objects.get(path)
+        if stored is None:
+            return None
+        data, content_type, updated = stored
+        return StoredObject(path=path, size=len(data), content_type=content_type, updated=updated)
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+
+
+_BACKENDS = {
+    "firebase": FirebaseStorage,
+    "local": LocalStorage,
+    "memory": MemoryStorage,
+}
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def create_storage(name: str = None) -> StorageBackend:
+    """Crea el backend indicado (por defecto el de STORAGE_BACKEND)"""
+    if name is None:
+        # Compatibilidad: UPLOAD_LOCAL_DIR sin STORAGE_BACKEND selecciona el disco local
+        name = STORAGE_BACKEND or ("local" if os.getenv("UPLOAD_LOCAL_DIR") else "firebase")
+    try:
+        backend_class = _BACKENDS[name.lower()]
+    except KeyError:
+        raise ValueError(f"STORAGE_BACKEND inválido: {name} (opciones: {', '.join(_BACKENDS)})")
+    return backend_class()
+
+
+def get_storage() -> StorageBackend:
+    """Backend compartido del proceso, creado en el primer uso"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+    return _storage
@@ -0,0 +1,232 @@
+import asyncio
+import math
+import os
+import threading
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from fastapi import UploadFile
+from dotenv import load_dotenv
+from app.storage import StorageBackend, get_storage
+
+load_dotenv()
+
+# Límites del subsistema de carga de archivos
+UPLOAD_MAX_WORKERS = int(os.getenv("UPLOAD_MAX_WORKERS", "8"))
+UPLOAD_MAX_CONCURRENCY = int(os.getenv("UPLOAD_MAX_CONCURRENCY", str(UPLOAD_MAX_WORKERS)))
+UPLOAD_TIMEOUT_SECONDS = float(os.getenv("UPLOAD_TIMEOUT_SECONDS", "60"))
+UPLOAD_RETRIES = int(os.getenv("UPLOAD_RETRIES", "2"))
+UPLOAD_RETRY_BACKOFF_SECONDS = float(os.getenv("UPLOAD_RETRY_BACKOFF_SECONDS", "0.5"))
+# Tamaño máximo por archivo (se verifica mientras se transmite) y tamaño de cada fragmento.
+# Las subidas reanudables de Google Cloud Storage exigen fragmentos múltiplos de 256 KiB.
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+_CHUNK_GRANULARITY = 256 * 1024
+UPLOAD_CHUNK_SIZE = max(1, math.ceil(int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024))) / _CHUNK_GRANULARITY)) * _CHUNK_GRANULARITY
+
+
+class UploadError(Exception):
+    """Error definitivo de una operación de almacenamiento (después de agotar los reintentos)"""
+
+
+class UploadTooLarge(UploadError):
+    """El archivo supera el tamaño máximo permitido (no se reintenta)"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"El archivo supera el tamaño máximo permitido de {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+class _StreamSource:
+    """
+    Origen de una subida en streaming: el archivo temporal del UploadFile y su límite de tamaño.
+
+    Cada intento abre un lector nuevo desde el inicio y cancela el del intento anterior, cuyo
+    hilo puede seguir vivo después de un timeout; el candado evita que ambos lean a la vez.
+    """
+
+    def __init__(self, file_obj, max_bytes: int):
+        self.file_obj = file_obj
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self._current = None
+
+    def open_attempt(self) -> "_LimitedReader":
+        with self.lock:
+            if self._current is not None:
+                self._current.cancelled = True
+            self.file_obj.seek(0)
+            self._current = _LimitedReader(self)
+            return self._current
+
+
+class _LimitedReader:
+    """Lector por fragmentos que corta la subida en cuanto se supera `max_bytes`"""
+
+    def __init__(self, source: _StreamSource):
+        self.source = source
+        self.position = 0
+        self.cancelled = False
+
+    def read(self, size: int = -1) -> bytes:
+        source = self.source
+        with source.lock:
+            if self.cancelled:
+                raise UploadError("intento de subida cancelado")
+            # Se lee como máximo un byte más del límite para detectar el exceso sin cargar el resto
+            remaining = source.max_bytes + 1 - self.position
+            if size is None or size < 0 or size > remaining:
+                size = remaining
+            data = source.file_obj.read(size)
+        self.position += len(data)
+        if self.position > source.max_bytes:
+            raise UploadTooLarge(source.max_bytes)
+        return data
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        with self.source.lock:
+            if whence != 0:
+                raise ValueError("solo se admite seek absoluto")
+            self.source.file_obj.seek(offset)
+            self.position = offset
+        return offset
+
+    def seekable(self) -> bool:
+        return True
+
+    def readable(self) -> bool:
+        return True
+
+
+def build_blob_path(directory: str, filename: str) -> str:
+    """Ruta única dentro del directorio conservando la extensión del archivo original"""
+    unique_filename = f"{uuid.uuid4()}{os.path.splitext(filename or '')[1]}"
+    directory = directory.strip("/")
+    return f"{directory}/{unique_filename}" if directory else unique_filename
+
+
+class UploadExecutor:
+    """
+    Ejecuta las llamadas bloqueantes al almacenamiento (StorageBackend) en un pool de hilos acotado.
+
+    - `max_workers`: hilos dedicados a operaciones de almacenamiento.
+    - `max_concurrency`: operaciones en curso por event loop; las demás esperan su turno
+      sin ocupar hilos.
+    - `timeout`: segundos por intento. El hilo no se puede interrumpir, pero la petición
+      deja de esperar y el intento se cuenta como fallido.
+    - `retries`: reintentos con espera exponencial (`backoff`, `2*backoff`, ...). Las subidas
+      son idempotentes porque la ruta del blob se fija antes del primer intento.
+    - `max_bytes` / `chunk_size`: límite por archivo y tamaño de fragmento de las subidas en streaming.
+    """
+
+    def __init__(self, storage_factory=get_storage, max_workers: int = UPLOAD_MAX_WORKERS,
+                 max_concurrency: int = UPLOAD_MAX_CONCURRENCY, timeout: float = UPLOAD_TIMEOUT_SECONDS,
+                 retries: int = UPLOAD_RETRIES, backoff: float = UPLOAD_RETRY_BACKOFF_SECONDS,
+                 max_bytes: int = UPLOAD_MAX_BYTES, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        self._storage_factory = storage_factory
+        self._storage = None
+        self._storage_lock = threading.Lock()
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    @property
+    def storage(self) -> StorageBackend:
+        if self._storage is None:
+            with self._storage_lock:
+                if self._storage is None:
+                    self._storage = self._storage_factory()
+        return self._storage
+
+    def use_storage(self, storage: StorageBackend):
+        """Reemplaza el backend (por ejemplo, MemoryStorage en pruebas)"""
+        with self._storage_lock:
+            self._storage = storage
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="storage-upload"
+                    )
+        return self._executor
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Un semáforo por event loop: asyncio.Semaphore queda ligado al loop donde se usa
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def run(self, fn, *args):
+        """Ejecuta `fn(*args)` en el pool con límite de concurrencia, timeout y reintentos"""
+        loop = asyncio.get_running_loop()
+        last_error = None
+        async with self._semaphore():
+            for attempt in range(self.retries + 1):
+                try:
+                    return await asyncio.wait_for(
+                        loop.run_in_executor(self._get_executor(), fn, *args), self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    last_error = UploadError(f"la operación superó {self.timeout:g} s")
+                except (UploadTooLarge, FileNotFoundError):
+                    # Errores definitivos: reintentar no cambia el resultado
+                    raise
+                except Exception as e:
+                    last_error = e
+                if attempt < self.retries:
+                    await asyncio.sleep(self.backoff * (2 ** attempt))
+        raise UploadError(f"{last_error} (intentos: {self.retries + 1})") from last_error
+
+    def _upload_stream(self, blob_path: str, source: _StreamSource, content_type: str) -> str:
+        return self.storage.put(blob_path, source.open_attempt(), content_type, chunk_size=self.chunk_size)
+
+    async def upload_bytes(self, blob_path: str, data: bytes, content_type: str = None) -> str:
+        """Sube el contenido y retorna la URL pública del blob"""
+        source = _StreamSource(BytesIO(data), self.max_bytes)
+        return await self.run(self._upload_stream, blob_path, source, content_type)
+
+    async def upload_file(self, file: UploadFile, directory: str, max_bytes: int = None) -> str:
+        """
+        Sube un UploadFile con un nombre único dentro de `directory` y retorna su URL pública.
+        El contenido se transmite por fragmentos desde el archivo temporal, sin cargarlo completo
+        en memoria; si supera `max_bytes` (UPLOAD_MAX_BYTES por defecto) se lanza UploadTooLarge.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if file.size is not None and file.size > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        blob_path = build_blob_path(directory, file.filename)
+        source = _StreamSource(file.file, max_bytes)
+        return await self.run(self._upload_stream, blob_path, source, file.content_type)
+
+    async def delete(self, blob_path: str):
+        await self.run(self.storage.delete, blob_path)
+
+    async def signed_url(self, blob_path: str, expires_in: int = 3600) -> str:
+        return await self.run(self.storage.signed_url, blob_path, expires_in)
+
+    async def stat(self, blob_path: str):
+        return await self.run(self.storage.stat, blob_path)
+
+    def shutdown(self, wait: bool = True):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+# Ejecutor compartido por los servicios
+upload_executor = UploadExecutor()
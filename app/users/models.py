@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -39,6 +39,8 @@ class User(Base):
 
     last_pre_register_attempt = Column(DateTime, nullable=True)
     pre_register_attempts = Column(Integer, default=0)
+    # Notificaciones sin leer: se mantiene al entregar y al marcar como leídas, sin COUNT(*)
+    unread_notifications = Column(Integer, nullable=False, default=0, server_default="0")
 
 
     roles = relationship("Role", secondary=user_role_table, back_populates="users")
@@ -48,7 +50,14 @@ class User(Base):
     pre_register_tokens = relationship("PreRegisterToken", back_populates="user")
     activation_tokens = relationship("ActivationToken", back_populates="user")
     social_accounts = relationship("SocialAccount", back_populates="user", cascade="all, delete-orphan")
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Búsqueda por documento (consulta de usuario y validación del pre-registro)
+        Index("ix_users_document_number_type_document_id", "document_number", "type_document_id"),
+        # Orden del listado de usuarios por nombre y por email
+        Index("ix_users_name_id", "name", "id"),
+        Index("ix_users_email_id", "email", "id"),
+        {'extend_existing': True},
+    )
     notifications = relationship("Notification", back_populates="user", cascade="all, delete-orphan")
 
 class RevokedToken(Base):
@@ -56,8 +65,9 @@ class RevokedToken(Base):
     __tablename__ = "revoked_tokens"
 
     id = Column(Integer, primary_key=True, index=True)
+    # SHA-256 (hexadecimal) del JWT revocado, ver app.auth.revocation
     token = Column(String, unique=True, nullable=False)
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
 
     def has_expired(self):
         return datetime.utcnow() > self.expires_at
@@ -112,7 +122,7 @@ class PasswordReset(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, index=True)
     token = Column(String, unique=True, index=True)
-    expiration = Column(DateTime, default=datetime.utcnow)
+    expiration = Column(DateTime, default=datetime.utcnow, index=True)
 
 class PreRegisterToken(Base):
     """Modelo para almacenar tokens de validación para el pre-registro."""
@@ -122,7 +132,7 @@ class PreRegisterToken(Base):
     token = Column(String, unique=True, nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
     used = Column(Boolean, default=False)
     user = relationship("User", back_populates="pre_register_tokens")
 
@@ -134,10 +144,27 @@ class ActivationToken(Base):
     token = Column(String, unique=True, nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
     used = Column(Boolean, default=False)
     user = relationship("User", back_populates="activation_tokens")
 
+class RefreshToken(Base):
+    """
+    Token de refresco (ver AuthService.rotate_refresh_token). Se guarda solo su SHA-256.
+    Cada uso lo marca como usado y emite otro de la misma familia; presentar uno ya
+    usado revoca toda la familia.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False, index=True)
+    family_id = Column(String(32), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    used_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True)
+
 class SocialAccount(Base):
     """Modelo para almacenar cuentas sociales vinculadas a usuarios"""
     __tablename__ = "social_accounts"
@@ -169,5 +196,24 @@ class Notification(Base):
     message = Column(String, nullable=False)  
     type = Column(String, nullable=False) 
     read = Column(Boolean, nullable=True) 
-    created_at = Column(DateTime, nullable=True)  
-    user = relationship("User", back_populates="notifications")
\ No newline at end of file
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    user = relationship("User", back_populates="notifications")
+    __table_args__ = (
+        # Listado por usuario ordenado por fecha y conteo de no leídas
+        Index("ix_notifications_user_id_created_at", "user_id", "created_at"),
+        Index("ix_notifications_user_id_read", "user_id", "read"),
+    )
+
+class NotificationOutbox(Base):
+    """
+    Notificaciones pendientes de entregar (outbox transaccional). Se escriben en el mismo
+    commit que el cambio que las origina y app.notifications las mueve a `notifications`.
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    title = Column(String, nullable=False)
+    message = Column(String, nullable=False)
+    type = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False)
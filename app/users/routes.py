@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form , BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form , BackgroundTasks, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 from datetime import datetime
 from app.roles.models import Role
-from app.database import get_db
+from app.roles.permissions import CREATE_NOTIFICATIONS_PERMISSION, require_permission
+from app.database import get_db, get_async_db, AsyncSessionLocal
+from app.notifications.hub import notification_hub, event_stream
 from app.users import schemas
 from app.users.models import ChangeUserStatusRequest, Notification
 from app.users.schemas import (
@@ -26,8 +30,9 @@ from app.users.schemas import (
     NotificationCreate,
     MarkReadRequest
 )
-from app.users.services import UserService
-from app.auth.services import AuthService
+from app.users.services import UserService, AsyncNotificationService
+from app.auth.revocation import revocation_cache
+from app.auth.services import AuthService, NOTIFICATION_STREAM_TOKEN_SECONDS, STREAM_TOKEN_COOKIE, oauth2_scheme
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -191,6 +196,8 @@ async def update_photo(
         user_service = UserService(db)
         photo_path = await user_service.save_profile_picture(profile_picture)
         return user_service.update_user(user_id, profile_picture=photo_path)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al actualizar la foto: {str(e)}")
 
@@ -343,13 +350,34 @@ def list_user(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error al obtener el usuario: {str(e)}")
 
 @router.get("/")
-def list_users(db: Session = Depends(get_db)):
+def list_users(
+    limit: int = Query(50, ge=1, le=200, description="Cantidad de usuarios por página"),
+    cursor: Optional[str] = Query(None, description="Cursor `next_cursor` de la página anterior"),
+    status_id: Optional[int] = Query(None, description="Filtrar por estado del usuario"),
+    type_document_id: Optional[int] = Query(None, description="Filtrar por tipo de documento"),
+    role: Optional[int] = Query(None, description="Filtrar por id de rol asignado"),
+    city: Optional[int] = Query(None, description="Filtrar por código de municipio"),
+    search: Optional[str] = Query(None, max_length=100, description="Buscar en nombre, apellidos, email o documento"),
+    sort: str = Query("id", description="Campo de orden: id, name, first_last_name, email, document_number (prefijo '-' para descendente)"),
+    include_total: bool = Query(False, description="Incluir el conteo total de resultados (una consulta COUNT adicional)"),
+    db: Session = Depends(get_db)
+):
     """
-    Lista todos los usuarios.
+    Lista los usuarios paginados por cursor, con filtros y ordenamiento.
     """
     try:
         user_service = UserService(db)
-        return user_service.list_users()
+        return user_service.list_users(
+            limit=limit,
+            cursor=cursor,
+            status_id=status_id,
+            type_document_id=type_document_id,
+            role_id=role,
+            city=city,
+            search=search,
+            sort=sort,
+            include_total=include_total
+        )
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -357,15 +385,62 @@ def list_users(db: Session = Depends(get_db)):
 
 
 @router.get("/notifications/", response_model=schemas.NotificationList)
-def get_user_notifications(
-    db: Session = Depends(get_db),
+async def get_user_notifications(
+    limit: int = Query(50, ge=1, le=200, description="Cantidad de notificaciones por página"),
+    cursor: Optional[str] = Query(None, description="Cursor `next_cursor` de la página anterior"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(AuthService.get_current_user)
 ):
     """
-    Get all notifications for the currently logged in user
+    Get the notifications of the currently logged in user, newest first and paginated by cursor
     """
-    user_service = UserService(db)
-    return user_service.get_user_notifications(current_user["id"])
+    notification_service = AsyncNotificationService(db)
+    return await notification_service.get_user_notifications(current_user["id"], limit=limit, cursor=cursor)
+
+@router.post("/notifications/stream-token", response_model=dict)
+def create_notification_stream_token(
+    request: Request,
+    response: Response,
+    token: str = Depends(oauth2_scheme),
+    current_user: dict = Depends(AuthService.get_current_user)
+):
+    """
+    Issue a short-lived token to open the notification stream from EventSource, which
+    cannot send the Authorization header. Pass it as `?token=`; it is also set as an
+    HttpOnly cookie scoped to the stream path.
+    """
+    stream_token = AuthService(None).create_stream_token(token, current_user)
+    response.set_cookie(
+        STREAM_TOKEN_COOKIE, stream_token, max_age=NOTIFICATION_STREAM_TOKEN_SECONDS,
+        path=f"{router.prefix}/notifications/stream", httponly=True, samesite="strict",
+        secure=request.url.scheme == "https",
+    )
+    return {"stream_token": stream_token, "expires_in": NOTIFICATION_STREAM_TOKEN_SECONDS}
+
+@router.get("/notifications/stream")
+async def stream_notifications(
+    request: Request,
+    session: dict = Depends(AuthService.get_stream_session)
+):
+    """
+    Stream the new notifications of the current user as Server-Sent Events.
+    Sends the unread count on connect, then `notification` events, `resync` when
+    events were dropped and a heartbeat comment while idle. The stream ends with
+    `session_ended` when the access token it was opened with expires or is revoked.
+    """
+    # Sesión propia y breve: la conexión no retiene una conexión del pool mientras dura
+    async with AsyncSessionLocal() as db:
+        unread = await AsyncNotificationService(db).get_unread_notification_count(session["id"])
+    subscription = await notification_hub.subscribe(session["id"])
+    return StreamingResponse(
+        event_stream(
+            notification_hub, subscription, unread["count"], request.is_disconnected,
+            expires_at=session["expires_at"],
+            is_revoked=lambda: revocation_cache.is_digest_revoked_async(session["access"]),
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.post("/notifications/mark-read", response_model=dict)
 def mark_notifications_as_read(
@@ -377,46 +452,38 @@ def mark_notifications_as_read(
     Mark notifications as read.
     If mark_all is true, all notifications will be marked as read.
     Otherwise, only the notifications with IDs in notification_ids will be marked.
+    With `before`, only notifications created up to that moment are marked; on its own
+    it marks all of them. The response lists the IDs that changed.
     """
     user_service = UserService(db)
     return user_service.mark_notifications_as_read(
         user_id=current_user["id"],
         notification_ids=request.notification_ids,
-        mark_all=request.mark_all
+        mark_all=request.mark_all,
+        before=request.before
     )
 
 @router.post("/notifications/", response_model=dict, status_code=status.HTTP_201_CREATED)
 def create_notification(
     notification: schemas.NotificationCreate,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(AuthService.get_current_user)
+    current_user: dict = Depends(require_permission(
+        CREATE_NOTIFICATIONS_PERMISSION, detail={"success": False, "data": "No tiene permisos para crear notificaciones"}
+    ))
 ):
     """
-    Create a new notification (admin only)
+    Create a new notification (requires the `crear_notificaciones` permission)
     """
-    # Check if the user has admin permissions
-    has_admin_role = False
-    for role in current_user.get("rol", []):
-        if role.get("name") == "Administrador":
-            has_admin_role = True
-            break
-    
-    if not has_admin_role:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={"success": False, "data": "No tiene permisos para crear notificaciones"}
-        )
-    
     user_service = UserService(db)
     return user_service.create_notification(notification)
 
 @router.get("/notifications/unread-count", response_model=dict)
-def get_unread_notification_count(
-    db: Session = Depends(get_db),
+async def get_unread_notification_count(
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(AuthService.get_current_user)
 ):
     """
     Get count of unread notifications for the current user
     """
-    user_service = UserService(db)
-    return user_service.get_unread_notification_count(current_user["id"])
\ No newline at end of file
+    notification_service = AsyncNotificationService(db)
+    return await notification_service.get_unread_notification_count(current_user["id"])
\ No newline at end of file
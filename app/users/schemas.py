@@ -84,6 +84,7 @@ class UserResponse(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
 
 # Modelo para el login de usuario
 class UserLogin(BaseModel):
@@ -279,13 +280,21 @@ class NotificationResponse(NotificationBase):
     class Config:
         orm_mode = True
 
+class NotificationPagination(BaseModel):
+    """Cursor pagination data for the notifications list"""
+    limit: int
+    next_cursor: Optional[str] = None
+    has_more: bool
+
 class NotificationList(BaseModel):
-    """Schema for a list of notifications"""
+    """Schema for a page of notifications"""
     success: bool
     data: List[NotificationResponse]
     unread_count: int
+    pagination: Optional[NotificationPagination] = None
 
 class MarkReadRequest(BaseModel):
     """Schema for marking notifications as read"""
     notification_ids: Optional[List[int]] = None
-    mark_all: bool = False
\ No newline at end of file
+    mark_all: bool = False
+    before: Optional[datetime] = None
\ No newline at end of file
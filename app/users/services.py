@@ -7,27 +7,61 @@ from typing import List, Optional
 from fastapi import HTTPException, Depends, status, UploadFile
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import desc
-from app.users.models import Notification
+from sqlalchemy import desc, func, or_, exists, cast, tuple_, select, insert, update, String
+from app.users.models import Notification, NotificationOutbox
 from app.users import schemas
 from app.users.models import Gender, Status, TypeDocument, User, PasswordReset, PreRegisterToken, ActivationToken
 from app.users.schemas import UserCreateRequest, ChangePasswordRequest, UserUpdateInfo, AdminUserCreateResponse, PreRegisterResponse, ActivateAccountResponse , NotificationCreate
-from app.roles.models import Role
-from Crypto.Protocol.KDF import scrypt
-from passlib.context import CryptContext
+from app.roles.models import Role, user_role_table
 from fastapi.security import OAuth2PasswordBearer
 from app.auth.services import SECRET_KEY, ALGORITHM
 from jose import jwt, JWTError
 from fastapi.responses import JSONResponse
-from app.firebase_config import bucket
+from app.uploads import upload_executor, UploadTooLarge
+from app.passwords import password_hasher, PasswordHasherBusy
+from app.pagination import encode_cursor, decode_cursor
+from app.notifications.hub import notification_hub
+from app.serializers import encoder_for
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 _activation_resend_timestamps = {}
 _RATE_LIMIT_SECONDS = 60
 
+# Paginación del listado de usuarios
+_USERS_PAGE_DEFAULT = 50
+_USERS_PAGE_MAX = 200
+# Se ordena sobre la columna sin transformar para aprovechar los índices (name, id) y
+# (email, id); los nulos van al final en orden ascendente y al principio en descendente
+_USER_SORT_FIELDS = {
+    "id": User.id,
+    "name": User.name,
+    "first_last_name": User.first_last_name,
+    "email": User.email,
+    "document_number": User.document_number,
+}
+
+
+def _is_cursor_value(value, expected_type) -> bool:
+    """Indica si un valor decodificado del cursor es del tipo de la columna (un bool no cuenta como int)"""
+    return isinstance(value, expected_type) and not isinstance(value, bool)
+
+
+def _escape_like(text: str) -> str:
+    """Escapa los comodines de LIKE para buscar el texto literal (se usa con escape="\\")"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Paginación de las notificaciones del usuario
+_NOTIFICATIONS_PAGE_DEFAULT = 50
+_NOTIFICATIONS_PAGE_MAX = 200
+
+# Rol que recibe los avisos generales (nuevos predios, cambios en roles)
+ADMIN_ROLE_NAME = "Administrador"
+# Filas por sentencia INSERT al encolar notificaciones en bloque
+_NOTIFICATIONS_INSERT_BATCH = 500
+
 
 class UserService:
     """Clase para gestionar la creación y obtención de usuarios"""
@@ -41,15 +75,9 @@ class UserService:
         y retorna la URL pública del archivo.
         """
         try:
-            file_content = await file.read()
-            unique_filename = f"{uuid.uuid4()}{os.path.splitext(file.filename)[1]}"
-            directory = "uploads/profile_pictures/"
-            if not directory.endswith("/"):
-                directory += "/"
-            blob = bucket.blob(f"{directory}{unique_filename}")
-            blob.upload_from_string(file_content, content_type=file.content_type)
-            blob.make_public()
-            return blob.public_url
+            return await upload_executor.upload_file(file, "uploads/profile_pictures/")
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al guardar la imagen de perfil en Firebase: {str(e)}")
         
@@ -215,20 +243,29 @@ class UserService:
             )
 
     def hash_password(self, password: str) -> tuple:
-        """Genera un hash de la contraseña con salt aleatorio"""
+        """Genera un hash de la contraseña con salt aleatorio (en el pool de app.passwords)"""
+        try:
+            return password_hasher.hash(password)
+        except PasswordHasherBusy:
+            raise HTTPException(status_code=503, detail="Servicio ocupado, intente de nuevo en unos segundos", headers={"Retry-After": "1"})
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Contacta con el administrador: {str(e)}")
+
+    async def hash_password_async(self, password: str) -> tuple:
+        """Igual que hash_password, sin bloquear el event loop"""
         try:
-            salt = os.urandom(16)
-            key = scrypt(password.encode(), salt, key_len=32, N=2**14, r=8, p=1)
-            return salt.hex(), key.hex()
+            return await password_hasher.hash_async(password)
+        except PasswordHasherBusy:
+            raise HTTPException(status_code=503, detail="Servicio ocupado, intente de nuevo en unos segundos", headers={"Retry-After": "1"})
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Contacta con el administrador: {str(e)}")
 
     def verify_password(self, stored_salt: str, stored_hash: str, password: str) -> bool:
         """Verifica la contraseña ingresada contra el hash almacenado"""
         try:
-            salt = bytes.fromhex(stored_salt)
-            key = scrypt(password.encode(), salt, key_len=32, N=2**14, r=8, p=1)
-            return key.hex() == stored_hash
+            return password_hasher.verify(stored_salt, stored_hash, password)
+        except PasswordHasherBusy:
+            raise HTTPException(status_code=503, detail="Servicio ocupado, intente de nuevo en unos segundos", headers={"Retry-After": "1"})
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Contacta con el administrador: {str(e)}")
 
@@ -240,20 +277,17 @@ class UserService:
                 raise HTTPException(status_code=404, detail="Usuario no encontrado")
             for key, value in kwargs.items():
                 setattr(db_user, key, value)
-            self.db.commit()
-            self.db.refresh(db_user)
-            
+
             if admin_update:
-                # Registro para ver que se dispara la notificación
-                print(f"[DEBUG] Creando notificación para el usuario {user_id}.")
-                notification_data = schemas.NotificationCreate(
+                # Se entrega en segundo plano; queda en la misma transacción que el cambio
+                self.enqueue_notifications([schemas.NotificationCreate(
                     user_id=user_id,
                     title="Información actualizada",
                     message="Su información ha sido actualizada por un administrador.",
                     type="admin_edit"  # Puedes modificar según tu convención
-                )
-                notification_res = self.create_notification(notification_data)
-                print(f"[DEBUG] Resultado de la notificación: {notification_res}")
+                )])
+            self.db.commit()
+            self.db.refresh(db_user)
                 
             return {"success": True, "data": "Usuario actualizado correctamente"}
         except Exception as e:
@@ -264,8 +298,98 @@ class UserService:
             }})
 
 
-    def list_users(self):
+    def list_users(
+        self,
+        limit: int = _USERS_PAGE_DEFAULT,
+        cursor: Optional[str] = None,
+        status_id: Optional[int] = None,
+        type_document_id: Optional[int] = None,
+        role_id: Optional[int] = None,
+        city: Optional[int] = None,
+        search: Optional[str] = None,
+        sort: str = "id",
+        include_total: bool = False
+    ):
+        """
+        Lista usuarios con paginación por cursor (keyset) sobre `users.id`.
+
+        Args:
+            limit: Cantidad máxima de usuarios por página
+            cursor: Cursor opaco devuelto en `next_cursor` por la página anterior
+            status_id, type_document_id, role_id, city: Filtros exactos opcionales
+            search: Texto a buscar en nombre, apellidos, email o número de documento
+            sort: Campo de ordenamiento (`id`, `name`, `first_last_name`, `email`,
+                `document_number`); con prefijo `-` el orden es descendente
+            include_total: Si es True se ejecuta además el conteo total
+
+        Returns:
+            Diccionario con los usuarios de la página y los datos de paginación
+        """
         try:
+            descending = sort.startswith("-")
+            sort_field = sort[1:] if descending else sort
+            if sort_field not in _USER_SORT_FIELDS:
+                raise HTTPException(status_code=400, detail={
+                    "success": False,
+                    "data": f"Ordenamiento no válido. Opciones: {', '.join(_USER_SORT_FIELDS)}"
+                })
+            limit = max(1, min(limit, _USERS_PAGE_MAX))
+            sort_column = _USER_SORT_FIELDS[sort_field]
+
+            conditions = []
+            if status_id is not None:
+                conditions.append(User.status_id == status_id)
+            if type_document_id is not None:
+                conditions.append(User.type_document_id == type_document_id)
+            if city is not None:
+                conditions.append(User.city == city)
+            if role_id is not None:
+                conditions.append(
+                    exists().where(
+                        user_role_table.c.user_id == User.id,
+                        user_role_table.c.rol_id == role_id
+                    )
+                )
+            if search and search.strip():
+                pattern = f"%{_escape_like(search.strip())}%"
+                conditions.append(or_(
+                    User.name.ilike(pattern, escape="\\"),
+                    User.first_last_name.ilike(pattern, escape="\\"),
+                    User.second_last_name.ilike(pattern, escape="\\"),
+                    User.email.ilike(pattern, escape="\\"),
+                    cast(User.document_number, String).ilike(pattern, escape="\\")
+                ))
+
+            total = self.db.query(func.count(User.id)).filter(*conditions).scalar() if include_total else None
+
+            if cursor:
+                last_value, last_id = decode_cursor(cursor, 2)
+                if not _is_cursor_value(last_id, int) or (
+                    last_value is not None and not _is_cursor_value(last_value, sort_column.type.python_type)
+                ):
+                    raise HTTPException(status_code=400, detail={"success": False, "data": "Cursor de paginación inválido."})
+                if sort_field == "id":
+                    conditions.append(User.id < last_id if descending else User.id > last_id)
+                elif last_value is None:
+                    if descending:
+                        conditions.append(or_(sort_column.isnot(None), User.id < last_id))
+                    else:
+                        conditions.append(sort_column.is_(None))
+                        conditions.append(User.id > last_id)
+                else:
+                    key = tuple_(sort_column, User.id)
+                    if descending:
+                        conditions.append(key < (last_value, last_id))
+                    else:
+                        conditions.append(or_(key > (last_value, last_id), sort_column.is_(None)))
+
+            if sort_field == "id":
+                order = [User.id.desc() if descending else User.id.asc()]
+            elif descending:
+                order = [sort_column.desc().nulls_first(), User.id.desc()]
+            else:
+                order = [sort_column.asc().nulls_last(), User.id.asc()]
+
             users = (
                 self.db.query(
                     User.id,
@@ -289,16 +413,21 @@ class UserService:
                     User.country,
                     User.department,
                     User.city,
-                    User.first_login_complete
+                    User.first_login_complete,
+                    sort_column.label("sort_value")
                 )
                 .outerjoin(User.type_document)
                 .outerjoin(User.status_user)
                 .outerjoin(User.gender)
+                .filter(*conditions)
+                .order_by(*order)
+                .limit(limit + 1)
                 .all()
             )
 
-            if not users:
-                raise HTTPException(status_code=404, detail="No se encontraron usuarios.")
+            has_more = len(users) > limit
+            users = users[:limit]
+            roles_by_user = self._get_roles_by_user([user.id for user in users])
 
             users_list = []
             for user in users:
@@ -324,16 +453,28 @@ class UserService:
                     "country": user.country,
                     "department": user.department,
                     "city": user.city,
-                    "first_login_complete": user.first_login_complete
+                    "first_login_complete": user.first_login_complete,
+                    "roles": roles_by_user.get(user.id, [])
                 }
-
-                user_obj = self.db.query(User).filter(User.id == user.id).first()
-                user_roles = [{"id": role.id, "name": role.name} for role in user_obj.roles] if user_obj.roles else []
-                user_dict["roles"] = user_roles
-
                 users_list.append(user_dict)
 
-            return jsonable_encoder({"success": True, "data": users_list})
+            next_cursor = None
+            if has_more:
+                last = users[-1]
+                next_cursor = encode_cursor(last.sort_value, last.id)
+
+            return jsonable_encoder({
+                "success": True,
+                "data": users_list,
+                "pagination": {
+                    "limit": limit,
+                    "next_cursor": next_cursor,
+                    "has_more": has_more,
+                    "total": total
+                }
+            })
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail={
                 "success": False,
@@ -343,6 +484,26 @@ class UserService:
                 }
             })
 
+    def _get_roles_by_user(self, user_ids: List[int]) -> dict:
+        """
+        Obtiene los roles de varios usuarios en una sola consulta sobre `user_rol`
+        y los agrupa por id de usuario.
+        """
+        roles_by_user = {}
+        if not user_ids:
+            return roles_by_user
+
+        rows = (
+            self.db.query(user_role_table.c.user_id, Role.id, Role.name)
+            .join(Role, Role.id == user_role_table.c.rol_id)
+            .filter(user_role_table.c.user_id.in_(user_ids))
+            .order_by(user_role_table.c.user_id, Role.id)
+            .all()
+        )
+        for user_id, role_id, role_name in rows:
+            roles_by_user.setdefault(user_id, []).append({"id": role_id, "name": role_name})
+        return roles_by_user
+
     def change_user_status(self, user_id: int, new_status: int):
         try:
             user = self.db.query(User).filter(User.id == user_id).first()
@@ -354,18 +515,17 @@ class UserService:
                 raise HTTPException(status_code=400, detail="Estado no válido.")
 
             user.status_id = new_status
-            self.db.commit()
-            self.db.refresh(user)
 
             # Verificar si el nuevo estado representa una inhabilitación; en este ejemplo, usamos new_status == 0.
             if new_status == 0:
-                notification_data = schemas.NotificationCreate(
+                self.enqueue_notifications([schemas.NotificationCreate(
                     user_id=user_id,
                     title="Cuenta inhabilitada",
                     message="Su cuenta ha sido inhabilitada por un administrador.",
                     type="admin_inactivation"
-                )
-                self.create_notification(notification_data)
+                )])
+            self.db.commit()
+            self.db.refresh(user)
 
             return {"success": True, "data": "Estado de usuario actualizado correctamente."}
 
@@ -427,18 +587,15 @@ class UserService:
         user.password_salt = new_salt
         self.db.commit()
         
-        # Eliminar el token usado
+        # Eliminar el token usado; el aviso se confirma junto con el borrado
         self.db.delete(password_reset)
-        self.db.commit()
-
-        
-        notification_data = schemas.NotificationCreate(
+        self.enqueue_notifications([schemas.NotificationCreate(
             user_id=user.id,
             title="Cambio de contraseña",
             message="Tu contraseña ha sido actualizada correctamente. Si no realizaste este cambio, contacta con soporte.",
             type="security"
-        )
-        self.create_notification(notification_data)
+        )])
+        self.db.commit()
 
         return {"message": "Contraseña actualizada correctamente"}
 
@@ -469,19 +626,15 @@ class UserService:
             new_salt, new_hash = self.hash_password(password_data.new_password)
             user.password = new_hash
             user.password_salt = new_salt
-            self.db.commit()
 
-            # 5. Crear notificación
-            notification_data = NotificationCreate(
+            # 5. Encolar la notificación en la misma transacción que el cambio
+            self.enqueue_notifications([NotificationCreate(
                 user_id=user.id,
                 title="Cambio de contraseña",
                 message="Has actualizado tu contraseña correctamente. Si no realizaste este cambio, contacta con soporte.",
                 type="security"
-            )
-            notification_res = self.create_notification(notification_data)
-
-            # 6. LOG de depuración
-            print(f"[DEBUG] change_user_password → create_notification devolvió: {notification_res}")
+            )])
+            self.db.commit()
 
             return {"success": True, "data": "Contraseña actualizada correctamente"}
 
@@ -567,7 +720,7 @@ class UserService:
             if existing_email:
                 raise HTTPException(status_code=400, detail="Este correo electrónico ya está registrado. Por favor utilice otro.")
 
-            salt, hash_password = self.hash_password(password)
+            salt, hash_password = await self.hash_password_async(password)
             user.email = email
             user.password = hash_password
             user.password_salt = salt
@@ -594,6 +747,9 @@ class UserService:
                 token=activation_token
             )
 
+        except HTTPException as e:
+            self.db.rollback()
+            raise e
         except ValueError as e:
             self.db.rollback()
             raise HTTPException(status_code=400, detail=f"Error en el pre-registro: {str(e)}")
@@ -763,17 +919,14 @@ class UserService:
                 db_user.roles = roles_obj
 
             self.db.add(db_user)
-            self.db.commit()
-            self.db.refresh(db_user)
-
-            
-            notification_data = schemas.NotificationCreate(
+            self.enqueue_notifications([schemas.NotificationCreate(
                 user_id=admin_id,  
                 title="Nuevo usuario creado",
                 message=f"Se ha creado un nuevo usuario: {db_user.name} {db_user.first_last_name}.",
                 type="user_creation"
-            )
-            self.create_notification(notification_data)
+            )])
+            self.db.commit()
+            self.db.refresh(db_user)
 
             return {"success": True, "message": "Usuario creado correctamente", "user_id": db_user.id}
 
@@ -801,32 +954,56 @@ class UserService:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al obtener géneros: {str(e)}")
 
-    def get_user_notifications(self, user_id: int):
+    def get_user_notifications(self, user_id: int, limit: int = _NOTIFICATIONS_PAGE_DEFAULT, cursor: Optional[str] = None):
         """
-        Get all notifications for a specific user
+        Get a page of notifications for a specific user, newest first
         
         Args:
             user_id: ID of the user
+            limit: Maximum number of notifications in the page
+            cursor: Opaque `next_cursor` returned by the previous page
             
         Returns:
-            Dictionary with success status and list of notifications
+            Dictionary with success status, the page of notifications, unread count and pagination data
         """
         try:
-            user = self.db.query(User).filter(User.id == user_id).first()
-            if not user:
+            # Contador mantenido en users (búsqueda por clave primaria); también confirma que el usuario existe
+            unread_count = self.db.execute(select(User.unread_notifications).where(User.id == user_id)).scalar()
+            if unread_count is None:
                 return {"success": False, "data": [], "unread_count": 0, "message": "Usuario no encontrado"}
             
-            notifications = self.db.query(Notification).filter(
-                Notification.user_id == user_id
-            ).order_by(desc(Notification.created_at)).all()
-            
-            # Count unread notifications
-            unread_count = self.db.query(Notification).filter(
-                Notification.user_id == user_id,
-                Notification.read == False
-            ).count()
-            
-            return {"success": True, "data": notifications, "unread_count": unread_count}
+            limit = max(1, min(limit, _NOTIFICATIONS_PAGE_MAX))
+            # Solo columnas (sin instancias ORM), de la más reciente a la más antigua por cursor
+            # sobre (created_at, id); se pide un registro extra para saber si hay más
+            query = (
+                select(*encoder_for(Notification).columns)
+                .where(Notification.user_id == user_id)
+                .order_by(desc(Notification.created_at), desc(Notification.id))
+            )
+            if cursor:
+                last_created_at, last_id = decode_cursor(cursor, 2)
+                try:
+                    last_created_at = datetime.fromisoformat(last_created_at)
+                    if isinstance(last_id, bool) or not isinstance(last_id, int):
+                        raise ValueError("Id de cursor inválido")
+                except (TypeError, ValueError):
+                    raise HTTPException(status_code=400, detail={"success": False, "data": "Cursor de paginación inválido."})
+                query = query.where(tuple_(Notification.created_at, Notification.id) < (last_created_at, last_id))
+            rows = self.db.execute(query.limit(limit + 1)).mappings().all()
+
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            next_cursor = None
+            if has_more:
+                next_cursor = encode_cursor(rows[-1]["created_at"].isoformat(), rows[-1]["id"])
+            return {
+                "success": True,
+                "data": rows,
+                "unread_count": unread_count,
+                "pagination": {"limit": limit, "next_cursor": next_cursor, "has_more": has_more},
+            }
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500, 
@@ -861,8 +1038,12 @@ class UserService:
             )
             
             self.db.add(new_notification)
+            # Incremento en SQL (UPDATE ... SET unread_notifications = unread_notifications + 1)
+            user.unread_notifications = User.unread_notifications + 1
             self.db.commit()
             self.db.refresh(new_notification)
+            # Las conexiones SSE de este proceso la reciben sin esperar la siguiente lectura
+            notification_hub.wake()
             
             return {"success": True, "data": {"id": new_notification.id}}
         except Exception as e:
@@ -875,37 +1056,96 @@ class UserService:
                 }}
             )
 
-    def mark_notifications_as_read(self, user_id: int, notification_ids: List[int] = None, mark_all: bool = False):
+    def get_admin_ids(self, exclude: Optional[int] = None) -> List[int]:
+        """Ids de los administradores, en una sola consulta; `exclude` omite un usuario"""
+        # Solo ids: para notificar no hace falta cargar los usuarios
+        admin_ids = self.db.execute(
+            select(user_role_table.c.user_id)
+            .join(Role, Role.id == user_role_table.c.rol_id)
+            .where(Role.name == ADMIN_ROLE_NAME)
+            .distinct()
+        ).scalars()
+        return [user_id for user_id in admin_ids if user_id != exclude]
+
+    def admin_notifications(self, title: str, message: str, type: str, exclude: Optional[int] = None) -> List[NotificationCreate]:
+        """Una notificación igual para cada administrador, lista para `enqueue_notifications`"""
+        return [
+            NotificationCreate(user_id=admin_id, title=title, message=message, type=type)
+            for admin_id in self.get_admin_ids(exclude)
+        ]
+
+    def enqueue_notifications(self, notifications: List[NotificationCreate]) -> int:
+        """
+        Registra notificaciones en el outbox con INSERT ... VALUES de varias filas, dentro de
+        la transacción del llamador: no hace commit ni vuelve a consultar a los destinatarios.
+        Se entregan en segundo plano (ver app.notifications). Retorna cuántas se encolaron.
+        """
+        now = datetime.now()
+        rows = [
+            {
+                "user_id": notification.user_id,
+                "title": notification.title,
+                "message": notification.message,
+                "type": notification.type,
+                "created_at": now,
+            }
+            for notification in notifications
+        ]
+        for start in range(0, len(rows), _NOTIFICATIONS_INSERT_BATCH):
+            self.db.execute(insert(NotificationOutbox).values(rows[start:start + _NOTIFICATIONS_INSERT_BATCH]))
+        return len(rows)
+
+    def mark_notifications_as_read(
+        self,
+        user_id: int,
+        notification_ids: List[int] = None,
+        mark_all: bool = False,
+        before: Optional[datetime] = None
+    ):
         """
-        Mark specific or all notifications as read for a user
+        Mark specific or all notifications as read for a user, with a single UPDATE
         
         Args:
             user_id: ID of the user
             notification_ids: List of notification IDs to mark as read (optional)
             mark_all: Flag to mark all user's notifications as read
+            before: Only mark notifications created up to this moment; on its own
+                it marks all the user's notifications before that timestamp
             
         Returns:
-            Dictionary with success status and message
+            Dictionary with success status, message, how many notifications changed
+            and their IDs (None when the database does not support RETURNING)
         """
         try:
-            user = self.db.query(User).filter(User.id == user_id).first()
-            if not user:
-                return {"success": False, "message": "Usuario no encontrado"}
-            
-            if mark_all:
-                # Mark all notifications as read
-                self.db.query(Notification).filter(
-                    Notification.user_id == user_id
-                ).update({"read": True})
-            elif notification_ids:
-                # Mark specific notifications as read
-                self.db.query(Notification).filter(
-                    Notification.id.in_(notification_ids),
-                    Notification.user_id == user_id
-                ).update({"read": True})
-            
+            # La pertenencia se valida en el WHERE: los ids de otros usuarios no se tocan
+            conditions = [Notification.user_id == user_id, Notification.read == False]
+            if not mark_all:
+                if notification_ids:
+                    conditions.append(Notification.id.in_(notification_ids))
+                elif before is None:
+                    return {"success": True, "message": "Notificaciones marcadas como leídas", "data": {"marked": 0, "ids": []}}
+            if before is not None:
+                conditions.append(Notification.created_at <= before)
+
+            statement = update(Notification).where(*conditions).values(read=True)
+            options = {"synchronize_session": False}
+            if self.db.get_bind().dialect.update_returning:
+                ids = list(self.db.execute(statement.returning(Notification.id), execution_options=options).scalars())
+                marked = len(ids)
+            else:
+                ids = None
+                marked = self.db.execute(statement, execution_options=options).rowcount
+
+            # Solo las que estaban sin leer descuentan del contador, en la misma transacción
+            if marked:
+                self.db.execute(
+                    update(User)
+                    .where(User.id == user_id)
+                    .values(unread_notifications=User.unread_notifications - marked),
+                    execution_options=options
+                )
             self.db.commit()
-            return {"success": True, "message": "Notificaciones marcadas como leídas"}
+            return {"success": True, "message": "Notificaciones marcadas como leídas", "data": {"marked": marked, "ids": ids}}
         except Exception as e:
             self.db.rollback()
             raise HTTPException(
@@ -927,12 +1167,9 @@ class UserService:
             Dictionary with success status and count
         """
         try:
-            count = self.db.query(Notification).filter(
-                Notification.user_id == user_id,
-                Notification.read == False
-            ).count()
+            count = self.db.execute(select(User.unread_notifications).where(User.id == user_id)).scalar()
             
-            return {"success": True, "count": count}
+            return {"success": True, "count": count or 0}
         except Exception as e:
             raise HTTPException(
                 status_code=500, 
@@ -940,4 +1177,20 @@ class UserService:
                     "title": "Error al obtener conteo de notificaciones",
                     "message": str(e),
                 }}
-            )
\ No newline at end of file
+            )
+
+
+class AsyncNotificationService:
+    """
+    Lecturas de notificaciones sobre una AsyncSession (sin bloquear el event loop);
+    ejecutan las de UserService con `run_sync`.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_user_notifications(self, user_id: int, limit: int = _NOTIFICATIONS_PAGE_DEFAULT, cursor: Optional[str] = None):
+        return await self.db.run_sync(lambda db: UserService(db).get_user_notifications(user_id, limit, cursor))
+
+    async def get_unread_notification_count(self, user_id: int):
+        return await self.db.run_sync(lambda db: UserService(db).get_unread_notification_count(user_id))
@@ -0,0 +1,93 @@
+"""
+Benchmark del costo de autenticación por petición.
+
+Compara `AuthService.get_current_user` (caché de firmas verificadas más la caché de
+revocaciones en memoria), la misma dependencia verificando la firma en cada petición y
+una verificación que consulta `revoked_tokens` en cada petición, sobre una base SQLite
+con tokens revocados sembrados.
+
+Uso:
+    python -m benchmarks.bench_auth --revoked 50000 --requests 20000
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from jose import jwt
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.pool import StaticPool
+
+from app.auth import services as auth_services
+from app.auth.revocation import RevocationCache, token_digest
+from app.auth.services import ALGORITHM, SECRET_KEY, AuthService
+from app.auth.tokens import TokenVerifier
+from app.database import Base
+from app.users.models import RevokedToken
+
+
+class QueryCounter:
+    """Cuenta las sentencias SQL emitidas por un engine."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def seed(engine, total: int):
+    expires_at = datetime.utcnow() + timedelta(minutes=30)
+    with engine.begin() as connection:
+        connection.execute(RevokedToken.__table__.insert(), [
+            {"token": token_digest(f"token-{i}"), "expires_at": expires_at} for i in range(total)
+        ])
+
+
+def current_user_with_db(engine, token: str) -> dict:
+    """Verificación anterior: decodificar y buscar el token en revoked_tokens"""
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    with engine.connect() as connection:
+        revoked = connection.execute(
+            select(RevokedToken.id).where(RevokedToken.token == token_digest(token))
+        ).first()
+    if revoked:
+        raise RuntimeError("token revocado")
+    return payload
+
+
+def run(label, fn, engine, requests: int):
+    counter = QueryCounter(engine)
+    start = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", counter._on_execute)
+    print(f"{label:<28} {elapsed / requests * 1e6:10.1f} µs/petición {counter.count:10d} consultas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--revoked", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    seed(engine, args.revoked)
+    auth_services.revocation_cache = RevocationCache(engine)
+
+    token = AuthService(None).create_access_token({"sub": "ana@disriego.test", "id": 1})
+    print(f"Tokens revocados sembrados: {args.revoked}")
+    run("solo decodificar JWT", lambda: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]), engine, args.requests)
+    run("caché en memoria", lambda: AuthService.get_current_user(token), engine, args.requests)
+    auth_services.token_verifier = TokenVerifier(SECRET_KEY, ALGORITHM, max_size=0)
+    run("sin caché de firmas", lambda: AuthService.get_current_user(token), engine, args.requests)
+    run("consulta por petición", lambda: current_user_with_db(engine, token), engine, args.requests)
+
+
+if __name__ == "__main__":
+    main()
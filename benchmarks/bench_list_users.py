@@ -0,0 +1,127 @@
+"""
+Benchmark de `UserService.list_users` sobre una base SQLite sembrada.
+
+Compara el listado paginado (roles de la página resueltos en una sola consulta
+sobre `user_rol`) con el recorrido anterior, que consultaba cada usuario y sus
+roles por separado (2N+1 consultas). También mide la primera y la última página
+para verificar que la paginación por cursor mantiene el tiempo constante.
+
+Uso:
+    python -m benchmarks.bench_list_users --users 20000
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.roles.models import Role, Vars, user_role_table
+from app.users.models import Gender, Status, TypeDocument, User
+from app.users.services import UserService
+
+
+class QueryCounter:
+    """Cuenta las sentencias SQL emitidas por un engine."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def seed(session, total_users: int):
+    session.add_all([Vars(id=1, name="Activo")])
+    session.add_all([
+        Role(id=1, name="Administrador", description="Admin", status=1),
+        Role(id=2, name="Usuario", description="Usuario", status=1),
+    ])
+    session.add_all([Status(id=1, name="Activo", description="Activo")])
+    session.add_all([TypeDocument(id=1, name="CC")])
+    session.add_all([Gender(id=1, name="Hombre")])
+    session.flush()
+
+    session.execute(User.__table__.insert(), [
+        {
+            "id": i,
+            "email": f"user{i}@disriego.test",
+            "name": f"Usuario {i}",
+            "document_number": 10_000_000 + i,
+            "type_document_id": 1,
+            "status_id": 1,
+            "gender_id": 1,
+        }
+        for i in range(1, total_users + 1)
+    ])
+    session.execute(user_role_table.insert(), [
+        {"user_id": i, "rol_id": 2 if i % 10 else 1} for i in range(1, total_users + 1)
+    ])
+    session.commit()
+
+
+def list_users_per_row(db):
+    """Reproduce el listado anterior: una consulta extra por usuario para sus roles."""
+    users = db.query(User.id).all()
+    result = []
+    for user in users:
+        user_obj = db.query(User).filter(User.id == user.id).first()
+        result.append([{"id": role.id, "name": role.name} for role in user_obj.roles])
+        db.expire(user_obj)
+    return result
+
+
+def run(label, fn, engine):
+    counter = QueryCounter(engine)
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", counter._on_execute)
+    print(f"{label:<28} {elapsed * 1000:10.1f} ms {counter.count:10d} consultas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    with Session() as session:
+        seed(session, args.users)
+
+    print(f"Usuarios sembrados: {args.users}")
+    with Session() as session:
+        service = UserService(session)
+        run("primera página", lambda: service.list_users(limit=args.limit), engine)
+
+        cursor = last_cursor = None
+        pages = 0
+        start = time.perf_counter()
+        while True:
+            page = service.list_users(limit=args.limit, cursor=cursor, include_total=False)
+            pages += 1
+            cursor = page["pagination"]["next_cursor"]
+            if not cursor:
+                break
+            last_cursor = cursor
+        elapsed = time.perf_counter() - start
+        print(f"{'recorrido completo':<28} {elapsed * 1000:10.1f} ms {pages:10d} páginas")
+
+        run("última página", lambda: service.list_users(limit=args.limit, cursor=last_cursor), engine)
+    with Session() as session:
+        run("roles por usuario (anterior)", lambda: list_users_per_row(session), engine)
+
+
+if __name__ == "__main__":
+    main()
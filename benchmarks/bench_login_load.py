@@ -0,0 +1,140 @@
+"""
+Benchmark de carga: inicios de sesión concurrentes y latencia de otros endpoints.
+
+Levanta uvicorn (un worker) sobre una base SQLite sembrada con un usuario y, durante
+`--duration` segundos, mantiene `--concurrency` clientes haciendo login mientras otro
+cliente consulta `GET /health`. Se repite para cada modo de `PASSWORD_HASH_EXECUTOR`:
+"inline" reproduce el comportamiento anterior (scrypt en el hilo de la petición).
+
+Uso:
+    python -m benchmarks.bench_login_load --concurrency 16 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine
+
+EMAIL = "carga@disriego.test"
+PASSWORD = "CorrectPassword123"
+
+
+def seed(database_url: str):
+    os.environ["DATABASE_URL"] = database_url
+    from app.migrations import upgrade
+    from app.passwords import PasswordHasher
+    from app.users.models import User
+
+    engine = create_engine(database_url)
+    upgrade(engine)
+    salt, hashed = PasswordHasher(executor="inline").hash(PASSWORD)
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert().values(
+            id=1, email=EMAIL, name="Carga", password=hashed, password_salt=salt, email_status=True, status_id=1
+        ))
+    engine.dispose()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def wait_until_ready(base_url: str, timeout: float = 30):
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get(f"{base_url}/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn no respondió a tiempo")
+
+
+async def load(base_url: str, concurrency: int, duration: float) -> dict:
+    login_latencies, health_latencies, statuses = [], [], {}
+    deadline = time.perf_counter() + duration
+
+    async def login_loop(client):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.post(f"{base_url}/auth/login/", json={"email": EMAIL, "password": PASSWORD})
+            login_latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async def health_loop(client):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await client.get(f"{base_url}/health")
+            health_latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+
+    limits = httpx.Limits(max_connections=concurrency + 2)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        await asyncio.gather(health_loop(client), *[login_loop(client) for _ in range(concurrency)])
+
+    return {
+        "logins_per_s": statuses.get(200, 0) / duration,
+        "login_p50_ms": percentile(login_latencies, 0.50) * 1000,
+        "login_p99_ms": percentile(login_latencies, 0.99) * 1000,
+        "health_p50_ms": percentile(health_latencies, 0.50) * 1000,
+        "health_p99_ms": percentile(health_latencies, 0.99) * 1000,
+        "statuses": statuses,
+    }
+
+
+def run_mode(mode: str, database_url: str, args) -> dict:
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, PASSWORD_HASH_EXECUTOR=mode,
+               MAINTENANCE_INTERVAL_SECONDS="0", SCHEMA_CHECK_ON_STARTUP="false")
+    if args.workers:
+        env["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_until_ready(base_url))
+        return asyncio.run(load(base_url, args.concurrency, args.duration))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=None, help="PASSWORD_HASH_WORKERS del servidor")
+    parser.add_argument("--modes", default="inline,thread,process")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'login.db')}"
+        seed(database_url)
+        print(f"{'modo':<8} {'logins/s':>9} {'login p50':>10} {'login p99':>10} {'health p50':>11} {'health p99':>11}  estados")
+        for mode in args.modes.split(","):
+            result = run_mode(mode, database_url, args)
+            print(f"{mode:<8} {result['logins_per_s']:9.1f} {result['login_p50_ms']:8.1f}ms {result['login_p99_ms']:8.1f}ms "
+                  f"{result['health_p50_ms']:9.1f}ms {result['health_p99_ms']:9.1f}ms  {result['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
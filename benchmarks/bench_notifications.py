@@ -0,0 +1,95 @@
+"""
+Benchmark de las lecturas de notificaciones sobre una base SQLite sembrada.
+
+Siembra usuarios con 1.000, 10.000 y 100.000 notificaciones y compara el conteo
+de no leídas con el contador `users.unread_notifications` frente al COUNT(*)
+anterior sobre `notifications`: el contador no depende del volumen. También mide
+la primera página del listado y una página profunda obtenida por cursor.
+
+Uso:
+    python -m benchmarks.bench_notifications --max 100000
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, false, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.notifications import recount_unread
+from app.users.models import Notification, User
+from app.users.services import UserService
+
+_INSERT_BATCH = 10_000
+
+
+def seed(engine, volumes):
+    now = datetime(2025, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [
+            {"id": user_id, "name": f"Usuario {user_id}"} for user_id in range(1, len(volumes) + 1)
+        ])
+        for user_id, volume in enumerate(volumes, start=1):
+            for start in range(0, volume, _INSERT_BATCH):
+                connection.execute(Notification.__table__.insert(), [
+                    {"user_id": user_id, "title": "Aviso", "message": "Mensaje", "type": "info",
+                     "read": i % 4 == 0, "created_at": now - timedelta(seconds=i)}
+                    for i in range(start, min(start + _INSERT_BATCH, volume))
+                ])
+        recount_unread(connection)
+
+
+def timed(fn, repetitions: int) -> float:
+    """Tiempo medio por llamada, en microsegundos"""
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        fn()
+    return (time.perf_counter() - start) / repetitions * 1e6
+
+
+def count_unread(db, user_id):
+    """Conteo anterior: COUNT(*) de las no leídas en cada petición"""
+    return db.execute(
+        select(func.count(Notification.id)).where(Notification.user_id == user_id, Notification.read == false())
+    ).scalar()
+
+
+def deep_cursor(service, user_id, limit, pages):
+    cursor = None
+    for _ in range(pages):
+        cursor = service.get_user_notifications(user_id, limit=limit, cursor=cursor)["pagination"]["next_cursor"]
+    return cursor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max", type=int, default=100_000, help="Notificaciones del usuario más cargado")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repetitions", type=int, default=200)
+    args = parser.parse_args()
+
+    volumes = [args.max // 100, args.max // 10, args.max]
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    seed(engine, volumes)
+
+    print(f"{'notificaciones':>14} {'contador':>12} {'COUNT(*)':>12} {'1.ª página':>12} {'página 20':>12}")
+    with sessionmaker(bind=engine)() as session:
+        service = UserService(session)
+        for user_id, volume in enumerate(volumes, start=1):
+            assert service.get_unread_notification_count(user_id)["count"] == count_unread(session, user_id)
+            counter = timed(lambda: service.get_unread_notification_count(user_id), args.repetitions)
+            recount = timed(lambda: count_unread(session, user_id), max(1, args.repetitions // 10))
+            first = timed(lambda: service.get_user_notifications(user_id, limit=args.limit), args.repetitions)
+            cursor = deep_cursor(service, user_id, args.limit, 20)
+            deep = timed(lambda: service.get_user_notifications(user_id, limit=args.limit, cursor=cursor), args.repetitions)
+            print(f"{volume:>14} {counter:>10.1f}µs {recount:>10.1f}µs {first:>10.1f}µs {deep:>10.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
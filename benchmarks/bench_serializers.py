@@ -0,0 +1,122 @@
+"""
+Benchmark de serialización de lotes por cada 10k filas.
+
+Compara el enfoque anterior (consulta de instancias ORM + `jsonable_encoder`
+por fila) con el codificador precompilado de `app.serializers` sobre filas de
+columnas, separando el costo de la consulta del costo de codificación y del
+volcado a JSON (json estándar y orjson si está instalado).
+
+Uso:
+    python -m benchmarks.bench_serializers --rows 10000
+"""
+import argparse
+import datetime
+import json
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.my_company import models as _company_models  # noqa: F401 (registra las tablas relacionadas)
+from app.property_routes.models import Lot
+from app.roles.models import Vars
+from app.users import models as _user_models  # noqa: F401
+from app.serializers import encoder_for
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+
+def seed(session, total_rows: int):
+    session.add(Vars(id=5, name="Activo"))
+    session.flush()
+    session.execute(Lot.__table__.insert(), [
+        {
+            "id": i,
+            "name": f"Lote {i}",
+            "longitude": -75.0 - i / 1e6,
+            "latitude": 4.0 + i / 1e6,
+            "extension": 10.5,
+            "real_estate_registration_number": 100_000 + i,
+            "public_deed": f"lots/deeds/{i}.pdf",
+            "freedom_tradition_certificate": f"lots/certs/{i}.pdf",
+            "planting_date": datetime.date(2024, 1, 1) + datetime.timedelta(days=i % 365),
+            "estimated_harvest_date": datetime.date(2024, 6, 1) + datetime.timedelta(days=i % 365),
+            "State": 5,
+        }
+        for i in range(1, total_rows + 1)
+    ])
+    session.commit()
+
+
+def timed(label, fn, rows, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    per_10k = best * 10_000 / rows
+    print(f"{label:<40} {best * 1000:10.1f} ms {per_10k * 1000:10.1f} ms/10k filas")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as session:
+        seed(session, args.rows)
+
+    encoder = encoder_for(Lot)
+    print(f"Lotes sembrados: {args.rows}")
+
+    with Session() as session:
+        def orm_query():
+            session.expunge_all()
+            return session.query(Lot).all()
+
+        def row_query():
+            return session.execute(select(*encoder.columns)).all()
+
+        print("-- consulta")
+        lots = timed("instancias ORM (anterior)", orm_query, args.rows, args.repeat)
+        rows = timed("filas de columnas", row_query, args.rows, args.repeat)
+
+        print("-- codificación")
+        old = timed("jsonable_encoder por instancia", lambda: [jsonable_encoder(lot) for lot in lots], args.rows, args.repeat)
+        new = timed("RowEncoder.encode_all", lambda: encoder.encode_all(rows), args.rows, args.repeat)
+        assert old == new, "los dos enfoques deben producir el mismo JSON"
+
+        print("-- volcado")
+        timed("json.dumps", lambda: json.dumps(new), args.rows, args.repeat)
+        if orjson is not None:
+            timed("orjson.dumps", lambda: orjson.dumps(new), args.rows, args.repeat)
+
+        print("-- extremo a extremo")
+        timed(
+            "ORM + jsonable_encoder + json (anterior)",
+            lambda: json.dumps([jsonable_encoder(lot) for lot in orm_query()]),
+            args.rows, args.repeat
+        )
+        dumps = orjson.dumps if orjson is not None else json.dumps
+        timed("columnas + RowEncoder + dumps", lambda: dumps(encoder.encode_all(row_query())), args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
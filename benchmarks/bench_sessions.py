@@ -0,0 +1,124 @@
+"""
+Benchmark de sesiones: hashes de contraseña evitados con los tokens de refresco.
+
+Simula `--users` usuarios durante `--days` días. Cada día cada usuario abre entre una y
+tres sesiones de duración aleatoria y necesita un token de acceso vigente durante toda
+la sesión. Se comparan dos políticas:
+
+- antes: tokens de 30 minutos sin refresco; cada vencimiento obliga a iniciar sesión
+  otra vez (un hash scrypt).
+- ahora: tokens de acceso de `ACCESS_TOKEN_EXPIRE_MINUTES` que se renuevan con
+  `POST /auth/refresh`; solo se inicia sesión cuando el token de refresco venció.
+
+Además mide sobre SQLite el costo real de un login (scrypt con los parámetros actuales)
+y de una renovación, para estimar el CPU ahorrado por hora.
+
+Uso:
+    python -m benchmarks.bench_sessions --users 500 --days 14
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.auth import services as auth_services
+from app.auth.services import ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS, AuthService
+from app.database import Base
+from app.passwords import PasswordHasher
+from app.users.models import User
+
+LEGACY_ACCESS_MINUTES = 30
+EMAIL = "sesiones@disriego.test"
+PASSWORD = "CorrectPassword123"
+
+
+def simulate(users: int, days: int, access_minutes: float, refresh_days: float, seed: int) -> dict:
+    """Cuenta logins (hashes) y renovaciones de cada política; los tiempos van en minutos"""
+    rng = random.Random(seed)
+    legacy_logins = logins = refreshes = 0
+    for _ in range(users):
+        refresh_expires_at = float("-inf")
+        for day in range(days):
+            for _ in range(rng.randint(1, 3)):
+                start = day * 1440 + rng.uniform(6 * 60, 20 * 60)
+                end = start + rng.uniform(10, 4 * 60)
+
+                # Antes: un login al abrir la sesión y otro cada vez que vence el token
+                legacy_logins += 1 + int((end - start) // LEGACY_ACCESS_MINUTES)
+
+                # Ahora: renovaciones mientras el token de refresco siga vigente
+                now = start
+                while now < end:
+                    if now >= refresh_expires_at:
+                        logins += 1
+                    else:
+                        refreshes += 1
+                    # Cada login o renovación emite un token de refresco nuevo
+                    refresh_expires_at = now + refresh_days * 1440
+                    now += access_minutes
+    hours = days * 24
+    return {
+        "legacy_hashes_per_hour": legacy_logins / hours,
+        "hashes_per_hour": logins / hours,
+        "refreshes_per_hour": refreshes / hours,
+    }
+
+
+def measure(repeat: int) -> dict:
+    """Milisegundos por login y por renovación contra una base SQLite en memoria"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    hasher = PasswordHasher(executor="inline")
+    auth_services.password_hasher = hasher
+    salt, hashed = hasher.hash(PASSWORD)
+    with sessionmaker(bind=engine)() as session:
+        session.add(User(id=1, email=EMAIL, name="Sesiones", password=hashed, password_salt=salt,
+                         email_status=True, status_id=1))
+        session.commit()
+        service = AuthService(session)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            tokens = service.create_session_tokens(service.authenticate_user(EMAIL, PASSWORD))
+        login_ms = (time.perf_counter() - start) / repeat * 1000
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            tokens = service.rotate_refresh_token(tokens["refresh_token"])
+        refresh_ms = (time.perf_counter() - start) / repeat * 1000
+    engine.dispose()
+    return {"login_ms": login_ms, "refresh_ms": refresh_ms}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--access-minutes", type=float, default=ACCESS_TOKEN_EXPIRE_MINUTES)
+    parser.add_argument("--refresh-days", type=float, default=REFRESH_TOKEN_EXPIRE_DAYS)
+    parser.add_argument("--repeat", type=int, default=20, help="Mediciones de login y de renovación")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    counts = simulate(args.users, args.days, args.access_minutes, args.refresh_days, args.seed)
+    costs = measure(args.repeat)
+    avoided = counts["legacy_hashes_per_hour"] - counts["hashes_per_hour"]
+    legacy_cpu = counts["legacy_hashes_per_hour"] * costs["login_ms"] / 1000
+    cpu = (counts["hashes_per_hour"] * costs["login_ms"] + counts["refreshes_per_hour"] * costs["refresh_ms"]) / 1000
+
+    print(f"{args.users} usuarios, {args.days} días; acceso {args.access_minutes:g} min, refresco {args.refresh_days:g} días")
+    print(f"login {costs['login_ms']:.1f} ms, renovación {costs['refresh_ms']:.1f} ms")
+    print(f"{'política':<28} {'hashes/h':>9} {'renov./h':>9} {'CPU s/h':>9}")
+    print(f"{f'antes (acceso {LEGACY_ACCESS_MINUTES} min)':<28} {counts['legacy_hashes_per_hour']:9.1f} {0:9.1f} {legacy_cpu:9.1f}")
+    print(f"{'ahora (con refresco)':<28} {counts['hashes_per_hour']:9.1f} {counts['refreshes_per_hour']:9.1f} {cpu:9.1f}")
+    print(f"hashes evitados por hora: {avoided:.1f} ({avoided / counts['legacy_hashes_per_hour']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
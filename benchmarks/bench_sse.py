@@ -0,0 +1,195 @@
+"""
+Prueba de carga de `GET /users/notifications/stream` (Server-Sent Events).
+
+Levanta uvicorn (un worker) sobre una base SQLite sembrada con `--connections`
+usuarios y abre una conexión SSE inactiva por usuario. Mide la memoria del
+servidor por conexión, la latencia de `GET /health` con todas las conexiones
+abiertas y, después de insertar una notificación para cada usuario, cuánto
+tarda en llegar a su conexión. El servidor lee las notificaciones nuevas con una
+consulta por ronda, sin importar cuántos clientes haya conectados.
+
+Uso:
+    python -m benchmarks.bench_sse --connections 2000
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+from sqlalchemy import create_engine
+
+from benchmarks.bench_login_load import free_port, percentile, wait_until_ready
+
+_CONNECT_BATCH = 200
+
+
+def seed(database_url: str, users: int):
+    os.environ["DATABASE_URL"] = database_url
+    from app.migrations import upgrade
+    from app.users.models import User
+
+    engine = create_engine(database_url)
+    upgrade(engine)
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [
+            {"id": i, "email": f"sse{i}@disriego.test", "name": f"Usuario {i}", "status_id": 1}
+            for i in range(1, users + 1)
+        ])
+    engine.dispose()
+
+
+def notify_all(database_url: str, users: int):
+    from app.users.models import Notification
+
+    engine = create_engine(database_url)
+    with engine.begin() as connection:
+        connection.execute(Notification.__table__.insert(), [
+            {"user_id": i, "title": "Aviso", "message": "Carga", "type": "info", "read": False,
+             "created_at": datetime.now()}
+            for i in range(1, users + 1)
+        ])
+    engine.dispose()
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+class Client:
+    """Conexión SSE cruda: registra cuándo llega la primera notificación"""
+
+    def __init__(self, port: int, token: str):
+        self.port = port
+        self.token = token
+        self.received_at = None
+        self.pings = 0
+        self._reader = self._writer = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection("127.0.0.1", self.port)
+        self._writer.write((
+            "GET /users/notifications/stream HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+            f"Authorization: Bearer {self.token}\r\nAccept: text/event-stream\r\n\r\n"
+        ).encode())
+        await self._writer.drain()
+        # Respuesta aceptada cuando llega el conteo inicial
+        while b"event: unread" not in await self._reader.readline():
+            pass
+
+    async def listen(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                return
+            if line.startswith(b": ping"):
+                self.pings += 1
+            elif line.startswith(b"event: notification") and self.received_at is None:
+                self.received_at = time.perf_counter()
+
+    def close(self):
+        self._writer.close()
+
+
+async def health_latencies(base_url: str, samples: int = 50):
+    latencies = []
+    async with httpx.AsyncClient() as client:
+        for _ in range(samples):
+            start = time.perf_counter()
+            await client.get(f"{base_url}/health")
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def load(port: int, pid: int, tokens, database_url: str, idle: float) -> dict:
+    base_url = f"http://127.0.0.1:{port}"
+    await wait_until_ready(base_url)
+    baseline_rss = rss_mb(pid)
+
+    clients = [Client(port, token) for token in tokens]
+    start = time.perf_counter()
+    for offset in range(0, len(clients), _CONNECT_BATCH):
+        await asyncio.gather(*(client.connect() for client in clients[offset:offset + _CONNECT_BATCH]))
+    connect_seconds = time.perf_counter() - start
+    listeners = [asyncio.create_task(client.listen()) for client in clients]
+
+    await asyncio.sleep(idle)
+    connected_rss = rss_mb(pid)
+    health = await health_latencies(base_url)
+
+    sent = time.perf_counter()
+    await asyncio.to_thread(notify_all, database_url, len(clients))
+    deadline = sent + 30
+    while time.perf_counter() < deadline and any(client.received_at is None for client in clients):
+        await asyncio.sleep(0.05)
+    delays = [client.received_at - sent for client in clients if client.received_at is not None]
+
+    for listener in listeners:
+        listener.cancel()
+    for client in clients:
+        client.close()
+    return {
+        "connect_s": connect_seconds,
+        "kb_per_connection": (connected_rss - baseline_rss) * 1024 / len(clients),
+        "health_p50_ms": percentile(health, 0.50) * 1000,
+        "health_p99_ms": percentile(health, 0.99) * 1000,
+        "delivered": len(delays),
+        "delivery_p50_ms": percentile(delays, 0.50) * 1000,
+        "delivery_p99_ms": percentile(delays, 0.99) * 1000,
+        "pings": sum(client.pings for client in clients),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--idle", type=float, default=3, help="Segundos con las conexiones inactivas")
+    parser.add_argument("--heartbeat", type=float, default=1, help="NOTIFICATION_STREAM_HEARTBEAT_SECONDS del servidor")
+    parser.add_argument("--poll", type=float, default=1, help="NOTIFICATION_STREAM_POLL_SECONDS del servidor")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'sse.db')}"
+        seed(database_url, args.connections)
+        from app.auth.services import AuthService
+
+        tokens = [
+            AuthService(None).create_access_token({"sub": f"sse{i}@disriego.test", "id": i})
+            for i in range(1, args.connections + 1)
+        ]
+        port = free_port()
+        env = dict(os.environ, DATABASE_URL=database_url, MAINTENANCE_INTERVAL_SECONDS="0",
+                   NOTIFICATION_DISPATCH_INTERVAL_SECONDS="0", SCHEMA_CHECK_ON_STARTUP="false",
+                   NOTIFICATION_STREAM_HEARTBEAT_SECONDS=str(args.heartbeat),
+                   NOTIFICATION_STREAM_POLL_SECONDS=str(args.poll))
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning",
+             "--backlog", str(max(2048, _CONNECT_BATCH * 2))],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            result = asyncio.run(load(port, server.pid, tokens, database_url, args.idle))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"Conexiones SSE: {args.connections} (abiertas en {result['connect_s']:.1f} s)")
+    print(f"Memoria por conexión: {result['kb_per_connection']:.1f} KB")
+    print(f"GET /health con las conexiones abiertas: p50 {result['health_p50_ms']:.1f} ms, p99 {result['health_p99_ms']:.1f} ms")
+    print(f"Notificaciones recibidas: {result['delivered']}/{args.connections}, "
+          f"p50 {result['delivery_p50_ms']:.0f} ms, p99 {result['delivery_p99_ms']:.0f} ms")
+    print(f"Latidos recibidos: {result['pings']}")
+    print(f"Consultas de lectura del servidor: 1 cada {args.poll:g} s "
+          f"(antes, {args.connections} clientes consultando unread-count y el listado)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark de arranque de la aplicación.
+
+Cada repetición se ejecuta en un proceso nuevo y mide:
+- el tiempo de `import app.main` (incluye la inicialización de módulos y rutas),
+- el tiempo hasta la primera respuesta de `GET /health` (importación + primera petición),
+- si Firebase quedó inicializado durante el arranque (debe ser "no": se inicializa
+  en la primera operación de almacenamiento).
+
+Con `--compare-create-all` se repite la medición agregando `Base.metadata.create_all`
+después de la importación, como hacía el arranque antes de las migraciones. Para una
+comparación realista use una DATABASE_URL de PostgreSQL con todas las tablas creadas
+(`python -m app.migrations upgrade`).
+
+Uso:
+    python -m benchmarks.bench_startup --runs 5 [--compare-create-all]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+if "--create-all" in sys.argv:
+    from app.database import Base, engine
+    Base.metadata.create_all(bind=engine)
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    response = client.get("/disriego/base/health")
+first_response = time.perf_counter()
+from app import firebase_config
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_response_ms": (first_response - start) * 1000,
+    "status": response.status_code,
+    "firebase_initialized": firebase_config._bucket is not None,
+    "firebase_admin_imported": "firebase_admin" in sys.modules,
+}))
+"""
+
+
+def run_once(env: dict, create_all: bool = False) -> dict:
+    command = [sys.executable, "-c", _CHILD] + (["--create-all"] if create_all else [])
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report(label: str, results: list):
+    print(label)
+    for key in ("import_ms", "first_response_ms"):
+        values = [result[key] for result in results]
+        print(f"{key:>18}: mediana {statistics.median(values):8.1f} ms  "
+              f"min {min(values):8.1f} ms  max {max(values):8.1f} ms")
+    print(f"{'status':>18}: {sorted({result['status'] for result in results})}")
+    print(f"{'firebase init':>18}: {any(result['firebase_initialized'] for result in results)}")
+    print(f"{'firebase_admin':>18}: {any(result['firebase_admin_imported'] for result in results)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--compare-create-all", action="store_true",
+                        help="Mide también el arranque con Base.metadata.create_all")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite://")
+    report("Arranque actual", [run_once(env) for _ in range(args.runs)])
+    if args.compare_create_all:
+        report("Arranque con create_all", [run_once(env, create_all=True) for _ in range(args.runs)])
+
+
+if __name__ == "__main__":
+    main()
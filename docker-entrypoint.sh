@@ -0,0 +1,11 @@
+#!/bin/sh
+# Aplica las migraciones pendientes antes de arrancar el servidor. Varias réplicas pueden
+# hacerlo a la vez: el advisory lock de PostgreSQL serializa la actualización.
+# RUN_MIGRATIONS=false lo omite (por ejemplo, si otro servicio ya migró la base).
+set -e
+
+if [ "${RUN_MIGRATIONS:-true}" = "true" ]; then
+    python -m app.migrations upgrade
+fi
+
+exec "$@"
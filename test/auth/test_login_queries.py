@@ -0,0 +1,85 @@
+import pytest
+from fastapi.security import OAuth2PasswordRequestForm
+from jose import jwt
+from sqlalchemy import event
+
+from app.auth.routes import login, swagger_login
+from app.auth.services import ALGORITHM, SECRET_KEY
+from app.passwords import PasswordHasher, ScryptParams
+from app.roles.permissions import decode_permissions
+from app.roles.models import Permission, Role
+from app.users.models import User
+from app.users.schemas import UserLogin
+
+PASSWORD = "CorrectPassword123"
+
+
+@pytest.fixture()
+def session(session, monkeypatch):
+    """Usuario activo con dos roles y sus permisos"""
+    hasher = PasswordHasher(executor="inline", params=ScryptParams(10, 8, 1))
+    monkeypatch.setattr("app.auth.services.password_hasher", hasher)
+    salt, hashed = hasher.hash(PASSWORD)
+    ver, editar = Permission(id=1, name="ver_usuarios"), Permission(id=2, name="editar_usuarios")
+    session.add(User(
+        id=1, email="ana@disriego.test", name="Ana", password=hashed, password_salt=salt,
+        email_status=True, status_id=1, first_login_complete=True,
+        roles=[Role(id=1, name="Administrador", status=1, permissions=[ver, editar]),
+               Role(id=2, name="Usuario", status=1, permissions=[ver])],
+    ))
+    session.commit()
+    session.expire_all()
+    return session
+
+
+def count_selects(session):
+    """Lecturas emitidas; el login además inserta el token de refresco"""
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement) if statement.startswith("SELECT") else None)
+    return statements
+
+
+def decode(response):
+    return jwt.decode(response["access_token"], SECRET_KEY, algorithms=[ALGORITHM])
+
+
+def test_login_uses_a_single_query(session):
+    """El login lee usuario, roles y permisos en una sola consulta y no vuelve a cargar el usuario"""
+    statements = count_selects(session)
+
+    claims = decode(login(UserLogin(email="ana@disriego.test", password=PASSWORD), session))
+
+    assert len(statements) == 1
+    assert claims["sub"] == "ana@disriego.test"
+    assert claims["id"] == 1
+    assert claims["status"] == 1
+    assert claims["first_login_complete"] is True
+    assert sorted(claims["rol"], key=lambda role: role["id"]) == [
+        {"id": 1, "name": "Administrador"}, {"id": 2, "name": "Usuario"}
+    ]
+    assert decode_permissions(claims["permisos"]) == {1, 2}
+
+
+def test_login_with_outdated_hash_uses_a_single_query(session, monkeypatch):
+    """Regenerar el hash no vuelve a cargar el usuario ni sus roles antes de emitir el token"""
+    monkeypatch.setattr("app.auth.services.password_hasher", PasswordHasher(executor="inline", params=ScryptParams(11, 8, 1)))
+    statements = count_selects(session)
+
+    claims = decode(login(UserLogin(email="ana@disriego.test", password=PASSWORD), session))
+
+    assert len(statements) == 1
+    assert decode_permissions(claims["permisos"]) == {1, 2}
+    with session.get_bind().connect() as connection:
+        stored = connection.exec_driver_sql("SELECT password FROM users WHERE id = 1").scalar()
+    assert stored.startswith("scrypt$ln=11,r=8,p=1$")
+
+
+def test_swagger_login_uses_a_single_query(session):
+    statements = count_selects(session)
+    form = OAuth2PasswordRequestForm(username="ana@disriego.test", password=PASSWORD)
+
+    claims = decode(swagger_login(form, session))
+
+    assert len(statements) == 1
+    assert {role["name"] for role in claims["rol"]} == {"Administrador", "Usuario"}
@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app.auth.revocation import token_digest
+from app.auth.routes import login, logout, refresh
+from app.auth.schemas import RefreshTokenRequest
+from app.auth.services import ALGORITHM, REFRESH_TOKEN_REUSE_GRACE_SECONDS, SECRET_KEY, AuthService
+from app.passwords import PasswordHasher, ScryptParams
+from app.users.models import RefreshToken, User
+from app.users.schemas import UserLogin
+
+PASSWORD = "CorrectPassword123"
+
+
+@pytest.fixture()
+def session(session, monkeypatch):
+    hasher = PasswordHasher(executor="inline", params=ScryptParams(10, 8, 1))
+    monkeypatch.setattr("app.auth.services.password_hasher", hasher)
+    monkeypatch.setattr("app.auth.services.revocation_cache.add", lambda digest, expires_at: None)
+    salt, hashed = hasher.hash(PASSWORD)
+    session.add(User(id=1, email="ana@disriego.test", name="Ana", password=hashed, password_salt=salt,
+                     email_status=True, status_id=1))
+    session.commit()
+    return session
+
+
+@pytest.fixture()
+def no_password_hashing(monkeypatch):
+    """Falla si algo intenta verificar o generar un hash de contraseña"""
+    def forbidden(*args, **kwargs):
+        raise AssertionError("no se esperaba scrypt")
+
+    monkeypatch.setattr("app.auth.services.password_hasher.verify", forbidden)
+    monkeypatch.setattr("app.auth.services.password_hasher.hash", forbidden)
+
+
+def do_login(session):
+    return login(UserLogin(email="ana@disriego.test", password=PASSWORD), session)
+
+
+def test_login_issues_refresh_token_stored_hashed(session):
+    tokens = do_login(session)
+
+    stored = session.query(RefreshToken).one()
+    assert tokens["refresh_token"]
+    assert stored.token_hash == token_digest(tokens["refresh_token"])
+    assert stored.user_id == 1
+    assert stored.used_at is None
+
+
+def test_refresh_rotates_without_password_hash(session, no_password_hashing):
+    """Renovar la sesión no ejecuta scrypt y entrega un par nuevo"""
+    tokens = AuthService(session).create_session_tokens(session.query(User).one())
+
+    renewed = refresh(RefreshTokenRequest(refresh_token=tokens["refresh_token"]), session)
+
+    assert renewed["refresh_token"] != tokens["refresh_token"]
+    assert jwt.decode(renewed["access_token"], SECRET_KEY, algorithms=[ALGORITHM])["id"] == 1
+    rows = session.query(RefreshToken).order_by(RefreshToken.id).all()
+    assert [row.used_at is not None for row in rows] == [True, False]
+    assert rows[0].family_id == rows[1].family_id
+
+
+def test_reused_refresh_token_revokes_family(session):
+    """Presentar un token ya usado invalida también el que se emitió al rotarlo"""
+    tokens = do_login(session)
+    renewed = refresh(RefreshTokenRequest(refresh_token=tokens["refresh_token"]), session)
+    session.query(RefreshToken).filter(RefreshToken.used_at.isnot(None)).update(
+        {RefreshToken.used_at: datetime.utcnow() - timedelta(seconds=REFRESH_TOKEN_REUSE_GRACE_SECONDS + 1)}
+    )
+    session.commit()
+
+    with pytest.raises(HTTPException) as error:
+        refresh(RefreshTokenRequest(refresh_token=tokens["refresh_token"]), session)
+    assert error.value.status_code == 401
+
+    with pytest.raises(HTTPException):
+        refresh(RefreshTokenRequest(refresh_token=renewed["refresh_token"]), session)
+    assert all(row.revoked_at is not None for row in session.query(RefreshToken))
+
+
+def test_concurrent_refresh_within_grace_keeps_the_session(session):
+    """Dos renovaciones simultáneas con el mismo token: la segunda recibe 409 y la sesión sigue viva"""
+    tokens = do_login(session)
+    renewed = refresh(RefreshTokenRequest(refresh_token=tokens["refresh_token"]), session)
+
+    with pytest.raises(HTTPException) as error:
+        refresh(RefreshTokenRequest(refresh_token=tokens["refresh_token"]), session)
+    assert error.value.status_code == 409
+
+    assert all(row.revoked_at is None for row in session.query(RefreshToken))
+    assert refresh(RefreshTokenRequest(refresh_token=renewed["refresh_token"]), session)["refresh_token"]
+
+
+def test_expired_or_unknown_refresh_token(session):
+    tokens = do_login(session)
+    session.query(RefreshToken).update({RefreshToken.expires_at: datetime.utcnow() - timedelta(seconds=1)})
+    session.commit()
+
+    for token in (tokens["refresh_token"], "desconocido"):
+        with pytest.raises(HTTPException) as error:
+            refresh(RefreshTokenRequest(refresh_token=token), session)
+        assert error.value.status_code == 401
+
+
+def test_logout_revokes_refresh_token(session):
+    tokens = do_login(session)
+
+    payload = AuthService.get_current_user(tokens["access_token"])
+    logout(RefreshTokenRequest(refresh_token=tokens["refresh_token"]), tokens["access_token"], payload, session)
+
+    with pytest.raises(HTTPException):
+        refresh(RefreshTokenRequest(refresh_token=tokens["refresh_token"]), session)
+
+
+def test_logout_with_invalid_or_expired_token_returns_400():
+    """/logout conserva su respuesta 400 "Token inválido" para tokens que no se pueden decodificar"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    expired = jwt.encode({"sub": "ana@disriego.test", "id": 1, "exp": datetime.utcnow() - timedelta(minutes=1)},
+                         SECRET_KEY, algorithm=ALGORITHM)
+    client = TestClient(app)
+    for token in ("token-invalido", expired):
+        response = client.post("/auth/logout", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Token inválido"
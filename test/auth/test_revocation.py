@@ -0,0 +1,165 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.auth import revocation
+from app.auth.revocation import RevocationCache, token_digest
+from app.auth.services import AuthService
+from app.users.models import RevokedToken
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture()
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture()
+def cache(engine, clock, monkeypatch):
+    """Caché de revocaciones aislada, instalada en lugar de la global"""
+    cache = RevocationCache(engine, refresh_seconds=5, full_reload_seconds=60, clock=clock)
+    monkeypatch.setattr(revocation, "revocation_cache", cache)
+    monkeypatch.setattr("app.auth.services.revocation_cache", cache)
+    return cache
+
+
+def count_queries(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def insert_revoked(engine, token, expires_at):
+    """Simula una revocación hecha por otro worker"""
+    with sessionmaker(bind=engine)() as session:
+        session.add(RevokedToken(token=token_digest(token), expires_at=expires_at))
+        session.commit()
+
+
+def test_revoke_token_stores_digest(engine, cache):
+    """La tabla guarda la huella SHA-256, no el JWT"""
+    token = AuthService(None).create_access_token({"sub": "ana@disriego.test"})
+    with sessionmaker(bind=engine)() as session:
+        AuthService(session).revoke_token(session, token, datetime.utcnow() + timedelta(minutes=30))
+        stored = session.query(RevokedToken.token).scalar()
+
+    assert stored == token_digest(token)
+    assert token not in stored
+
+
+def test_get_current_user_rejects_revoked_token_without_queries(engine, cache):
+    """Un token revocado en este proceso se rechaza sin consultar la base de datos"""
+    token = AuthService(None).create_access_token({"sub": "ana@disriego.test"})
+    other = AuthService(None).create_access_token({"sub": "luis@disriego.test"})
+    AuthService.get_current_user(other)  # primera carga de la caché
+
+    with sessionmaker(bind=engine)() as session:
+        AuthService(session).revoke_token(session, token, datetime.utcnow() + timedelta(minutes=30))
+
+    statements = count_queries(engine)
+    with pytest.raises(HTTPException) as error:
+        AuthService.get_current_user(token)
+    assert AuthService.get_current_user(other)["sub"] == "luis@disriego.test"
+
+    assert error.value.status_code == 401
+    assert statements == []
+
+
+def test_incremental_refresh_picks_up_other_workers(engine, cache, clock):
+    """Las revocaciones de otros procesos se ven tras el intervalo de actualización"""
+    token = "token-de-otro-worker"
+    assert cache.is_revoked(token) is False
+
+    insert_revoked(engine, token, datetime.utcnow() + timedelta(minutes=30))
+    statements = count_queries(engine)
+    assert cache.is_revoked(token) is False
+    assert statements == []
+
+    clock.now += 5
+    assert cache.is_revoked(token) is True
+    assert len(statements) == 1
+    assert "revoked_tokens.id >" in statements[0]
+
+
+def test_full_reload_recovers_rows_below_watermark(engine, cache, clock):
+    """La recarga completa recoge filas con un id menor al último leído"""
+    insert_revoked(engine, "reciente", datetime.utcnow() + timedelta(minutes=30))
+    cache.is_revoked("reciente")
+    with sessionmaker(bind=engine)() as session:
+        session.add(RevokedToken(id=0, token=token_digest("tardio"), expires_at=datetime.utcnow() + timedelta(minutes=30)))
+        session.commit()
+
+    clock.now += 5
+    assert cache.is_revoked("tardio") is False
+    clock.now += 60
+    assert cache.is_revoked("tardio") is True
+
+
+def test_expired_revocations_are_dropped(engine, cache, clock):
+    """Los tokens expirados no se cargan ni permanecen en memoria"""
+    insert_revoked(engine, "vencido", datetime.utcnow() - timedelta(minutes=1))
+    cache.add(token_digest("local-vencido"), datetime.utcnow() - timedelta(seconds=1))
+
+    assert cache.is_revoked("vencido") is False
+    assert len(cache) == 0
+
+
+
+def test_add_during_refresh_is_kept(engine, cache):
+    """Un logout registrado mientras otra petición actualiza la caché no se pierde"""
+    copying, resume = threading.Event(), threading.Event()
+
+    class PausedCopy(dict):
+        def items(self):
+            # `_refresh` copia las entradas vigentes y después reemplaza el diccionario
+            snapshot = list(super().items())
+            copying.set()
+            resume.wait(0.5)
+            return snapshot
+
+    cache._maybe_refresh()
+    cache._expires = PausedCopy(cache._expires)
+    cache._next_refresh = 0.0
+    refresher = threading.Thread(target=cache.is_revoked, args=("otro",))
+    refresher.start()
+    assert copying.wait(5)
+
+    adder = threading.Thread(target=cache.add, args=(token_digest("logout"), datetime.utcnow() + timedelta(hours=1)))
+    adder.start()
+    resume.set()
+    refresher.join(5)
+    adder.join(5)
+
+    assert cache.is_revoked("logout") is True
+
+
+def test_async_check_refreshes_off_the_event_loop(engine, cache, clock):
+    """El stream SSE consulta la revocación sin ejecutar la consulta en el hilo del event loop"""
+    insert_revoked(engine, "revocado", datetime.utcnow() + timedelta(hours=1))
+    query_threads = []
+    event.listen(engine, "before_cursor_execute", lambda *args: query_threads.append(threading.get_ident()))
+
+    async def scenario():
+        loop_thread = threading.get_ident()
+        first = await cache.is_digest_revoked_async(token_digest("revocado"))
+        # Dentro del intervalo de actualización solo se lee la memoria
+        second = await cache.is_digest_revoked_async(token_digest("otro"))
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(scenario())
+
+    assert (first, second) == (True, False)
+    assert len(query_threads) == 1
+    assert loop_thread not in query_threads
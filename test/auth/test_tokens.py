@@ -0,0 +1,205 @@
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from jose import JWTError, jwt
+
+from app.auth import tokens
+from app.auth.revocation import token_digest
+from app.auth.services import ALGORITHM, SECRET_KEY, AuthService
+from app.auth.tokens import TokenVerifier
+from app.roles.permissions import require_permission
+
+
+NOW = int(time.time())
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = NOW
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture()
+def decodes(monkeypatch):
+    """Cuenta las verificaciones de firma reales"""
+    calls = []
+    original = jwt.decode
+
+    def counting(*args, **kwargs):
+        calls.append(args[0])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(tokens.jwt, "decode", counting)
+    return calls
+
+
+@pytest.fixture()
+def verifier(monkeypatch):
+    """Verificador aislado, instalado en lugar del global"""
+    verifier = TokenVerifier(SECRET_KEY, ALGORITHM, max_size=2)
+    monkeypatch.setattr("app.auth.services.token_verifier", verifier)
+    return verifier
+
+
+def make_token(sub, exp=NOW + 3600, **claims):
+    return jwt.encode({"sub": sub, "exp": exp, **claims}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def test_signature_verified_once_per_token(decodes):
+    verifier = TokenVerifier(SECRET_KEY, ALGORITHM, clock=FakeClock())
+    token = make_token("ana@disriego.test")
+
+    first = verifier.decode(token)
+    first["sub"] = "modificado"
+
+    assert verifier.decode(token)["sub"] == "ana@disriego.test"
+    assert decodes == [token]
+
+
+def test_cached_token_still_expires(decodes):
+    clock = FakeClock()
+    verifier = TokenVerifier(SECRET_KEY, ALGORITHM, clock=clock)
+    token = make_token("ana@disriego.test", exp=NOW + 60)
+    verifier.decode(token)
+
+    clock.now = NOW + 60
+    with pytest.raises(JWTError):
+        verifier.decode(token)
+    assert len(verifier) == 0
+
+
+def test_invalid_tokens_are_not_cached(decodes):
+    verifier = TokenVerifier(SECRET_KEY, ALGORITHM, clock=FakeClock())
+    forged = jwt.encode({"sub": "ana@disriego.test", "exp": NOW + 3600}, "otra-clave", algorithm=ALGORITHM)
+
+    for _ in range(2):
+        with pytest.raises(JWTError):
+            verifier.decode(forged)
+    assert len(verifier) == 0
+    assert len(decodes) == 2
+
+
+def test_least_recently_used_is_evicted(decodes):
+    verifier = TokenVerifier(SECRET_KEY, ALGORITHM, max_size=2, clock=FakeClock())
+    ana, luis, eva = (make_token(sub) for sub in ("ana", "luis", "eva"))
+    verifier.decode(ana)
+    verifier.decode(luis)
+    verifier.decode(ana)
+    verifier.decode(eva)
+
+    assert len(verifier) == 2
+    verifier.decode(ana)
+    verifier.decode(luis)
+    assert decodes == [ana, luis, eva, luis]
+
+
+class AllowAll:
+    def has_permission(self, roles, permission):
+        return True
+
+
+def test_dependency_decodes_once_per_request(verifier, decodes, monkeypatch):
+    """Varias dependencias de autenticación en una ruta comparten los claims de request.state"""
+    monkeypatch.setattr("app.roles.permissions.permission_cache", AllowAll())
+    app = FastAPI()
+
+    @app.get("/admin")
+    def admin(
+        request: Request,
+        user: dict = Depends(AuthService.get_current_user),
+        admin: dict = Depends(require_permission("crear_notificaciones")),
+    ):
+        return {"sub": user["sub"], "state": request.state.auth_claims["sub"], "same": user is admin}
+
+    token = AuthService(None).create_access_token({"sub": "ana@disriego.test", "rol": [{"id": 1, "name": "Administrador"}]})
+    client = TestClient(app)
+
+    for _ in range(3):
+        response = client.get("/admin", headers={"Authorization": f"Bearer {token}"})
+        assert response.json() == {"sub": "ana@disriego.test", "state": "ana@disriego.test", "same": True}
+    assert decodes == [token]
+    assert client.get("/admin", headers={"Authorization": "Bearer basura"}).status_code == 401
+
+
+def test_dependency_reuses_request_state(verifier, decodes):
+    class State:
+        pass
+
+    class FakeRequest:
+        state = State()
+
+    request = FakeRequest()
+    token = AuthService(None).create_access_token({"sub": "ana@disriego.test"})
+
+    claims = AuthService.get_current_user(token, request)
+    verifier.clear()
+
+    assert AuthService.get_current_user(token, request) is claims
+    assert decodes == [token]
+    with pytest.raises(HTTPException):
+        AuthService.get_current_user("otro", request)
+
+
+class Revoked:
+    """Reemplazo de la caché de revocación con un conjunto de huellas"""
+
+    def __init__(self):
+        self.digests = set()
+
+    def is_revoked(self, token):
+        return token_digest(token) in self.digests
+
+    def is_digest_revoked(self, digest):
+        return digest in self.digests
+
+
+@pytest.fixture()
+def stream_client(verifier, monkeypatch):
+    """La API real para pedir el token y una ruta con la dependencia del stream"""
+    from app.main import app
+
+    revoked = Revoked()
+    monkeypatch.setattr("app.auth.services.revocation_cache", revoked)
+    app.router.add_api_route("/users/notifications/stream/session", lambda session=Depends(AuthService.get_stream_session): session)
+    client = TestClient(app)
+    client.revoked = revoked
+    yield client
+    app.router.routes.pop()
+
+
+def test_stream_token_opens_the_stream_from_query_or_cookie(stream_client):
+    access = AuthService(None).create_access_token({"sub": "ana@disriego.test", "id": 7})
+    response = stream_client.post("/users/notifications/stream-token", headers={"Authorization": f"Bearer {access}"})
+    stream_token = response.json()["stream_token"]
+    expected = {"id": 7, "access": token_digest(access), "expires_at": jwt.get_unverified_claims(access)["exp"]}
+
+    assert response.cookies["notifications_stream_token"] == stream_token
+    assert stream_client.get("/users/notifications/stream/session").json() == expected
+    stream_client.cookies.clear()
+    assert stream_client.get(f"/users/notifications/stream/session?token={stream_token}").json() == expected
+    assert stream_client.get("/users/notifications/stream/session").status_code == 401
+
+
+def test_stream_token_is_not_an_access_token(stream_client):
+    access = AuthService(None).create_access_token({"sub": "ana@disriego.test", "id": 7})
+    stream_token = AuthService(None).create_stream_token(access, jwt.get_unverified_claims(access))
+
+    response = stream_client.post("/users/notifications/stream-token", headers={"Authorization": f"Bearer {stream_token}"})
+
+    assert response.status_code == 401
+    assert stream_client.get(f"/users/notifications/stream/session?token={access}").status_code == 401
+
+
+def test_stream_token_follows_the_access_token(stream_client):
+    access = AuthService(None).create_access_token({"sub": "ana@disriego.test", "id": 7}, timedelta(seconds=30))
+    stream_token = AuthService(None).create_stream_token(access, jwt.get_unverified_claims(access))
+
+    # No dura más que el token de acceso
+    assert jwt.get_unverified_claims(stream_token)["exp"] == jwt.get_unverified_claims(access)["exp"]
+    stream_client.revoked.digests.add(token_digest(access))
+    assert stream_client.get(f"/users/notifications/stream/session?token={stream_token}").status_code == 401
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.database import engine as app_engine
+from app.migrations import upgrade
+
+# Aplicar migraciones a una base que no es SQLite (por ejemplo, la de CI) requiere pedirlo
+TEST_MIGRATE_DATABASE = os.getenv("TEST_MIGRATE_DATABASE", "false").lower() in ("1", "true", "yes")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    """
+    Aplica las migraciones una vez por sesión, como se hace en el despliegue antes de
+    arrancar los workers. Solo se ejecuta DDL sin pedirlo sobre una base SQLite de prueba;
+    con otra DATABASE_URL hace falta TEST_MIGRATE_DATABASE=true.
+    """
+    if app_engine.dialect.name == "sqlite" or TEST_MIGRATE_DATABASE:
+        upgrade(app_engine)
+    yield
+
+
+@pytest.fixture()
+def engine():
+    """
+    Base SQLite en memoria con el esquema de los modelos, vacía en cada prueba. Todas las
+    conexiones (también las de otros hilos) comparten la misma base.
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def session(engine):
+    """Sesión ORM sobre `engine`; los módulos la extienden con sus datos de prueba"""
+    with sessionmaker(bind=engine)() as session:
+        yield session
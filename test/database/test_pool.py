@@ -0,0 +1,70 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from app import database
+from app.database import PoolMetrics, _engine_options, get_db, pool_metrics
+from app.main import app
+
+
+def test_engine_options_postgres(monkeypatch):
+    """Para PostgreSQL se aplican las opciones del pool y el statement_timeout"""
+    monkeypatch.setattr(database, "DB_STATEMENT_TIMEOUT_MS", 5000)
+    options = _engine_options("postgresql://user:pass@db:5432/disriego")
+    assert options["pool_pre_ping"] is True
+    assert options["pool_size"] == database.DB_POOL_SIZE
+    assert options["max_overflow"] == database.DB_MAX_OVERFLOW
+    assert options["pool_recycle"] == database.DB_POOL_RECYCLE
+    assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+
+def test_engine_options_sqlite():
+    """SQLite no acepta tamaño de pool: solo se configura el pre-ping"""
+    assert _engine_options("sqlite://") == {"pool_pre_ping": database.DB_POOL_PRE_PING}
+
+
+def test_pool_metrics_histogram():
+    metrics = PoolMetrics()
+    for elapsed in (0.5, 0.7, 3, 8, 2000, 9000):
+        metrics.observe(elapsed)
+    metrics.observe_timeout()
+
+    snapshot = metrics.snapshot()
+    assert snapshot["count"] == 6
+    assert snapshot["timeouts"] == 1
+    assert snapshot["buckets"]["le_1"] == 2
+    assert snapshot["buckets"]["le_5"] == 1
+    assert snapshot["buckets"]["le_inf"] == 1
+    assert snapshot["p50_ms"] == 5
+    assert snapshot["p99_ms"] == 9000
+    assert snapshot["max_ms"] == 9000
+
+
+def test_get_db_records_checkout():
+    """get_db no toma conexión por adelantado; el checkout del primer uso registra su espera"""
+    before = pool_metrics.snapshot()["count"]
+    generator = get_db()
+    db = next(generator)
+    assert pool_metrics.snapshot()["count"] == before
+
+    db.execute(text("SELECT 1"))
+    generator.close()
+    assert pool_metrics.snapshot()["count"] == before + 1
+
+
+def test_checkouts_stay_timed_after_dispose():
+    """dispose() recrea el pool con la misma clase, que sigue midiendo los checkouts"""
+    engine = create_engine("sqlite://", poolclass=database._timed_pool_class("sqlite://"))
+    engine.dispose()
+    before = pool_metrics.snapshot()["count"]
+    with engine.connect():
+        pass
+    assert pool_metrics.snapshot()["count"] == before + 1
+
+
+def test_health_db_endpoint():
+    client = TestClient(app)
+    response = client.get("/health/db")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ok"
+    assert {"size", "checked_out", "overflow"} <= set(body["pool"])
+    assert "p95_ms" in body["checkout_wait"]
@@ -0,0 +1,133 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.pagination import encode_cursor
+from app.property_routes.models import Lot, Property, PropertyLot, PropertyUser
+from app.property_routes.services import PropertyLotService
+from app.users.models import Notification, RevokedToken, User
+from app.users.services import UserService
+
+ROWS = 5000
+NOTIFICATIONS_PER_USER = 10
+
+# "SCAN tabla" sin índice es un recorrido secuencial en EXPLAIN QUERY PLAN de SQLite
+_FULL_SCAN = re.compile(r"^SCAN (\w+)\b(?! USING)")
+
+
+@pytest.fixture(scope="module")
+def engine():
+    """Base SQLite con un volumen de filas realista y estadísticas del planificador"""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    now = datetime(2025, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [
+            {"id": i, "name": f"Usuario {i}", "document_number": 10_000_000 + i, "type_document_id": i % 3 + 1}
+            for i in range(1, ROWS + 1)
+        ])
+        connection.execute(Property.__table__.insert(), [
+            {"id": i, "name": f"Predio {i}", "longitude": 0, "latitude": 0, "extension": 1,
+             "real_estate_registration_number": 500_000 + i, "State": 3}
+            for i in range(1, ROWS + 1)
+        ])
+        connection.execute(Lot.__table__.insert(), [
+            {"id": i, "name": f"Lote {i}", "longitude": 0, "latitude": 0, "extension": 1,
+             "real_estate_registration_number": 900_000 + i, "State": 5}
+            for i in range(1, ROWS + 1)
+        ])
+        connection.execute(PropertyUser.__table__.insert(), [
+            {"property_id": i, "user_id": i % (ROWS // 2) + 1} for i in range(1, ROWS + 1)
+        ])
+        connection.execute(PropertyLot.__table__.insert(), [
+            {"property_id": (i + 1) // 2, "lot_id": i} for i in range(1, ROWS + 1)
+        ])
+        connection.execute(Notification.__table__.insert(), [
+            {"user_id": i % ROWS + 1, "title": "Aviso", "message": "Mensaje", "type": "info",
+             "read": i % 4 == 0, "created_at": now - timedelta(minutes=i)}
+            for i in range(ROWS * NOTIFICATIONS_PER_USER)
+        ])
+        connection.execute(RevokedToken.__table__.insert(), [
+            {"token": f"token-{i}", "expires_at": now + timedelta(minutes=i - 50)} for i in range(ROWS)
+        ])
+        connection.execute(text("ANALYZE"))
+    yield engine
+    engine.dispose()
+
+
+def full_scans(engine, statement, parameters=()) -> list:
+    """Tablas que el plan de la consulta recorre completas"""
+    if not isinstance(statement, str):
+        statement = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as connection:
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [match.group(1) for match in (_FULL_SCAN.match(row[-1]) for row in plan) if match]
+
+
+def executed(engine, call) -> list:
+    """Sentencias (SQL y parámetros) que ejecuta `call(session)`"""
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with Session(engine) as session:
+            call(session)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+
+HOT_QUERIES = {
+    "property_registration_number": lambda: select(Property.id).where(
+        Property.real_estate_registration_number == 500_123
+    ),
+    "lot_registration_number": lambda: select(Lot.id).where(Lot.real_estate_registration_number == 900_123),
+    "user_by_document": lambda: select(User.id).where(
+        User.document_number == 10_000_123, User.type_document_id == 2
+    ),
+    "property_of_lot": lambda: select(PropertyLot.property_id).where(PropertyLot.lot_id == 123),
+    "expired_revoked_tokens": lambda: select(RevokedToken.id).where(RevokedToken.expires_at < datetime(2025, 1, 1)),
+}
+
+
+# Lecturas de los servicios: se revisan todas las sentencias que ejecutan
+HOT_READS = {
+    "user_notifications": lambda session: UserService(session).get_user_notifications(123),
+    "user_notifications_page": lambda session: UserService(session).get_user_notifications(
+        123, 50, encode_cursor(datetime(2024, 12, 31).isoformat(), 40_000)
+    ),
+    "unread_notifications": lambda session: UserService(session).get_unread_notification_count(123),
+    "properties_for_user": lambda session: PropertyLotService(session).get_properties_for_user(123),
+    "users_by_name_page": lambda session: UserService(session).list_users(
+        50, encode_cursor("Usuario 123", 123), sort="name"
+    ),
+    "users_by_email_desc": lambda session: UserService(session).list_users(50, sort="-email"),
+}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(engine, name):
+    """Ninguna consulta frecuente recorre una tabla completa"""
+    assert full_scans(engine, HOT_QUERIES[name]()) == []
+
+
+@pytest.mark.parametrize("name", sorted(HOT_READS))
+def test_hot_read_uses_index(engine, name):
+    statements = executed(engine, HOT_READS[name])
+
+    assert statements
+    for statement, parameters in statements:
+        assert full_scans(engine, statement, parameters) == []
+
+
+def test_full_scan_is_detected(engine):
+    """Una consulta sobre una columna sin índice se reporta como recorrido secuencial"""
+    assert full_scans(engine, select(Property.id).where(Property.name == "Predio 123")) == ["property"]
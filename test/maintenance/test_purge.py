@@ -0,0 +1,133 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.maintenance import MaintenanceScheduler, purge_expired, run_purge
+from app.maintenance.__main__ import main
+from app.users.models import ActivationToken, PasswordReset, PreRegisterToken, RefreshToken, RevokedToken, User
+
+NOW = datetime(2025, 1, 1, 12, 0)
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    """Base SQLite con tokens vigentes, expirados y usados"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'purge.db'}")
+    Base.metadata.create_all(engine)
+    past, future = NOW - timedelta(hours=1), NOW + timedelta(hours=1)
+    with sessionmaker(bind=engine)() as session:
+        session.add(User(id=1, name="Ana"))
+        session.add_all([RevokedToken(token=f"vencido-{i}", expires_at=past) for i in range(5)])
+        session.add(RevokedToken(token="vigente", expires_at=future))
+        session.add_all([
+            PasswordReset(email="ana@disriego.test", token="reset-vencido", expiration=past),
+            PasswordReset(email="ana@disriego.test", token="reset-vigente", expiration=future),
+        ])
+        session.add_all([
+            PreRegisterToken(token="pre-vencido", user_id=1, expires_at=past, used=False),
+            PreRegisterToken(token="pre-usado", user_id=1, expires_at=future, used=True),
+            PreRegisterToken(token="pre-vigente", user_id=1, expires_at=future, used=False),
+        ])
+        session.add_all([
+            ActivationToken(token="act-usado", user_id=1, expires_at=future, used=True),
+            ActivationToken(token="act-vigente", user_id=1, expires_at=future, used=False),
+        ])
+        session.add_all([
+            RefreshToken(token_hash="refresh-vencido", family_id="a", user_id=1, expires_at=past),
+            RefreshToken(token_hash="refresh-revocado", family_id="b", user_id=1, expires_at=future, revoked_at=past),
+            RefreshToken(token_hash="refresh-usado", family_id="c", user_id=1, expires_at=future, used_at=past),
+        ])
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+def remaining_tokens(engine):
+    with sessionmaker(bind=engine)() as session:
+        return {
+            "revoked_tokens": [row.token for row in session.query(RevokedToken.token)],
+            "password_resets": [row.token for row in session.query(PasswordReset.token)],
+            "pre_register_tokens": [row.token for row in session.query(PreRegisterToken.token)],
+            "activation_tokens": [row.token for row in session.query(ActivationToken.token)],
+            "refresh_tokens": [row.token_hash for row in session.query(RefreshToken.token_hash)],
+        }
+
+
+def test_purge_removes_only_expired_or_used(engine):
+    """Solo se eliminan los tokens expirados o ya usados, y se reporta cuántos por tabla"""
+    result = purge_expired(engine, now=NOW)
+
+    assert result == {"revoked_tokens": 5, "password_resets": 1, "pre_register_tokens": 2, "activation_tokens": 1,
+                      "refresh_tokens": 2}
+    assert remaining_tokens(engine) == {
+        "revoked_tokens": ["vigente"],
+        "password_resets": ["reset-vigente"],
+        "pre_register_tokens": ["pre-vigente"],
+        "activation_tokens": ["act-vigente"],
+        "refresh_tokens": ["refresh-usado"],
+    }
+
+
+def test_purge_runs_in_bounded_batches(engine):
+    """Cada lote es una sentencia DELETE con LIMIT del tamaño configurado"""
+    deletes = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: deletes.append(statement) if statement.startswith("DELETE FROM revoked_tokens") else None)
+
+    result = purge_expired(engine, batch_size=2, now=NOW)
+
+    assert result["revoked_tokens"] == 5
+    assert len(deletes) == 3
+    assert all("LIMIT" in statement for statement in deletes)
+
+
+def test_purge_is_idempotent(engine):
+    purge_expired(engine, now=NOW)
+    assert sum(purge_expired(engine, now=NOW).values()) == 0
+
+
+def test_cli_reports_counts(engine, monkeypatch, capsys):
+    monkeypatch.setattr("app.maintenance.__main__.engine", engine)
+    monkeypatch.setattr("app.maintenance.__main__.run_purge",
+                        lambda engine, batch_size=None: purge_expired(engine, batch_size, now=NOW))
+
+    assert main(["purge", "--batch-size", "10"]) == 0
+
+    output = capsys.readouterr().out
+    assert "revoked_tokens" in output
+    assert "11" in output.splitlines()[-1]
+
+
+def test_scheduler_purges_periodically(engine):
+    """El planificador ejecuta la purga en segundo plano y se detiene con la aplicación"""
+    async def scenario():
+        scheduler = MaintenanceScheduler(interval_seconds=0.01, engine=engine)
+        scheduler.start()
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if scheduler.last_result is not None:
+                break
+        await scheduler.stop()
+        return scheduler.last_result
+
+    result = asyncio.run(scenario())
+
+    # Con la hora actual los tokens de 2025 ya vencieron todos
+    assert result is not None
+    assert result["revoked_tokens"] == 6
+
+
+def test_scheduler_disabled_with_zero_interval(engine):
+    async def scenario():
+        scheduler = MaintenanceScheduler(interval_seconds=0, engine=engine)
+        scheduler.start()
+        started = scheduler._task is not None
+        await scheduler.stop()
+        return started
+
+    assert asyncio.run(scenario()) is False
+    assert run_purge(engine)["revoked_tokens"] == 6
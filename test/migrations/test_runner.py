@@ -0,0 +1,210 @@
+import importlib
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.migrations import Migration, check_schema, current_version, history, load_migrations, upgrade
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _create_items(connection):
+    connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+
+
+def _add_name(connection):
+    connection.execute(text("ALTER TABLE items ADD COLUMN name VARCHAR"))
+
+
+def _fail(connection):
+    connection.execute(text("CREATE TABLE partial (id INTEGER PRIMARY KEY)"))
+    raise RuntimeError("falla intencional")
+
+
+def test_load_migrations_is_ordered():
+    migrations = load_migrations()
+    versions = [migration.version for migration in migrations]
+    assert versions == sorted(versions)
+    assert versions[0] == 1
+
+
+def test_upgrade_creates_schema_and_records_version(engine):
+    assert current_version(engine) is None
+
+    applied = upgrade(engine)
+
+    assert applied == [migration.version for migration in load_migrations()]
+    assert current_version(engine) == applied[-1]
+    tables = set(inspect(engine).get_table_names())
+    assert {"users", "property", "lot", "notifications", "schema_version"} <= tables
+    assert check_schema(engine)["up_to_date"] is True
+
+
+def test_upgrade_is_idempotent(engine):
+    migrations = [Migration(1, "0001_items", "items", _create_items), Migration(2, "0002_name", "name", _add_name)]
+    assert upgrade(engine, migrations=migrations) == [1, 2]
+    assert upgrade(engine, migrations=migrations) == []
+    assert [row["version"] for row in history(engine)] == [1, 2]
+
+
+def test_upgrade_to_target(engine):
+    migrations = [Migration(1, "0001_items", "items", _create_items), Migration(2, "0002_name", "name", _add_name)]
+    assert upgrade(engine, target=1, migrations=migrations) == [1]
+    assert current_version(engine) == 1
+    assert upgrade(engine, migrations=migrations) == [2]
+
+
+def test_failed_migration_is_not_recorded(engine):
+    migrations = [Migration(1, "0001_items", "items", _create_items), Migration(2, "0002_fail", "falla", _fail)]
+    with pytest.raises(RuntimeError):
+        upgrade(engine, migrations=migrations)
+    assert current_version(engine) == 1
+
+
+def test_check_schema_without_version_table(engine):
+    status = check_schema(engine)
+    assert status["up_to_date"] is False
+    assert status["current"] is None
+
+
+def test_index_migration_on_existing_database(engine):
+    """Una base creada antes de los índices los recibe al aplicar la migración 0002"""
+    indexes = importlib.import_module("app.migrations.versions.0002_hot_query_indexes").INDEXES
+    upgrade(engine, target=1)
+    inspector = inspect(engine)
+    for table_name, index_name, _ in indexes:
+        assert index_name not in {index["name"] for index in inspector.get_indexes(table_name)}
+
+    assert upgrade(engine, target=2) == [2]
+
+    inspector = inspect(engine)
+    for table_name, index_name, _ in indexes:
+        assert index_name in {index["name"] for index in inspector.get_indexes(table_name)}
+
+
+def _schema(engine):
+    inspector = inspect(engine)
+    return {
+        table: (
+            {(column["name"], column["nullable"]) for column in inspector.get_columns(table)},
+            {(index["name"], tuple(index["column_names"]), bool(index["unique"])) for index in inspector.get_indexes(table)},
+        )
+        for table in inspector.get_table_names()
+        if table != "schema_version"
+    }
+
+
+def test_migrations_match_models(engine, tmp_path):
+    """Las migraciones congeladas producen el mismo esquema que los modelos actuales"""
+    from app.database import Base
+    from app.my_company import models as _company_models  # noqa: F401
+    from app.property_routes import models as _property_models  # noqa: F401
+    from app.roles import models as _role_models  # noqa: F401
+    from app.users import models as _user_models  # noqa: F401
+
+    models_engine = create_engine(f"sqlite:///{tmp_path / 'models.db'}")
+    Base.metadata.create_all(models_engine)
+    upgrade(engine)
+
+    assert _schema(engine) == _schema(models_engine)
+    models_engine.dispose()
+
+
+def test_non_transactional_flag_is_loaded():
+    migrations = {migration.name: migration for migration in load_migrations()}
+    assert migrations["0002_hot_query_indexes"].transactional is False
+    assert migrations["0001_initial_schema"].transactional is True
+
+
+def test_revoked_tokens_migration_hashes_existing_rows(engine):
+    """Los JWT guardados antes de la migración 0003 quedan reemplazados por su huella"""
+    from app.auth.revocation import token_digest
+
+    upgrade(engine, target=2)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO revoked_tokens (id, token, expires_at) VALUES (1, 'header.payload.signature', '2030-01-01')"
+        ))
+
+    assert upgrade(engine, target=3) == [3]
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT token FROM revoked_tokens")).scalar() == token_digest("header.payload.signature")
+
+
+def test_unread_counter_migration_backfills_existing_users(engine):
+    """La migración 0007 agrega el contador y lo calcula desde las notificaciones sin leer"""
+    upgrade(engine, target=6)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO users (id, name) VALUES (1, 'Ana'), (2, 'Luis')"))
+        connection.execute(text(
+            "INSERT INTO notifications (user_id, title, message, type, read) VALUES "
+            "(1, 't', 'm', 'info', 0), (1, 't', 'm', 'info', 0), (1, 't', 'm', 'info', 1), (2, 't', 'm', 'info', 1)"
+        ))
+
+    assert upgrade(engine, target=7) == [7]
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT id, unread_notifications FROM users ORDER BY id")).all() == [(1, 2), (2, 0)]
+
+
+def test_notification_created_at_migration_backfills_and_requires_it(engine):
+    """La migración 0009 completa las fechas faltantes y deja la columna obligatoria"""
+    upgrade(engine, target=8)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO users (id, name) VALUES (1, 'Ana')"))
+        connection.execute(text(
+            "INSERT INTO notifications (id, user_id, title, message, type, read, created_at) VALUES "
+            "(1, 1, 't', 'm', 'info', 0, '2025-01-01 10:00:00.000000'), (2, 1, 't', 'm', 'info', 0, NULL)"
+        ))
+
+    assert upgrade(engine, target=9) == [9]
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT id, created_at FROM notifications ORDER BY id")).all() == [
+            (1, "2025-01-01 10:00:00.000000"), (2, "2025-01-01 10:00:00.000000")
+        ]
+    created_at = next(column for column in inspect(engine).get_columns("notifications") if column["name"] == "created_at")
+    assert created_at["nullable"] is False
+    assert "ix_notifications_user_id_created_at" in {index["name"] for index in inspect(engine).get_indexes("notifications")}
+
+
+def test_create_notifications_permission_is_granted_to_admins(engine):
+    """La migración 0010 crea el permiso que exige POST /users/notifications/ y lo otorga al administrador"""
+    upgrade(engine, target=9)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO vars (id, name) VALUES (1, 'Activo')"))
+        connection.execute(text(
+            "INSERT INTO rol (id, name, description, status) VALUES (1, 'Administrador', 'a', 1), (2, 'Usuario', 'u', 1)"
+        ))
+
+    assert upgrade(engine, target=10) == [10]
+    # Idempotente si se vuelve a ejecutar
+    with engine.begin() as connection:
+        load_migrations()[9].upgrade(connection)
+
+    with engine.connect() as connection:
+        assert connection.execute(text(
+            "SELECT rol.name FROM rol_permission JOIN rol ON rol.id = rol_permission.rol_id "
+            "JOIN permission ON permission.id = rol_permission.permission_id WHERE permission.name = 'crear_notificaciones'"
+        )).scalars().all() == ["Administrador"]
+
+
+def test_startup_refuses_outdated_schema(engine, monkeypatch):
+    """El worker no arranca si faltan migraciones"""
+    from fastapi.testclient import TestClient
+
+    import app.main
+
+    monkeypatch.setattr(app.main, "SCHEMA_CHECK_ON_STARTUP", True)
+    monkeypatch.setattr(app.main, "engine", engine)
+    upgrade(engine, target=1)
+
+    with pytest.raises(RuntimeError, match="python -m app.migrations upgrade"):
+        with TestClient(app.main.app):
+            pass
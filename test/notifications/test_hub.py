@@ -0,0 +1,231 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.notifications.hub import NotificationHub, event_stream, format_event
+from app.users.models import Notification, User
+
+NOW = datetime(2025, 1, 1, 12, 0)
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    """Base SQLite con tres usuarios y una notificación previa"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'hub.db'}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add_all([User(id=i, name=f"Usuario {i}") for i in (1, 2, 3)])
+        session.add(Notification(user_id=1, title="Anterior", message="m", type="info", read=False, created_at=NOW))
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+def notify(engine, *user_ids):
+    with sessionmaker(bind=engine)() as session:
+        session.add_all([
+            Notification(user_id=user_id, title="Aviso", message=f"Para {user_id}", type="info", read=False, created_at=NOW)
+            for user_id in user_ids
+        ])
+        session.commit()
+
+
+def count_selects(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement) if statement.startswith("SELECT") else None)
+    return statements
+
+
+async def connected():
+    return False
+
+
+def test_new_notifications_reach_their_user_only(engine):
+    async def scenario():
+        hub = NotificationHub(engine, poll_seconds=60)
+        ana, luis = await hub.subscribe(1), await hub.subscribe(2)
+        notify(engine, 1, 1, 3)
+        await hub.poll()
+        await hub.stop()
+        return ana, luis
+
+    ana, luis = asyncio.run(scenario())
+
+    # La notificación previa a la suscripción no se reenvía
+    assert [ana.queue.get_nowait()["message"] for _ in range(ana.queue.qsize())] == ["Para 1", "Para 1"]
+    assert luis.queue.empty()
+
+
+def test_one_query_per_round_for_all_connections(engine):
+    async def scenario():
+        hub = NotificationHub(engine, poll_seconds=60)
+        subscriptions = [await hub.subscribe(1 + i % 3) for i in range(300)]
+        notify(engine, 1, 2, 3)
+        selects = count_selects(engine)
+        await hub.poll()
+        await hub.stop()
+        return subscriptions, selects
+
+    subscriptions, selects = asyncio.run(scenario())
+
+    assert len(selects) == 1
+    assert all(subscription.queue.qsize() == 1 for subscription in subscriptions)
+
+
+def notify_with_id(engine, notification_id, user_id):
+    with sessionmaker(bind=engine)() as session:
+        session.add(Notification(id=notification_id, user_id=user_id, title="Aviso", message=f"Id {notification_id}",
+                                 type="info", read=False, created_at=NOW))
+        session.commit()
+
+
+def test_late_commit_with_lower_id_is_delivered_once(engine):
+    """Una fila confirmada después de otra con id mayor se entrega en una ronda posterior"""
+    async def scenario():
+        hub = NotificationHub(engine, poll_seconds=60)
+        subscription = await hub.subscribe(1)
+        # La notificación 2 aún no se confirma cuando se leen la 3 y la 4
+        notify_with_id(engine, 3, 1)
+        notify_with_id(engine, 4, 1)
+        await hub.poll()
+        notify_with_id(engine, 2, 1)
+        selects = count_selects(engine)
+        await hub.poll()
+        await hub.poll()
+        await hub.stop()
+        return subscription, selects
+
+    subscription, selects = asyncio.run(scenario())
+
+    delivered = [subscription.queue.get_nowait()["id"] for _ in range(subscription.queue.qsize())]
+    assert delivered == [3, 4, 2]
+    assert len(selects) == 2
+
+
+def test_missing_ids_are_forgotten_after_the_lookback(engine):
+    async def scenario():
+        hub = NotificationHub(engine, poll_seconds=60, lookback_seconds=0)
+        subscription = await hub.subscribe(1)
+        notify_with_id(engine, 3, 1)
+        await hub.poll()
+        notify_with_id(engine, 2, 1)
+        await hub.poll()
+        await hub.stop()
+        return subscription
+
+    subscription = asyncio.run(scenario())
+
+    assert [subscription.queue.get_nowait()["id"] for _ in range(subscription.queue.qsize())] == [3]
+
+
+def test_idle_hub_does_not_query(engine):
+    async def scenario():
+        hub = NotificationHub(engine, poll_seconds=60)
+        subscription = await hub.subscribe(1)
+        hub.unsubscribe(subscription)
+        selects = count_selects(engine)
+        await hub.poll()
+        await hub.stop()
+        return len(hub), selects
+
+    assert asyncio.run(scenario()) == (0, [])
+
+
+def test_wake_delivers_without_waiting_for_the_interval(engine):
+    async def scenario():
+        hub = NotificationHub(engine, poll_seconds=60)
+        subscription = await hub.subscribe(2)
+        await asyncio.to_thread(notify, engine, 2)
+        # Desde otro hilo, como create_notification o el despachador
+        await asyncio.to_thread(hub.wake)
+        event = await asyncio.wait_for(subscription.queue.get(), 5)
+        await hub.stop()
+        return event
+
+    assert asyncio.run(scenario())["message"] == "Para 2"
+
+
+def test_full_queue_drops_and_asks_to_resync(engine):
+    async def scenario():
+        hub = NotificationHub(engine, poll_seconds=60, queue_size=2)
+        subscription = await hub.subscribe(1)
+        notify(engine, 1, 1, 1, 1, 1)
+        await hub.poll()
+        stream = event_stream(hub, subscription, 7, connected, heartbeat_seconds=0.01)
+        chunks = [await stream.__anext__() for _ in range(5)]
+        await stream.aclose()
+        await hub.stop()
+        return chunks, subscription.dropped, len(hub)
+
+    chunks, dropped, connections = asyncio.run(scenario())
+
+    assert chunks[0] == "retry: 5000\n" + format_event("unread", {"count": 7})
+    assert chunks[1] == format_event("resync", {})
+    assert [chunk.splitlines()[0] for chunk in chunks[2:4]] == ["event: notification"] * 2
+    assert json.loads(chunks[2].splitlines()[2][len("data: "):])["message"] == "Para 1"
+    assert chunks[4] == ": ping\n\n"
+    assert dropped == 0
+    assert connections == 0
+
+
+def test_stream_ends_when_client_disconnects(engine):
+    async def disconnected():
+        return True
+
+    async def scenario():
+        hub = NotificationHub(engine, poll_seconds=60)
+        subscription = await hub.subscribe(1)
+        chunks = [chunk async for chunk in event_stream(hub, subscription, 0, disconnected)]
+        await hub.stop()
+        return chunks, len(hub)
+
+    chunks, connections = asyncio.run(scenario())
+
+    assert len(chunks) == 1
+    assert connections == 0
+
+
+def test_stream_ends_when_the_session_expires(engine):
+    async def scenario():
+        hub = NotificationHub(engine, poll_seconds=60)
+        subscription = await hub.subscribe(1)
+        stream = event_stream(hub, subscription, 0, connected, heartbeat_seconds=60, expires_at=time.time() + 0.05)
+        chunks = [await asyncio.wait_for(stream.__anext__(), 5) for _ in range(2)]
+        remaining = [chunk async for chunk in stream]
+        await hub.stop()
+        return chunks, remaining, len(hub)
+
+    chunks, remaining, connections = asyncio.run(scenario())
+
+    assert chunks[1] == format_event("session_ended", {"reason": "expired"})
+    assert remaining == []
+    assert connections == 0
+
+
+def test_stream_ends_when_the_token_is_revoked(engine):
+    revoked = []
+
+    async def is_revoked():
+        return bool(revoked)
+
+    async def scenario():
+        hub = NotificationHub(engine, poll_seconds=60)
+        subscription = await hub.subscribe(1)
+        stream = event_stream(hub, subscription, 0, connected, heartbeat_seconds=0.01, is_revoked=is_revoked)
+        chunks = [await stream.__anext__() for _ in range(2)]
+        revoked.append(True)
+        chunks += [chunk async for chunk in stream]
+        await hub.stop()
+        return chunks, len(hub)
+
+    chunks, connections = asyncio.run(scenario())
+
+    assert chunks[1:] == [": ping\n\n", format_event("session_ended", {"reason": "revoked"})]
+    assert connections == 0
@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.notifications import NotificationDispatcher, dispatch_pending
+from app.notifications.__main__ import main
+from app.property_routes.models import Lot, Property, PropertyLot, PropertyUser
+from app.property_routes.services import PropertyLotService
+from app.users.models import Notification, NotificationOutbox, User
+
+NOW = datetime(2025, 1, 1, 12, 0)
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    """Base SQLite con un propietario, su predio activo y un lote"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add(User(id=1, name="Ana"))
+        session.add(Property(id=1, name="La Esperanza", longitude=0, latitude=0, extension=10,
+                             real_estate_registration_number=1, state=3))
+        session.add(Lot(id=1, name="Lote 1", longitude=0, latitude=0, extension=1,
+                        real_estate_registration_number=2, state=6))
+        session.add_all([PropertyLot(property_id=1, lot_id=1), PropertyUser(property_id=1, user_id=1)])
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+def enqueue(engine, count):
+    with sessionmaker(bind=engine)() as session:
+        session.add_all([
+            NotificationOutbox(user_id=1, title="Aviso", message=str(i), type="test", created_at=NOW)
+            for i in range(count)
+        ])
+        session.commit()
+
+
+def contents(engine):
+    with sessionmaker(bind=engine)() as session:
+        return (
+            [(row.message, row.read, row.created_at) for row in session.query(Notification).order_by(Notification.id)],
+            session.query(NotificationOutbox).count(),
+        )
+
+
+def test_dispatch_moves_outbox_rows(engine):
+    enqueue(engine, 3)
+
+    assert dispatch_pending(engine) == 3
+
+    notifications, pending = contents(engine)
+    assert notifications == [(str(i), False, NOW) for i in range(3)]
+    assert pending == 0
+    assert dispatch_pending(engine) == 0
+
+
+def test_dispatch_in_batches(engine):
+    """Cada lote es un INSERT ... SELECT, sin una sentencia por notificación"""
+    enqueue(engine, 5)
+    inserts = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: inserts.append(statement) if statement.startswith("INSERT INTO notifications") else None)
+
+    assert dispatch_pending(engine, batch_size=2) == 5
+    assert len(inserts) == 3
+    assert all("SELECT" in statement for statement in inserts)
+
+
+def test_update_lot_state_only_enqueues(engine):
+    """La petición escribe el aviso en el outbox con el cambio de estado, en un solo commit"""
+    statements, commits = [], []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    event.listen(engine, "commit", lambda conn: commits.append(conn))
+
+    with sessionmaker(bind=engine)() as session:
+        lot = PropertyLotService(session).update_lot_state(1, True)
+        assert lot.state == 5
+
+    assert not [statement for statement in statements if statement.startswith("INSERT INTO notifications")]
+    assert len([statement for statement in statements if statement.startswith("INSERT INTO notification_outbox")]) == 1
+    assert len(commits) == 1
+
+    dispatch_pending(engine)
+    with sessionmaker(bind=engine)() as session:
+        notification = session.query(Notification).one()
+    assert (notification.user_id, notification.type) == (1, "lot_status_change")
+
+
+def test_dispatcher_delivers_periodically(engine):
+    enqueue(engine, 2)
+
+    async def scenario():
+        dispatcher = NotificationDispatcher(interval_seconds=0.01, engine=engine)
+        dispatcher.start()
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if dispatcher.delivered:
+                break
+        await dispatcher.stop()
+        return dispatcher.delivered
+
+    assert asyncio.run(scenario()) == 2
+    assert contents(engine)[1] == 0
+
+
+def test_dispatcher_disabled_with_zero_interval(engine):
+    async def scenario():
+        dispatcher = NotificationDispatcher(interval_seconds=0, engine=engine)
+        dispatcher.start()
+        started = dispatcher._task is not None
+        await dispatcher.stop()
+        return started
+
+    assert asyncio.run(scenario()) is False
+
+
+def test_cli_dispatch(engine, monkeypatch, capsys):
+    monkeypatch.setattr("app.notifications.__main__.engine", engine)
+    enqueue(engine, 4)
+
+    assert main(["dispatch", "--batch-size", "3"]) == 0
+
+    assert capsys.readouterr().out.strip() == "4 notificaciones entregadas"
+    assert contents(engine)[1] == 0
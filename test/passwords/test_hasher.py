@@ -0,0 +1,223 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from Crypto.Protocol.KDF import scrypt
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.auth.services import AuthService
+from app.passwords import LEGACY_PARAMS, PasswordHasher, PasswordHasherBusy, ScryptParams, calibrate, decode_hash
+from app.passwords.__main__ import main
+from app.users.models import User
+
+
+def _wait_for(event: threading.Event):
+    event.wait(5)
+    return "listo"
+
+
+@pytest.fixture()
+def hasher():
+    hasher = PasswordHasher(executor="thread", max_workers=2, max_pending=2, queue_timeout=0.05)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hash_is_compatible_with_stored_passwords(hasher):
+    """El hash coincide con el formato ya almacenado (scrypt N=2**14, r=8, p=1, 32 bytes)"""
+    salt, hashed = hasher.hash("CorrectPassword123")
+    expected = scrypt(b"CorrectPassword123", bytes.fromhex(salt), key_len=32, N=2**14, r=8, p=1).hex()
+
+    assert hashed == f"scrypt$ln=14,r=8,p=1${expected}"
+    assert hasher.verify(salt, hashed, "CorrectPassword123") is True
+    assert hasher.verify(salt, hashed, "WrongPassword123") is False
+
+
+def test_process_pool_roundtrip():
+    hasher = PasswordHasher(executor="process", max_workers=1, max_pending=2)
+    try:
+        salt, hashed = hasher.hash("CorrectPassword123")
+        assert hasher.verify(salt, hashed, "CorrectPassword123") is True
+    finally:
+        hasher.shutdown()
+
+
+def test_backpressure_when_saturated(hasher):
+    """Con todos los cupos ocupados la operación falla rápido con PasswordHasherBusy"""
+    release = threading.Event()
+    pending = [threading.Thread(target=hasher.run, args=(_wait_for, release)) for _ in range(2)]
+    for thread in pending:
+        thread.start()
+    time.sleep(0.05)
+    try:
+        with pytest.raises(PasswordHasherBusy):
+            hasher.hash("CorrectPassword123")
+    finally:
+        release.set()
+        for thread in pending:
+            thread.join()
+
+    # Al liberarse los cupos vuelve a aceptar trabajo
+    assert hasher.run(_wait_for, release) == "listo"
+
+
+def test_async_api_does_not_block_event_loop():
+    """Mientras se verifican contraseñas el event loop sigue atendiendo otras tareas"""
+    hasher = PasswordHasher(executor="thread", max_workers=2, max_pending=2, queue_timeout=5)
+    salt, hashed = hasher.hash("CorrectPassword123")
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.001)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        results = await asyncio.gather(*[
+            hasher.verify_async(salt, hashed, "CorrectPassword123") for _ in range(4)
+        ])
+        task.cancel()
+        return results, ticks
+
+    try:
+        results, ticks = asyncio.run(scenario())
+    finally:
+        hasher.shutdown()
+    assert results == [True] * 4
+    assert ticks > 5
+
+
+def test_cancelled_wait_returns_the_slot():
+    """Una petición cancelada mientras espera cupo no se queda con él al liberarse"""
+    hasher = PasswordHasher(executor="thread", max_workers=1, max_pending=1, queue_timeout=5)
+    release = threading.Event()
+
+    async def scenario():
+        busy = asyncio.ensure_future(hasher.run_async(_wait_for, release))
+        await asyncio.sleep(0.05)
+        waiting = asyncio.ensure_future(hasher.run_async(_wait_for, release))
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        release.set()
+        await busy
+        # El hilo que esperaba obtiene el cupo y lo devuelve
+        await asyncio.sleep(0.1)
+
+    try:
+        asyncio.run(scenario())
+        assert hasher._slots.acquire(blocking=False) is True
+    finally:
+        hasher.shutdown()
+
+
+def test_login_returns_503_when_hasher_is_busy(monkeypatch):
+    """La saturación no se confunde con credenciales inválidas"""
+    class User:
+        password_salt = "00" * 16
+        password = "00" * 32
+
+    def busy(*args):
+        raise PasswordHasherBusy("ocupado")
+
+    service = AuthService(None)
+    monkeypatch.setattr(service, "get_user_by_username", lambda email: User())
+    monkeypatch.setattr("app.auth.services.password_hasher.verify", busy)
+
+    with pytest.raises(HTTPException) as error:
+        service.authenticate_user("ana@disriego.test", "CorrectPassword123")
+
+    assert error.value.status_code == 503
+
+
+def test_hash_stores_its_parameters():
+    """El hash guarda el costo con el que se generó y se verifica con ese costo"""
+    cheap = PasswordHasher(executor="inline", params=ScryptParams(10, 8, 1))
+    salt, hashed = cheap.hash("CorrectPassword123")
+
+    assert hashed.startswith("scrypt$ln=10,r=8,p=1$")
+    assert decode_hash(hashed)[1] == scrypt(b"CorrectPassword123", bytes.fromhex(salt), key_len=32, N=2**10, r=8, p=1).hex()
+    # Un hasher configurado con otro costo sigue verificándolo, pero pide regenerarlo
+    current = PasswordHasher(executor="inline", params=ScryptParams(11, 8, 1))
+    assert current.verify(salt, hashed, "CorrectPassword123") is True
+    assert current.needs_rehash(hashed) is True
+    assert cheap.needs_rehash(hashed) is False
+
+
+def test_legacy_hashes_use_legacy_parameters():
+    """Los hashes sin prefijo son scrypt ln=14, r=8, p=1"""
+    salt = "ab" * 16
+    legacy = scrypt(b"CorrectPassword123", bytes.fromhex(salt), key_len=32, N=2**14, r=8, p=1).hex()
+
+    assert decode_hash(legacy) == (LEGACY_PARAMS, legacy)
+    assert PasswordHasher(executor="inline", params=LEGACY_PARAMS).needs_rehash(legacy) is False
+    assert PasswordHasher(executor="inline", params=ScryptParams(12, 8, 1)).needs_rehash(legacy) is True
+
+
+def test_login_rehashes_outdated_password(monkeypatch, session):
+    """Un inicio de sesión correcto regenera el hash con los parámetros actuales"""
+    salt = "ab" * 16
+    legacy = scrypt(b"CorrectPassword123", bytes.fromhex(salt), key_len=32, N=2**14, r=8, p=1).hex()
+    monkeypatch.setattr("app.auth.services.password_hasher",
+                        PasswordHasher(executor="inline", params=ScryptParams(10, 8, 1)))
+    session.add(User(id=1, email="ana@disriego.test", password=legacy, password_salt=salt))
+    session.commit()
+
+    user = AuthService(session).authenticate_user("ana@disriego.test", "CorrectPassword123")
+    stored = session.query(User.password, User.password_salt).filter(User.id == 1).one()
+
+    assert user.id == 1
+    assert stored.password.startswith("scrypt$ln=10,r=8,p=1$")
+    assert stored.password_salt != salt
+    # La contraseña sigue funcionando con el hash nuevo y ya no se regenera
+    assert AuthService(session).authenticate_user("ana@disriego.test", "CorrectPassword123").password == stored.password
+
+
+def test_failed_rehash_keeps_the_login_transaction(monkeypatch, session):
+    """Si el flush del hash nuevo falla se deshace solo su SAVEPOINT: el resto de la transacción sigue"""
+    salt = "ab" * 16
+    legacy = scrypt(b"CorrectPassword123", bytes.fromhex(salt), key_len=32, N=2**14, r=8, p=1).hex()
+    monkeypatch.setattr("app.auth.services.password_hasher",
+                        PasswordHasher(executor="inline", params=ScryptParams(10, 8, 1)))
+    session.add(User(id=1, email="ana@disriego.test", password=legacy, password_salt=salt))
+    session.commit()
+    # Trabajo previo de la misma transacción, ya enviado pero sin confirmar
+    session.add(User(id=2, email="luis@disriego.test"))
+    session.flush()
+
+    @event.listens_for(session, "before_flush")
+    def fail_on_user_update(db, flush_context, instances):
+        if any(isinstance(instance, User) for instance in db.dirty):
+            raise RuntimeError("fallo al guardar")
+
+    user = AuthService(session).authenticate_user("ana@disriego.test", "CorrectPassword123")
+    event.remove(session, "before_flush", fail_on_user_update)
+    session.commit()
+
+    assert user.id == 1
+    assert session.query(User.password).filter(User.id == 1).scalar() == legacy
+    assert session.get(User, 2) is not None
+
+
+def test_calibrate_picks_highest_cost_within_target():
+    """La calibración elige el mayor log_n cuya mediana no supera el objetivo"""
+    # Pares (inicio, fin) en segundos: 1, 2, 4, 8 y 16 ms para log_n 10..14
+    readings = iter(value for ms in (1, 2, 4, 8, 16) for value in (0.0, ms / 1000))
+
+    chosen, measurements = calibrate(target_ms=10, min_log_n=10, max_log_n=14, repeat=1,
+                                     timer=lambda: next(readings))
+
+    assert chosen == ScryptParams(13, 8, 1)
+    assert [params.log_n for params, _ in measurements] == [10, 11, 12, 13, 14]
+
+
+def test_calibrate_cli(capsys):
+    assert main(["calibrate", "--target-ms", "1", "--repeat", "1"]) == 0
+    output = capsys.readouterr().out
+    assert "PASSWORD_SCRYPT_LOG_N=" in output
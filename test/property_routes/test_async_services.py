@@ -0,0 +1,177 @@
+import asyncio
+import datetime
+import json
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app import database
+from app.database import Base, _async_url
+from app.main import app
+from app.my_company.models import Company, ColorPalette, CompanyCertificate, DigitalCertificate
+from app.my_company.services import AsyncCompanyService
+from app.property_routes.models import Property, Lot, PropertyLot, PropertyUser
+from app.property_routes.services import AsyncPropertyLotService, PropertyLotService
+from app.roles.models import Vars
+from app.users.models import User, Notification
+from app.users.services import AsyncNotificationService
+
+
+@pytest.fixture()
+def database_file(tmp_path):
+    """Archivo SQLite sembrado con el motor síncrono y leído luego con aiosqlite"""
+    path = tmp_path / "async.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add_all([Vars(id=3, name="Activo"), Vars(id=5, name="Lote activo"), Vars(id=9, name="Vigente")])
+        session.add(User(id=1, name="Ana", document_number=123456, unread_notifications=1))
+        for property_id in (1, 2, 3):
+            session.add(Property(
+                id=property_id, name=f"Predio {property_id}", longitude=-75.0, latitude=4.0,
+                extension=100.0, real_estate_registration_number=1000 + property_id, state=3
+            ))
+            session.add(PropertyUser(property_id=property_id, user_id=1))
+        session.add(Lot(
+            id=1, name="Lote 1", longitude=-75.0, latitude=4.0, extension=10.0,
+            real_estate_registration_number=2001, planting_date=datetime.date(2024, 3, 1), state=5
+        ))
+        session.add(PropertyLot(property_id=1, lot_id=1))
+        session.add(ColorPalette(
+            id=1, primary_color="#000", secondary_color="#111", tertiary_color="#222",
+            primary_text="#333", secondary_text="#444", background_color="#555", border_color="#666"
+        ))
+        session.add(Company(
+            id=1, name="DisRiego", nit=900123, email="info@disriego.test", phone="123", country="CO",
+            state="Tolima", city="Ibagué", address="Calle 1", logo="logo.png", color_palette_id=1
+        ))
+        session.add(DigitalCertificate(
+            id=1, serial_number=777, start_date=datetime.date(2000, 1, 1),
+            expiration_date=datetime.date(2999, 1, 1), attached="cert.pem", nit=900123, status_id=9
+        ))
+        session.add(CompanyCertificate(id=1, company_id=1, digital_certificate_id=1))
+        session.add_all([
+            Notification(user_id=1, title="a", message="m", type="info", read=False,
+                         created_at=datetime.datetime(2024, 1, 1)),
+            Notification(user_id=1, title="b", message="m", type="info", read=True,
+                         created_at=datetime.datetime(2024, 1, 2)),
+        ])
+        session.commit()
+    engine.dispose()
+    return path
+
+
+def run_async(database_file, action):
+    """Ejecuta `action(session)` sobre una AsyncSession nueva y libera el motor"""
+    async def runner():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{database_file}")
+        try:
+            async with async_sessionmaker(engine, class_=AsyncSession)() as session:
+                return await action(session)
+        finally:
+            await engine.dispose()
+    return asyncio.run(runner())
+
+
+@pytest.fixture()
+def async_database(database_file, monkeypatch):
+    """Apunta AsyncSessionLocal al archivo de prueba (las rutas y el streaming abren su propia sesión)"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{database_file}")
+    monkeypatch.setattr(database, "_async_engine", engine)
+    monkeypatch.setattr(database, "_async_sessionmaker", async_sessionmaker(engine, class_=AsyncSession))
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+def test_async_url():
+    assert _async_url("postgresql://u:p@db:5432/disriego") == "postgresql+asyncpg://u:p@db:5432/disriego"
+    assert _async_url("postgres://u:p@db/disriego") == "postgresql+asyncpg://u:p@db/disriego"
+    assert _async_url("postgresql+psycopg2://u:p@db/disriego") == "postgresql+asyncpg://u:p@db/disriego"
+    assert _async_url("sqlite:///./local.db") == "sqlite+aiosqlite:///./local.db"
+
+
+def test_async_property_reads_match_sync(database_file):
+    """Las variantes asíncronas responden exactamente lo mismo que las síncronas"""
+    async def action(session):
+        service = AsyncPropertyLotService(session)
+        return [
+            await service.get_all_properties(limit=2),
+            await service.get_property_by_id(1),
+            await service.get_lots_property(1),
+            await service.get_lot_by_id(1),
+            await service.get_properties_for_user(1),
+            await service.get_lot_by_id(99),
+        ]
+
+    async_responses = run_async(database_file, action)
+
+    engine = create_engine(f"sqlite:///{database_file}")
+    with sessionmaker(bind=engine)() as session:
+        service = PropertyLotService(session)
+        sync_responses = [
+            service.get_all_properties(limit=2),
+            service.get_property_by_id(1),
+            service.get_lots_property(1),
+            service.get_lot_by_id(1),
+            service.get_properties_for_user(1),
+            service.get_lot_by_id(99),
+        ]
+    engine.dispose()
+
+    for async_response, sync_response in zip(async_responses, sync_responses):
+        assert async_response.status_code == sync_response.status_code
+        assert json.loads(async_response.body) == json.loads(sync_response.body)
+    assert json.loads(async_responses[3].body)["data"]["planting_date"] == "2024-03-01"
+
+
+def test_async_stream_properties(async_database):
+    async def collect():
+        return [line async for line in AsyncPropertyLotService.stream_properties()]
+
+    lines = asyncio.run(collect())
+    assert all(line.endswith("\n") for line in lines)
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3]
+
+
+def test_async_company_info_and_certificates(database_file):
+    async def action(session):
+        service = AsyncCompanyService(session)
+        return await service.get_company_info(), await service.get_certificates()
+
+    company_response, certificates_response = run_async(database_file, action)
+    company = json.loads(company_response.body)["data"]
+    assert company["name"] == "DisRiego"
+    assert company["certificate"] == {"serial_number": 777, "digital_certificate_id": 1}
+
+    certificates = json.loads(certificates_response.body)["data"]
+    assert certificates[0]["nombre_estado"] == "Vigente"
+    assert certificates[0]["expiration_date"] == "2999-01-01"
+
+
+def test_async_notifications(database_file):
+    async def action(session):
+        service = AsyncNotificationService(session)
+        return (
+            await service.get_user_notifications(1),
+            await service.get_unread_notification_count(1),
+            await service.get_user_notifications(42),
+        )
+
+    notifications, unread, missing = run_async(database_file, action)
+    assert [item["title"] for item in notifications["data"]] == ["b", "a"]
+    assert notifications["unread_count"] == 1
+    assert unread == {"success": True, "count": 1}
+    assert missing["success"] is False
+
+
+def test_properties_route_uses_async_session(async_database):
+    """GET /properties/ se sirve con sesiones asíncronas; el streaming lee con la suya después de responder"""
+    client = TestClient(app)
+    response = client.get("/properties/", params={"limit": 2})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["data"]] == [1, 2]
+
+    response = client.get("/properties/", params={"stream": "true"})
+    assert [json.loads(line)["id"] for line in response.text.strip().split("\n")] == [1, 2, 3]
+    assert async_database.pool.checkedout() == 0
@@ -0,0 +1,101 @@
+import json
+import datetime
+import decimal
+import pytest
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, Column, Integer, Numeric, DateTime
+from sqlalchemy.orm import declarative_base
+from app.property_routes.models import Property, Lot, PropertyLot, PropertyUser
+from app.property_routes.services import PropertyLotService
+from app.my_company.models import TypeCrop, PaymentInterval
+from app.roles.models import Vars
+from app.users.models import User
+from app.serializers import encoder_for, RowEncoder
+
+
+@pytest.fixture()
+def db(session):
+    """Base de datos SQLite en memoria con un predio y dos lotes con fechas"""
+    session.add_all([Vars(id=3, name="Activo"), Vars(id=5, name="Lote activo"), Vars(id=7, name="Cultivo activo")])
+    session.add(PaymentInterval(id=1, name="Mensual", interval_days=30))
+    session.add(TypeCrop(id=1, name="Café", harvest_time=180, payment_interval_id=1, state_id=7))
+    session.add(User(id=1, name="Ana", first_last_name="Gómez", second_last_name="Ruiz", document_number=123456))
+    session.add(Property(
+        id=1, name="Predio", longitude=-75.0, latitude=4.0, extension=100.0,
+        real_estate_registration_number=1001, state=3
+    ))
+    session.add(PropertyUser(property_id=1, user_id=1))
+    for lot_id in (1, 2):
+        session.add(Lot(
+            id=lot_id, name=f"Lote {lot_id}", longitude=-75.0, latitude=4.0, extension=10.0,
+            real_estate_registration_number=2000 + lot_id, payment_interval=1, type_crop_id=1,
+            planting_date=datetime.date(2024, 1, lot_id), estimated_harvest_date=None, state=5
+        ))
+        session.add(PropertyLot(property_id=1, lot_id=lot_id))
+    session.commit()
+    return session
+
+
+def test_get_lot_by_id_matches_orm_encoding(db):
+    """El lote serializado por columnas es igual al obtenido con jsonable_encoder sobre la instancia"""
+    response = PropertyLotService(db).get_lot_by_id(1)
+    assert response.status_code == 200
+    data = json.loads(response.body)["data"]
+
+    expected = jsonable_encoder(db.get(Lot, 1))
+    expected.update({
+        "nombre_tipo_cultivo": "Café",
+        "nombre_intervalo_pago": "Mensual",
+        "nombre_estado": "Lote activo",
+        "property_id": 1
+    })
+    assert data == expected
+    assert data["planting_date"] == "2024-01-01"
+    assert data["estimated_harvest_date"] is None
+
+
+def test_get_lot_by_id_not_found(db):
+    response = PropertyLotService(db).get_lot_by_id(99)
+    assert response.status_code == 404
+
+
+def test_get_lots_property_includes_owner(db):
+    """Los lotes del predio incluyen los nombres descriptivos y los datos del propietario"""
+    response = PropertyLotService(db).get_lots_property(1)
+    assert response.status_code == 200
+    data = json.loads(response.body)["data"]
+
+    assert [lot["id"] for lot in data] == [1, 2]
+    assert data[1]["planting_date"] == "2024-01-02"
+    assert data[0]["owner_name"] == "Ana"
+    assert data[0]["owner_document_number"] == 123456
+    assert data[0]["nombre_tipo_cultivo"] == "Café"
+
+
+def test_get_property_by_id_and_for_user(db):
+    service = PropertyLotService(db)
+    data = json.loads(service.get_property_by_id(1).body)["data"]
+    assert data["state"] == 3
+    assert data["state_name"] == "Activo"
+    assert data["owner_first_last_name"] == "Gómez"
+
+    data = json.loads(service.get_properties_for_user(1).body)["data"]
+    assert [prop["id"] for prop in data] == [1]
+    assert service.get_properties_for_user(2).status_code == 404
+
+
+def test_row_encoder_converts_decimal_and_datetime():
+    """Numeric (no Float) se convierte a float y DateTime a ISO 8601"""
+    LocalBase = declarative_base()
+
+    class Invoice(LocalBase):
+        __tablename__ = "invoice"
+        id = Column(Integer, primary_key=True)
+        total = Column(Numeric(10, 2))
+        issued_at = Column(DateTime)
+
+    encoder = RowEncoder(Invoice)
+    assert encoder.keys == ["id", "total", "issued_at"]
+    row = {"id": 1, "total": decimal.Decimal("10.50"), "issued_at": datetime.datetime(2024, 5, 1, 8, 30), "extra": "x"}
+    assert encoder.encode(row) == {"id": 1, "total": 10.5, "issued_at": "2024-05-01T08:30:00", "extra": "x"}
+    assert encoder_for(Lot) is encoder_for(Lot)
@@ -0,0 +1,66 @@
+import json
+import pytest
+from fastapi import HTTPException
+from app.pagination import encode_cursor
+from app.property_routes.models import Property, PropertyUser
+from app.property_routes.services import PropertyLotService
+from app.roles.models import Vars
+from app.users.models import User
+
+
+@pytest.fixture()
+def db(session):
+    """Base de datos SQLite en memoria con cinco predios de un mismo dueño"""
+    session.add(Vars(id=3, name="Activo"))
+    session.add(User(id=1, name="Dueño", document_number=123456))
+    for property_id in range(1, 6):
+        session.add(Property(
+            id=property_id,
+            name=f"Predio {property_id}",
+            longitude=-75.0,
+            latitude=4.0,
+            extension=100.0,
+            real_estate_registration_number=1000 + property_id,
+            state=3
+        ))
+        session.add(PropertyUser(property_id=property_id, user_id=1))
+    session.commit()
+    return session
+
+
+def test_get_all_properties_pages(db):
+    """El cursor recorre los predios en orden y sin repetidos"""
+    service = PropertyLotService(db)
+    seen = []
+    cursor = None
+    while True:
+        response = service.get_all_properties(limit=2, cursor=cursor)
+        body = json.loads(response.body)
+        assert response.status_code == 200
+        seen.extend(item["id"] for item in body["data"])
+        cursor = body["pagination"]["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == [1, 2, 3, 4, 5]
+    assert body["data"][0]["state_name"] == "Activo"
+    assert body["data"][0]["owner_document_number"] == 123456
+
+
+def test_get_all_properties_empty_page(db):
+    """Sin predios se responde una página vacía"""
+    db.query(PropertyUser).delete()
+    db.commit()
+
+    body = json.loads(PropertyLotService(db).get_all_properties().body)
+    assert body["success"] is True
+    assert body["data"] == []
+    assert body["pagination"]["has_more"] is False
+
+
+@pytest.mark.parametrize("values", [("1", 1), (1, None), (True, 1), (1.5, 1)])
+def test_get_all_properties_cursor_with_wrong_types(db, values):
+    """Un cursor cuyos ids no son enteros se rechaza con 400"""
+    with pytest.raises(HTTPException) as exc_info:
+        PropertyLotService(db).get_all_properties(cursor=encode_cursor(*values))
+    assert exc_info.value.status_code == 400
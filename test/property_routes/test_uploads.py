@@ -0,0 +1,242 @@
+import asyncio
+import threading
+import time
+from io import BytesIO
+import pytest
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+from app.storage import LocalStorage
+from app.uploads import UploadError, UploadExecutor, UploadTooLarge, build_blob_path
+from app.property_routes.models import Property
+from app.property_routes.services import PropertyLotService
+from app.roles.models import Vars
+from app.users.models import User
+
+
+def make_upload(name: str, content: bytes = b"%PDF-1.4 contenido") -> UploadFile:
+    return UploadFile(
+        filename=name, file=BytesIO(content), headers=Headers({"content-type": "application/pdf"})
+    )
+
+
+class SlowStorage(LocalStorage):
+    """Almacenamiento local que tarda en subir, puede fallar N veces y registra la concurrencia máxima"""
+
+    def __init__(self, root, delay: float = 0.1, failures: int = 0):
+        super().__init__(root)
+        self.delay = delay
+        self.failures = failures
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def put(self, path, file_obj, content_type=None, chunk_size=None):
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            fail = self.failures > 0
+            if fail:
+                self.failures -= 1
+        try:
+            time.sleep(self.delay)
+            if fail:
+                raise ConnectionError("fallo transitorio")
+            return super().put(path, file_obj, content_type, chunk_size)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_build_blob_path_normalizes_directory():
+    path = build_blob_path("uploads/files_properties/", "escritura.pdf")
+    assert path.startswith("uploads/files_properties/")
+    assert "//" not in path
+    assert path.endswith(".pdf")
+
+
+def test_upload_file_to_local_storage(tmp_path):
+    executor = UploadExecutor(lambda: LocalStorage(tmp_path), retries=0)
+    url = asyncio.run(executor.upload_file(make_upload("escritura.pdf"), "uploads/files_lots/"))
+
+    stored = list((tmp_path / "uploads" / "files_lots").iterdir())
+    assert len(stored) == 1
+    assert stored[0].read_bytes() == b"%PDF-1.4 contenido"
+    assert url.startswith("file://")
+
+    blob_path = f"uploads/files_lots/{stored[0].name}"
+    asyncio.run(executor.delete(blob_path))
+    assert not stored[0].exists()
+    executor.shutdown()
+
+
+def test_upload_retries_transient_errors(tmp_path):
+    storage = SlowStorage(tmp_path, delay=0, failures=2)
+    executor = UploadExecutor(lambda: storage, retries=2, backoff=0)
+    asyncio.run(executor.upload_bytes("a/b.pdf", b"x", "application/pdf"))
+    assert storage.calls == 3
+    assert (tmp_path / "a" / "b.pdf").exists()
+
+    storage.failures = 5
+    with pytest.raises(UploadError):
+        asyncio.run(executor.upload_bytes("a/c.pdf", b"x", "application/pdf"))
+    executor.shutdown()
+
+
+def test_upload_timeout(tmp_path):
+    executor = UploadExecutor(lambda: SlowStorage(tmp_path, delay=0.3), timeout=0.05, retries=0)
+    with pytest.raises(UploadError, match="superó"):
+        asyncio.run(executor.upload_bytes("lento.pdf", b"x"))
+    executor.shutdown()
+
+
+def test_upload_concurrency_is_bounded(tmp_path):
+    storage = SlowStorage(tmp_path, delay=0.05)
+    executor = UploadExecutor(lambda: storage, max_workers=8, max_concurrency=2, retries=0)
+
+    async def upload_many():
+        await asyncio.gather(*(executor.upload_bytes(f"f/{i}.pdf", b"x") for i in range(6)))
+
+    asyncio.run(upload_many())
+    assert storage.calls == 6
+    assert storage.max_active == 2
+    executor.shutdown()
+
+
+def test_create_property_uploads_documents_in_parallel(tmp_path, monkeypatch, session):
+    """La escritura y el certificado se suben al mismo tiempo, no uno después del otro"""
+    from app.property_routes import services
+
+    session.add(Vars(id=3, name="Activo"))
+    session.add(User(id=1, name="Ana", email="ana@disriego.test"))
+    session.commit()
+
+    storage = SlowStorage(tmp_path, delay=0.2)
+    executor = UploadExecutor(lambda: storage, retries=0)
+    monkeypatch.setattr(services, "upload_executor", executor)
+
+    start = time.perf_counter()
+    response = asyncio.run(PropertyLotService(session).create_property(
+        user_id=1, name="Predio", longitude=-75.0, latitude=4.0, extension=10.0,
+        real_estate_registration_number=555,
+        public_deed=make_upload("escritura.pdf"),
+        freedom_tradition_certificate=make_upload("certificado.pdf"),
+    ))
+    elapsed = time.perf_counter() - start
+
+    assert response.status_code == 200
+    assert storage.max_active == 2
+    assert elapsed < 0.35
+    created = session.query(Property).one()
+    assert created.public_deed != created.freedom_tradition_certificate
+    assert created.public_deed.endswith(".pdf")
+
+    executor.shutdown()
+
+
+class RecordingStorage(LocalStorage):
+    """Registra el tamaño de cada lectura y puede fallar a mitad del primer intento"""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.read_sizes = []
+        self.fail_after_first_chunk = False
+
+    def put(self, path, file_obj, content_type=None, chunk_size=None):
+        received = bytearray()
+        while True:
+            chunk = file_obj.read(chunk_size)
+            if not chunk:
+                break
+            self.read_sizes.append(len(chunk))
+            received.extend(chunk)
+            if self.fail_after_first_chunk:
+                self.fail_after_first_chunk = False
+                raise ConnectionError("conexión interrumpida")
+        return super().put(path, BytesIO(bytes(received)), content_type)
+
+
+def test_upload_streams_in_chunks(tmp_path):
+    """El archivo se envía por fragmentos de chunk_size, nunca completo"""
+    storage = RecordingStorage(tmp_path)
+    executor = UploadExecutor(lambda: storage, retries=0, chunk_size=256 * 1024, max_bytes=10 * 1024 * 1024)
+    content = bytes(range(256)) * 4096  # 1 MiB
+    asyncio.run(executor.upload_file(make_upload("grande.pdf", content), "docs"))
+
+    assert storage.read_sizes == [256 * 1024] * 4
+    stored = next((tmp_path / "docs").iterdir())
+    assert stored.read_bytes() == content
+    executor.shutdown()
+
+
+def test_upload_retry_restarts_stream(tmp_path):
+    """Un intento fallido a mitad de la transmisión se reintenta desde el inicio del archivo"""
+    storage = RecordingStorage(tmp_path)
+    storage.fail_after_first_chunk = True
+    executor = UploadExecutor(lambda: storage, retries=1, backoff=0, chunk_size=256 * 1024)
+    content = b"a" * (600 * 1024)
+    asyncio.run(executor.upload_file(make_upload("doc.pdf", content), "docs"))
+
+    stored = next((tmp_path / "docs").iterdir())
+    assert stored.read_bytes() == content
+    executor.shutdown()
+
+
+def test_upload_rejects_oversized_file_while_streaming(tmp_path):
+    """Se corta la subida al superar el límite aunque el tamaño no se conozca de antemano"""
+    storage = RecordingStorage(tmp_path)
+    executor = UploadExecutor(lambda: storage, retries=3, backoff=0, chunk_size=256 * 1024, max_bytes=300 * 1024)
+    upload = make_upload("enorme.pdf", b"x" * (2 * 1024 * 1024))
+    assert upload.size is None
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(executor.upload_file(upload, "docs"))
+
+    # No se reintenta ni se leen más fragmentos de los necesarios para detectar el exceso
+    assert sum(storage.read_sizes) <= 300 * 1024 + 1
+    assert not (tmp_path / "docs").exists() or not any((tmp_path / "docs").iterdir())
+    executor.shutdown()
+
+
+def test_upload_rejects_declared_size_before_reading(tmp_path):
+    storage = RecordingStorage(tmp_path)
+    executor = UploadExecutor(lambda: storage, max_bytes=10)
+    upload = UploadFile(filename="a.pdf", file=BytesIO(b"x" * 100), size=100)
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(executor.upload_file(upload, "docs"))
+    assert storage.read_sizes == []
+
+
+def test_save_file_returns_413(tmp_path, monkeypatch):
+    from fastapi import HTTPException
+    from app.property_routes import services
+
+    executor = UploadExecutor(lambda: LocalStorage(tmp_path), max_bytes=10)
+    monkeypatch.setattr(services, "upload_executor", executor)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(PropertyLotService(db=None).save_file(make_upload("a.pdf", b"x" * 100), "docs"))
+    assert error.value.status_code == 413
+    executor.shutdown()
+
+
+def test_lifespan_waits_for_pending_uploads(tmp_path, monkeypatch):
+    """Al apagar la aplicación se esperan las subidas en curso y se liberan sus hilos"""
+    from app import main
+
+    storage = SlowStorage(tmp_path)
+    executor = UploadExecutor(lambda: storage, retries=0)
+    monkeypatch.setattr(main, "upload_executor", executor)
+    monkeypatch.setattr(main, "SCHEMA_CHECK_ON_STARTUP", False)
+
+    async def scenario():
+        async with main.lifespan(main.app):
+            upload = asyncio.ensure_future(executor.run(storage.put_bytes, "a.pdf", b"x"))
+            await asyncio.sleep(0.01)
+        # El apagado esperó a que el hilo terminara la subida
+        stored = storage.stat("a.pdf")
+        await upload
+        return stored
+
+    assert asyncio.run(scenario()) is not None
+    assert executor._executor is None
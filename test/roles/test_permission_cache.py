@@ -0,0 +1,152 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.roles.models import Permission, Role, role_permission_table
+from app.roles.permissions import (
+    PermissionCache, decode_permissions, encode_permissions, require_permission, role_ids,
+)
+from app.roles.schemas import RoleCreate
+from app.roles.services import RoleService
+from app.users.models import User
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture()
+def engine(engine):
+    """Roles: Administrador (ver, editar), Usuario (ver) y uno inhabilitado con editar"""
+    with sessionmaker(bind=engine)() as session:
+        ver, editar = Permission(id=1, name="ver_usuarios"), Permission(id=40, name="editar_usuarios")
+        session.add_all([
+            Role(id=1, name="Administrador", status=1, permissions=[ver, editar]),
+            Role(id=2, name="Usuario", status=1, permissions=[ver]),
+            Role(id=3, name="Inhabilitado", status=2, permissions=[editar]),
+        ])
+        session.commit()
+    return engine
+
+
+@pytest.fixture()
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture()
+def cache(engine, clock, monkeypatch):
+    """Caché de permisos aislada, instalada en lugar de la global"""
+    cache = PermissionCache(engine, ttl_seconds=60, clock=clock)
+    monkeypatch.setattr("app.roles.permissions.permission_cache", cache)
+    monkeypatch.setattr("app.roles.services.permission_cache", cache)
+    return cache
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_bitset_roundtrip():
+    encoded = encode_permissions([1, 40, 3])
+
+    assert encoded == format(1 << 1 | 1 << 3 | 1 << 40, "x")
+    assert decode_permissions(encoded) == {1, 3, 40}
+    assert decode_permissions(encode_permissions([])) == set()
+
+
+def test_permissions_resolved_from_memory(engine, cache):
+    """Tras la carga inicial las verificaciones no consultan la base de datos"""
+    cache.mask_for(frozenset({1}))
+    statements = count_statements(engine)
+
+    assert cache.has_permission(frozenset({1}), "editar_usuarios") is True
+    assert cache.has_permission(frozenset({2}), "editar_usuarios") is False
+    assert cache.has_permission(frozenset({2}), "ver_usuarios") is True
+    assert cache.has_permission(frozenset({1, 2}), "no_existe") is False
+    assert statements == []
+
+
+def test_disabled_roles_grant_nothing(cache):
+    assert cache.mask_for(frozenset({3})) == 0
+    assert cache.has_permission(frozenset({2, 3}), "editar_usuarios") is False
+
+
+def test_reload_after_ttl(engine, cache, clock):
+    """Los cambios hechos por otro worker se ven como máximo tras el TTL"""
+    assert cache.has_permission(frozenset({2}), "editar_usuarios") is False
+    with engine.begin() as connection:
+        connection.execute(Role.permissions.property.secondary.insert().values(rol_id=2, permission_id=40))
+
+    assert cache.has_permission(frozenset({2}), "editar_usuarios") is False
+    clock.now += 61
+    assert cache.has_permission(frozenset({2}), "editar_usuarios") is True
+
+
+def test_unknown_role_triggers_reload(engine, cache):
+    cache.mask_for(frozenset({1}))
+    with sessionmaker(bind=engine)() as session:
+        session.add(Role(id=4, name="Operador", status=1, permissions=[session.get(Permission, 40)]))
+        session.commit()
+
+    assert cache.has_permission(frozenset({4}), "editar_usuarios") is True
+
+
+def test_edit_role_invalidates_cache(engine, cache):
+    """Editar un rol o cambiar su estado descarta los permisos en memoria de inmediato"""
+    with sessionmaker(bind=engine)() as session:
+        session.add(User(id=1, name="Ana", roles=[session.get(Role, 1)]))
+        session.commit()
+    assert cache.has_permission(frozenset({2}), "editar_usuarios") is False
+    version = cache.version
+
+    with sessionmaker(bind=engine)() as session:
+        RoleService(session).edit_role(2, RoleCreate(name="Usuario", description="Usuario", permissions=[1, 40]))
+    assert cache.version == version + 1
+    assert cache.has_permission(frozenset({2}), "editar_usuarios") is True
+
+    with sessionmaker(bind=engine)() as session:
+        RoleService(session).change_role_status(3, 1)
+    assert cache.has_permission(frozenset({3}), "editar_usuarios") is True
+
+
+def test_require_permission_dependency(cache):
+    dependency = require_permission("editar_usuarios")
+    admin = {"id": 1, "rol": [{"id": 1, "name": "Administrador"}]}
+    usuario = {"id": 2, "rol": [{"id": 2, "name": "Usuario"}]}
+
+    assert role_ids(admin) == frozenset({1})
+    assert dependency(current_user=admin) is admin
+    with pytest.raises(HTTPException) as error:
+        dependency(current_user=usuario)
+    assert error.value.status_code == 403
+
+
+def test_require_permission_ignores_role_names(cache):
+    """Solo cuentan los permisos del rol en la base de datos, no su nombre en el token"""
+    dependency = require_permission("editar_usuarios", detail="solo editores")
+
+    with pytest.raises(HTTPException) as error:
+        dependency(current_user={"rol": [{"id": 2, "name": "Administrador"}]})
+    assert error.value.detail == "solo editores"
+
+
+def test_invalidate_reloads_before_the_ttl(engine, cache, clock):
+    cache.mask_for(frozenset({2}))
+    with engine.begin() as connection:
+        connection.execute(role_permission_table.insert(), {"rol_id": 2, "permission_id": 40})
+    statements = count_statements(engine)
+    assert cache.has_permission(frozenset({2}), "editar_usuarios") is False
+
+    cache.invalidate()
+
+    assert cache.has_permission(frozenset({2}), "editar_usuarios") is True
+    assert cache.has_permission(frozenset({1}), "editar_usuarios") is True
+    assert len(statements) == 2
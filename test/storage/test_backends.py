@@ -0,0 +1,123 @@
+from io import BytesIO
+from urllib.parse import parse_qs, urlparse
+import pytest
+from fastapi.testclient import TestClient
+from app import storage
+from app.storage import FirebaseStorage, LocalStorage, MemoryStorage, create_storage, verify_signed_path
+
+
+@pytest.fixture(params=["local", "memory"])
+def backend(request, tmp_path):
+    if request.param == "local":
+        return LocalStorage(tmp_path, base_url="https://files.disriego.test")
+    return MemoryStorage()
+
+
+def test_put_get_stat_delete(backend):
+    url = backend.put("docs/escritura.pdf", BytesIO(b"%PDF contenido"), "application/pdf", chunk_size=4)
+    assert "docs/escritura.pdf" in url
+    assert backend.get("docs/escritura.pdf") == b"%PDF contenido"
+
+    info = backend.stat("docs/escritura.pdf")
+    assert info.size == len(b"%PDF contenido")
+    assert info.content_type == "application/pdf"
+    assert info.updated is not None
+
+    backend.delete("docs/escritura.pdf")
+    assert backend.stat("docs/escritura.pdf") is None
+    with pytest.raises(FileNotFoundError):
+        backend.get("docs/escritura.pdf")
+    with pytest.raises(FileNotFoundError):
+        backend.delete("docs/escritura.pdf")
+
+
+def test_signed_url(backend):
+    backend.put_bytes("docs/a.pdf", b"x")
+    query = parse_qs(urlparse(backend.signed_url("docs/a.pdf", expires_in=60)).query)
+    expires, signature = int(query["expires"][0]), query["signature"][0]
+    assert verify_signed_path("docs/a.pdf", expires, signature)
+    assert not verify_signed_path("docs/b.pdf", expires, signature)
+    assert not verify_signed_path("docs/a.pdf", expires - 3600, signature)
+
+
+def test_signed_url_is_served_by_the_storage_route(monkeypatch, tmp_path):
+    """La URL firmada de LocalStorage apunta a GET /storage/{path}, que valida firma y expiración"""
+    from app.main import app
+
+    backend = LocalStorage(tmp_path)
+    monkeypatch.setattr(storage, "_storage", backend)
+    backend.put_bytes("docs/a b.pdf", b"contenido")
+    url = urlparse(backend.signed_url("docs/a b.pdf", expires_in=60))
+    query = parse_qs(url.query)
+    client = TestClient(app)
+
+    assert url.path.startswith("/disriego/base/storage/")
+    response = client.get(url.path, params=query)
+    assert response.status_code == 200
+    assert response.content == b"contenido"
+
+    assert client.get(url.path, params={**query, "signature": "0" * 64}).status_code == 403
+    assert client.get(url.path).status_code == 422
+    backend.delete("docs/a b.pdf")
+    assert client.get(url.path, params=query).status_code == 404
+
+
+def test_local_storage_uses_a_unique_temporary_file(tmp_path):
+    """Cada escritura usa su propio temporal y no deja restos en el directorio"""
+    backend = LocalStorage(tmp_path)
+    temporaries = []
+
+    class Recording(BytesIO):
+        def read(self, size=-1):
+            temporaries.extend(path.name for path in (tmp_path / "docs").iterdir() if path.suffix == ".tmp")
+            return super().read(size)
+
+    backend.put("docs/a.pdf", Recording(b"uno"))
+    backend.put("docs/a.pdf", Recording(b"dos"))
+
+    assert len(set(temporaries)) == 2
+    assert backend.get("docs/a.pdf") == b"dos"
+    assert [path.name for path in (tmp_path / "docs").iterdir()] == ["a.pdf"]
+
+
+def test_local_storage_rejects_paths_outside_root(tmp_path):
+    backend = LocalStorage(tmp_path / "root")
+    with pytest.raises(ValueError):
+        backend.put("../fuera.txt", BytesIO(b"x"))
+
+
+def test_create_storage_from_config(monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, "STORAGE_LOCAL_DIR", str(tmp_path))
+    assert isinstance(create_storage("memory"), MemoryStorage)
+    assert create_storage("local").root == tmp_path
+    assert create_storage("firebase").name == "firebase"
+    with pytest.raises(ValueError):
+        create_storage("s3")
+
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "memory")
+    assert isinstance(create_storage(), MemoryStorage)
+
+
+def test_firebase_storage_does_not_touch_credentials_until_used(monkeypatch):
+    """Crear el backend de Firebase no inicializa Firebase"""
+    import sys
+    monkeypatch.delitem(sys.modules, "app.firebase_config", raising=False)
+    backend = create_storage("firebase")
+    assert backend._bucket is None
+    assert "app.firebase_config" not in sys.modules
+
+
+def test_firebase_delete_of_missing_object_raises_file_not_found():
+    """El 404 de Google Cloud Storage se traduce al FileNotFoundError de la interfaz"""
+    from google.api_core.exceptions import NotFound
+
+    class Blob:
+        def delete(self):
+            raise NotFound("No such object")
+
+    class Bucket:
+        def blob(self, path):
+            return Blob()
+
+    with pytest.raises(FileNotFoundError):
+        FirebaseStorage(Bucket()).delete("docs/no-existe.pdf")
@@ -0,0 +1,39 @@
+import importlib
+import sys
+import threading
+
+import pytest
+
+from app import firebase_config
+
+
+def test_import_does_not_initialize_firebase(monkeypatch):
+    monkeypatch.delenv("FIREBASE_CREDENTIALS", raising=False)
+    monkeypatch.delitem(sys.modules, "firebase_admin", raising=False)
+    module = importlib.reload(firebase_config)
+    assert module._bucket is None
+    assert "firebase_admin" not in sys.modules
+
+
+def test_get_bucket_creates_the_client_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(firebase_config, "_bucket", None)
+    monkeypatch.setattr(firebase_config, "_create_bucket", lambda: calls.append(1) or object())
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(firebase_config.get_bucket())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert firebase_config.bucket is results[0]
+
+
+def test_missing_credentials_fail_on_first_use(monkeypatch):
+    monkeypatch.setattr(firebase_config, "_bucket", None)
+    monkeypatch.delenv("FIREBASE_CREDENTIALS", raising=False)
+    with pytest.raises(ValueError, match="FIREBASE_CREDENTIALS"):
+        firebase_config.get_bucket()
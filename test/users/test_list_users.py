@@ -0,0 +1,141 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from app.pagination import encode_cursor
+from app.roles.models import Role, Vars
+from app.users.models import User
+from app.users.services import UserService
+
+
+@pytest.fixture()
+def db(session):
+    """Base de datos SQLite en memoria con usuarios y roles de prueba"""
+    session.add(Vars(id=1, name="Activo"))
+    admin = Role(id=1, name="Administrador", description="Admin", status=1)
+    usuario = Role(id=2, name="Usuario", description="Usuario", status=1)
+    session.add_all([admin, usuario])
+    session.add_all([
+        User(id=1, name="Ana", roles=[admin, usuario]),
+        User(id=2, name="Luis", roles=[usuario]),
+        User(id=3, name="Sin rol"),
+    ])
+    session.commit()
+    return session
+
+
+def test_list_users_roles(db):
+    """Cada usuario conserva sus roles en el listado"""
+    response = UserService(db).list_users()
+    roles = {user["id"]: user["roles"] for user in response["data"]}
+
+    assert response["success"] is True
+    assert roles[1] == [{"id": 1, "name": "Administrador"}, {"id": 2, "name": "Usuario"}]
+    assert roles[2] == [{"id": 2, "name": "Usuario"}]
+    assert roles[3] == []
+
+
+def test_list_users_constant_queries(db):
+    """El listado no emite consultas adicionales por usuario ni cuenta sin pedirlo"""
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    response = UserService(db).list_users()
+
+    assert len(statements) == 2
+    assert response["pagination"]["total"] is None
+
+
+def test_list_users_cursor_pagination(db):
+    """El cursor recorre todos los usuarios sin repetir ni omitir"""
+    service = UserService(db)
+    first = service.list_users(limit=2, include_total=True)
+    assert [user["id"] for user in first["data"]] == [1, 2]
+    assert first["pagination"]["has_more"] is True
+    assert first["pagination"]["total"] == 3
+
+    second = service.list_users(limit=2, cursor=first["pagination"]["next_cursor"])
+    assert [user["id"] for user in second["data"]] == [3]
+    assert second["pagination"]["has_more"] is False
+    assert second["pagination"]["next_cursor"] is None
+
+
+def test_list_users_sort_desc_by_name(db):
+    """El orden por nombre descendente se mantiene entre páginas"""
+    service = UserService(db)
+    first = service.list_users(limit=1, sort="-name")
+    second = service.list_users(limit=2, sort="-name", cursor=first["pagination"]["next_cursor"])
+
+    names = [user["name"] for user in first["data"] + second["data"]]
+    assert names == ["Sin rol", "Luis", "Ana"]
+
+
+@pytest.mark.parametrize("sort, expected", [
+    ("email", [2, 4, 1, 3]),
+    ("-email", [3, 1, 4, 2]),
+])
+def test_list_users_sort_with_null_values(db, sort, expected):
+    """Los usuarios sin valor van al final (al principio en descendente) sin perderse entre páginas"""
+    db.query(User).filter(User.id == 2).update({"email": "luis@disriego.test"})
+    db.add(User(id=4, name="Marta", email="marta@disriego.test"))
+    db.commit()
+    service = UserService(db)
+
+    ids, cursor = [], None
+    while True:
+        page = service.list_users(limit=1, sort=sort, cursor=cursor)
+        ids += [user["id"] for user in page["data"]]
+        cursor = page["pagination"]["next_cursor"]
+        if cursor is None:
+            break
+
+    assert ids == expected
+
+
+@pytest.mark.parametrize("sort", ["--name", "nombre", "-"])
+def test_list_users_invalid_sort(db, sort):
+    """Solo se acepta un guion inicial antes de un campo conocido"""
+    with pytest.raises(HTTPException) as exc_info:
+        UserService(db).list_users(sort=sort)
+    assert exc_info.value.status_code == 400
+
+
+def test_list_users_filters(db):
+    """Los filtros por rol y texto se aplican en el servidor"""
+    service = UserService(db)
+    admins = service.list_users(role_id=1)
+    assert [user["id"] for user in admins["data"]] == [1]
+
+    found = service.list_users(search="lui")
+    assert [user["name"] for user in found["data"]] == ["Luis"]
+
+    # Los comodines de LIKE se buscan como texto literal
+    assert service.list_users(search="%")["data"] == []
+    assert service.list_users(search="_")["data"] == []
+    assert service.list_users(search="\\")["data"] == []
+
+    empty = service.list_users(status_id=99, include_total=True)
+    assert empty["data"] == []
+    assert empty["pagination"]["total"] == 0
+
+
+def test_list_users_invalid_cursor(db):
+    """Un cursor corrupto se rechaza con 400"""
+    with pytest.raises(HTTPException) as exc_info:
+        UserService(db).list_users(cursor="no-es-un-cursor")
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.parametrize("sort, values", [
+    ("id", (1, True)),
+    ("id", (1, "2")),
+    ("name", ("Ana", None)),
+    ("name", (7, 1)),
+    ("-name", (["Ana"], 1)),
+    ("document_number", ("123", 1)),
+    ("document_number", (False, 1)),
+])
+def test_list_users_cursor_with_wrong_types(db, sort, values):
+    """Un cursor bien formado con valores del tipo equivocado también se rechaza con 400"""
+    with pytest.raises(HTTPException) as exc_info:
+        UserService(db).list_users(sort=sort, cursor=encode_cursor(*values))
+    assert exc_info.value.status_code == 400
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.users.models import Notification, User
+from app.users.services import UserService
+
+NOW = datetime(2025, 1, 1, 12, 0)
+UNREAD = 5000
+
+
+@pytest.fixture()
+def session(engine, session):
+    """Ana con 5000 notificaciones sin leer (una por minuto) y Luis con una"""
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [
+            {"id": 1, "name": "Ana", "unread_notifications": UNREAD},
+            {"id": 2, "name": "Luis", "unread_notifications": 1},
+        ])
+        connection.execute(Notification.__table__.insert(), [
+            {"id": i, "user_id": 1, "title": "Aviso", "message": str(i), "type": "info", "read": False,
+             "created_at": NOW - timedelta(minutes=UNREAD - i)}
+            for i in range(1, UNREAD + 1)
+        ])
+        connection.execute(Notification.__table__.insert(), [
+            {"id": UNREAD + 1, "user_id": 2, "title": "Aviso", "message": "Luis", "type": "info", "read": False,
+             "created_at": NOW}
+        ])
+    return session
+
+
+def record(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def unread(session, user_id):
+    session.expire_all()
+    counter = session.get(User, user_id).unread_notifications
+    assert counter == session.query(Notification).filter(Notification.user_id == user_id, Notification.read == False).count()
+    return counter
+
+
+def test_mark_all_is_one_update(session, engine):
+    statements = record(engine)
+
+    result = UserService(session).mark_notifications_as_read(1, mark_all=True)
+
+    assert result["data"]["marked"] == UNREAD
+    assert sorted(result["data"]["ids"]) == list(range(1, UNREAD + 1))
+    # Sin leer antes al usuario: un UPDATE con RETURNING y el descuento del contador
+    assert [statement.split()[:2] for statement in statements] == [["UPDATE", "notifications"], ["UPDATE", "users"]]
+    assert "RETURNING" in statements[0]
+    assert unread(session, 1) == 0
+    assert unread(session, 2) == 1
+
+
+def test_foreign_and_read_ids_are_ignored(session, engine):
+    service = UserService(session)
+    service.mark_notifications_as_read(1, notification_ids=[1])
+    statements = record(engine)
+
+    result = service.mark_notifications_as_read(1, notification_ids=[1, 2, 3, UNREAD + 1])
+
+    assert sorted(result["data"]["ids"]) == [2, 3]
+    assert len(statements) == 2
+    assert unread(session, 1) == UNREAD - 3
+    assert unread(session, 2) == 1
+
+
+def test_nothing_to_mark_skips_the_counter(session, engine):
+    service = UserService(session)
+    statements = record(engine)
+
+    assert service.mark_notifications_as_read(2, notification_ids=[1])["data"] == {"marked": 0, "ids": []}
+    assert service.mark_notifications_as_read(2)["data"] == {"marked": 0, "ids": []}
+    assert [statement.split()[:2] for statement in statements] == [["UPDATE", "notifications"]]
+
+
+def test_mark_all_before_timestamp(session):
+    result = UserService(session).mark_notifications_as_read(1, before=NOW - timedelta(minutes=UNREAD - 10))
+
+    assert sorted(result["data"]["ids"]) == list(range(1, 11))
+    assert unread(session, 1) == UNREAD - 10
+
+
+def test_without_returning_reports_the_count(session, engine, monkeypatch):
+    monkeypatch.setattr(engine.dialect, "update_returning", False)
+    statements = record(engine)
+
+    result = UserService(session).mark_notifications_as_read(1, notification_ids=[1, 2], before=NOW)
+
+    assert result["data"] == {"marked": 2, "ids": None}
+    assert "RETURNING" not in statements[0]
+    assert unread(session, 1) == UNREAD - 2
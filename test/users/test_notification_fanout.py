@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy import event
+
+from app.roles.models import Permission, Role
+from app.roles.schemas import RoleCreate
+from app.roles.services import RoleService
+from app.users.models import NotificationOutbox, User
+from app.users.schemas import NotificationCreate
+from app.users.services import UserService
+
+ADMINS = 40
+
+
+@pytest.fixture()
+def session(session):
+    """40 administradores (uno también con rol Usuario) y un usuario sin rol de administrador"""
+    permission = Permission(id=1, name="ver_usuarios")
+    admin = Role(id=1, name="Administrador", status=1, permissions=[permission])
+    usuario = Role(id=2, name="Usuario", status=1, permissions=[permission])
+    session.add_all([User(id=i, name=f"Admin {i}", roles=[admin]) for i in range(1, ADMINS + 1)])
+    session.get(User, 1).roles.append(usuario)
+    session.add(User(id=100, name="Luis", roles=[usuario]))
+    session.commit()
+    return session
+
+
+def record(session):
+    """Sentencias y commits emitidos a partir de este punto"""
+    log = {"statements": [], "commits": 0}
+    event.listen(session.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: log["statements"].append(statement))
+
+    def on_commit(_):
+        log["commits"] += 1
+
+    event.listen(session, "after_commit", on_commit)
+    return log
+
+
+def inserts(log):
+    return [statement for statement in log["statements"] if statement.startswith("INSERT INTO notification_outbox")]
+
+
+def test_admin_ids_resolved_in_one_query(session):
+    log = record(session)
+
+    ids = UserService(session).get_admin_ids(exclude=5)
+
+    assert sorted(ids) == [i for i in range(1, ADMINS + 1) if i != 5]
+    assert len(log["statements"]) == 1
+
+
+def test_bulk_insert_joins_caller_transaction(session):
+    """Un solo INSERT de varias filas y sin commit: el llamador decide"""
+    service = UserService(session)
+    log = record(session)
+
+    created = service.enqueue_notifications(service.admin_notifications("Aviso", "Mensaje", "test"))
+
+    assert created == ADMINS
+    assert len(inserts(log)) == 1
+    assert log["commits"] == 0
+    session.rollback()
+    assert session.query(NotificationOutbox).count() == 0
+
+
+def test_bulk_insert_in_batches(session, monkeypatch):
+    monkeypatch.setattr("app.users.services._NOTIFICATIONS_INSERT_BATCH", 16)
+    log = record(session)
+
+    UserService(session).enqueue_notifications(
+        [NotificationCreate(user_id=1, title="Aviso", message=str(i), type="test") for i in range(40)]
+    )
+
+    assert len(inserts(log)) == 3
+    assert session.query(NotificationOutbox).count() == 40
+
+
+def test_create_role_notifies_admins_with_one_commit(session):
+    log = record(session)
+
+    RoleService(session).create_role(RoleCreate(name="Operador", description="Operador", permissions=[1]))
+
+    assert len(inserts(log)) == 1
+    assert log["commits"] == 1
+    rows = session.query(NotificationOutbox.user_id, NotificationOutbox.type).all()
+    assert sorted(user_id for user_id, _ in rows) == list(range(1, ADMINS + 1))
+    assert {type for _, type in rows} == {"role_creation"}
+
+
+def test_edit_and_status_change_notify_in_same_transaction(session):
+    service = RoleService(session)
+    log = record(session)
+
+    result = service.edit_role(2, RoleCreate(name="Usuario", description="Usuario final", permissions=[1]))
+    service.change_role_status(2, 1)
+
+    assert result["success"] is True
+    assert len(inserts(log)) == 2
+    assert log["commits"] == 2
+    assert session.query(NotificationOutbox).filter(NotificationOutbox.type == "role_update").count() == ADMINS
+    assert session.query(NotificationOutbox).filter(NotificationOutbox.type == "role_status_change").count() == ADMINS
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.pagination import encode_cursor
+from app.notifications import dispatch_pending, recount_unread
+from app.users.models import Notification, User
+from app.users.schemas import NotificationCreate
+from app.users.services import UserService
+
+NOW = datetime(2025, 1, 1, 12, 0)
+
+
+@pytest.fixture()
+def session(session):
+    """Ana con 25 notificaciones (de a 5 con la misma fecha), 10 sin leer"""
+    session.add_all([User(id=1, name="Ana", unread_notifications=10), User(id=2, name="Luis")])
+    session.add_all([
+        Notification(id=i, user_id=1, title="Aviso", message=str(i), type="info", read=i > 10,
+                     created_at=NOW - timedelta(minutes=i // 5))
+        for i in range(1, 26)
+    ])
+    session.commit()
+    return session
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_pages_follow_created_at_and_id(session):
+    """Las páginas no repiten ni saltan notificaciones aunque compartan created_at"""
+    service = UserService(session)
+    seen, cursor = [], None
+    while True:
+        page = service.get_user_notifications(1, limit=7, cursor=cursor)
+        assert page["unread_count"] == 10
+        seen += [row["id"] for row in page["data"]]
+        cursor = page["pagination"]["next_cursor"]
+        if not page["pagination"]["has_more"]:
+            break
+
+    expected = sorted(range(1, 26), key=lambda i: (NOW - timedelta(minutes=i // 5), i), reverse=True)
+    assert seen == expected
+    assert cursor is None
+
+
+def test_page_costs_two_queries(session, engine):
+    service = UserService(session)
+    statements = count_statements(engine)
+
+    page = service.get_user_notifications(1, limit=5)
+
+    assert len(page["data"]) == 5
+    assert len(statements) == 2
+    assert not [statement for statement in statements if "count(" in statement.lower()]
+
+
+@pytest.mark.parametrize("cursor", [
+    "no-es-un-cursor",
+    encode_cursor("no-es-fecha", 1),
+    encode_cursor(NOW.isoformat(), "1 OR 1=1"),
+    encode_cursor(NOW.isoformat(), [1]),
+    encode_cursor(NOW.isoformat(), True),
+])
+def test_invalid_cursor_is_rejected(session, cursor):
+    with pytest.raises(HTTPException) as error:
+        UserService(session).get_user_notifications(1, cursor=cursor)
+    assert error.value.status_code == 400
+
+
+def test_unread_count_reads_the_counter(session, engine):
+    service = UserService(session)
+    statements = count_statements(engine)
+
+    assert service.get_unread_notification_count(1) == {"success": True, "count": 10}
+    assert service.get_unread_notification_count(99) == {"success": True, "count": 0}
+    assert len(statements) == 2
+    assert all("count(" not in statement.lower() for statement in statements)
+
+
+def test_counter_follows_create_dispatch_and_mark_read(session, engine):
+    service = UserService(session)
+
+    service.create_notification(NotificationCreate(user_id=2, title="Aviso", message="directa", type="info"))
+    service.enqueue_notifications([
+        NotificationCreate(user_id=2, title="Aviso", message=str(i), type="info") for i in range(3)
+    ])
+    session.commit()
+    dispatch_pending(engine)
+    assert service.get_unread_notification_count(2)["count"] == 4
+
+    ids = [row["id"] for row in service.get_user_notifications(2)["data"]]
+    service.mark_notifications_as_read(2, notification_ids=ids[:2])
+    # Volver a marcar las mismas no descuenta dos veces
+    service.mark_notifications_as_read(2, notification_ids=ids[:2])
+    assert service.get_unread_notification_count(2)["count"] == 2
+
+    service.mark_notifications_as_read(1, mark_all=True)
+    assert service.get_unread_notification_count(1)["count"] == 0
+
+
+def test_recount_repairs_drift(session, engine):
+    session.get(User, 1).unread_notifications = 3
+    session.commit()
+
+    with engine.begin() as connection:
+        assert recount_unread(connection) == 1
+        assert recount_unread(connection) == 0
+    session.expire_all()
+    assert session.get(User, 1).unread_notifications == 10